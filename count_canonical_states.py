@@ -1,6 +1,7 @@
 """统计标准型数量"""
 
 from itertools import combinations, permutations
+from math import perm
 import time
 
 class SymmetryHelper3x3:
@@ -191,6 +192,23 @@ def count_canonical_states(board_size, max_move, sym_helper, verbose=True):
     return len(canons), total_checked, total_elapsed
 
 
+def count_placements(board_size, max_move):
+    """有序放置总数（即 count_canonical_states 的 total_checked），按排列数直接计算"""
+    total_positions = board_size * board_size
+    total = 0
+    for x_count in range(max_move + 1):
+        for y_count in (x_count - 1, x_count):
+            if y_count < 0:
+                continue
+            total += perm(total_positions, x_count) * perm(total_positions - x_count, y_count)
+    return total
+
+
+def estimate_canonical_states(board_size, max_move):
+    """估算标准型数量：有序放置数 / 8（对称局面很少，3×3 m=3 估算 9,902，实际 9,910）"""
+    return -(-count_placements(board_size, max_move) // 8)
+
+
 if __name__ == "__main__":
     print("=" * 70)
     print("统计标准型数量（仿照 perfect_strategy.py 的方法）")
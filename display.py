@@ -1,6 +1,7 @@
 import pygame
 import sys
 import os
+import time
 from Game import GameBase
 import strategies.random.random_strategy as random_strategy
 import strategies.pvp.pvp_strategy as pvp_strategy
@@ -8,6 +9,7 @@ import strategies.nocpu.nocpu_strategy as nocpu_strategy
 import strategies.perfect3x3.perfect_strategy as perfect3x3_strategy
 import strategies.perfect4x4_m4.perfect_strategy as perfect4x4_m4_strategy
 import strategies.heuristic.heuristic_strategy as heuristic_strategy
+import strategies.search.search_strategy as search_strategy
 
 
 # ==================== 字体管理 ====================
@@ -294,6 +296,9 @@ class GameUI:
         self.current_max_move = 3
         self.current_win_count = 3
 
+        # AI 每步最长思考时间（秒），到时策略返回目前找到的最佳走法，界面不会长时间卡住
+        self.ai_move_time = 0.5
+
         # 棋子样式配置
         self.piece_styles = [
             {"name": "X/O Style", "type": "xo"},
@@ -411,6 +416,16 @@ class GameUI:
             "supports_all": True
         })
 
+        # Alpha-Beta AI 策略 - 总是可用（在启发式评估上搜索多步）
+        search_instance = self._get_or_create_strategy(search_strategy)
+        self.available_strategies.append({
+            "name": "Alpha-Beta AI",
+            "module": search_strategy,
+            "description": "Heuristic + alpha-beta search",
+            "instance": search_instance,
+            "supports_all": True
+        })
+
         # Perfect AI 3x3
         if current_config == (3, 3):
             perfect3x3_instance = self._get_or_create_strategy(perfect3x3_strategy)
@@ -1351,7 +1366,7 @@ class GameUI:
                     # PvAI 模式，让AI走棋
                     if self.play_mode == "pvai":
                         # AI回合
-                        if self.strategy.make_move():
+                        if self.strategy.make_move(deadline=self._ai_deadline()):
                             self.draw()
                             # 检查 AI 是否获胜
                             self.result = self.game.get_result()
@@ -1359,6 +1374,10 @@ class GameUI:
                                 self.game_on = False
                                 self.draw()
 
+    def _ai_deadline(self):
+        """本步 AI 的截止时刻（time.perf_counter()）"""
+        return time.perf_counter() + self.ai_move_time
+
     def _is_ai_turn(self):
         """判断当前是否是 AI 回合"""
         if self.play_mode != "pvai" or self.play == -1:
@@ -1398,7 +1417,7 @@ class GameUI:
             # AI先手的情况：玩家执O（player == 1）时，AI执X先手
             if self.play_mode == "pvai" and player == 1:
                 # AI 先手（X）
-                if not self.strategy.make_move():
+                if not self.strategy.make_move(deadline=self._ai_deadline()):
                     # AI 不可用，切换到 PvP 模式
                     self.play_mode = "pvp"
                     self._init_ui_components()
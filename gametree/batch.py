@@ -0,0 +1,222 @@
+"""多配置批量求解
+
+一次任务求解一组 (n, m, K) 配置：
+    1. 按 count_canonical_states 的排列数估算每个配置的标准型数量，超过上限的跳过
+    2. 输出目录中已有有效表的配置跳过（只补全目录信息）
+    3. 其余配置按估算代价从大到小分配给进程池（最长任务优先），
+       每个任务用外存求解器并限定自己的内存预算
+    4. 结果写入 catalog.json：每个配置的表文件、记录数、空棋盘胜负和最大 depth
+
+用法：
+    python -m gametree.batch tables/ --n 3 4 5 --m 1 2 3 4 5 --workers 4 --budget 512
+"""
+
+import json
+import os
+import time
+from multiprocessing import Pool, cpu_count
+
+from count_canonical_states import estimate_canonical_states
+from gametree.board import BoardConfig
+from gametree.external import train_external
+from gametree.table import TableFile, read_header
+from gametree.telemetry import Telemetry
+from gametree.verify import verify_table
+
+CATALOG = 'catalog.json'
+DEFAULT_JOB_BUDGET = 512 * 1024 * 1024
+DEFAULT_MAX_STATES = 20 * 1000 * 1000
+
+WINNERS = {1: 'X', -1: 'O', 0: 'draw'}
+
+
+def sweep(sizes=(3, 4, 5), moves=range(1, 6)):
+    """n ∈ sizes, m ∈ moves, K ∈ 2..m；K > n 时无法连成K子（全部平局），不列入"""
+    for n in sizes:
+        for m in moves:
+            for k in range(2, m + 1):
+                if k <= n:
+                    yield n, m, k
+
+
+def table_name(config):
+    return f"game_tree_{config.name}.data"
+
+
+def estimate_cost(config):
+    """(估算标准型数, 相对代价)；每个状态最多 2 * n² 条出边"""
+    states = estimate_canonical_states(config.n, config.m)
+    return states, states * config.cells
+
+
+def summarize(path):
+    """扫描整张表：记录数、空棋盘（X 先手）的胜负与步数、最大 depth"""
+    with TableFile(path) as table:
+        root = table.query(0)
+        max_depth = 0
+        for i in range(len(table)):
+            _, _, _, depth0, depth1 = table.record(i)
+            max_depth = max(max_depth, depth0, depth1)
+        records = len(table)
+    dp0, depth0 = (root[0][0], root[1][0]) if root else (None, None)
+    return {
+        'records': records,
+        'winner': WINNERS.get(dp0),
+        'empty_board_depth': depth0,
+        'max_depth': max_depth,
+    }
+
+
+def table_is_valid(path, config, previous=None, deep=False):
+    """已有表是否可以直接复用
+
+    快速检查头部 / 大小一致、空棋盘状态存在、记录数与目录一致；
+    deep=True 时再用 gametree.verify 做完整一致性校验。
+    """
+    if not os.path.exists(path):
+        return False
+    try:
+        header_size, header_count = read_header(path)
+    except ValueError:
+        return False
+    with TableFile(path) as table:
+        if header_count != len(table) or not len(table) or table.find(0) < 0:
+            return False
+        if previous and previous.get('records') not in (None, len(table)):
+            return False
+    if deep:
+        return not verify_table(path, config)['violations']
+    return True
+
+
+def _solve_job(job):
+    config = BoardConfig(job['n'], job['m'], job['k'])
+    telemetry = Telemetry(job['telemetry'], config=config.name, backend='external') \
+        if job['telemetry'] else None
+    start = time.time()
+    try:
+        stats = train_external(config, job['path'], memory_budget=job['budget'],
+                               workdir=job['workdir'], telemetry=telemetry)
+    except Exception as e:
+        return job, {'status': 'failed', 'error': f"{type(e).__name__}: {e}"}
+    finally:
+        if telemetry is not None:
+            telemetry.close()
+    entry = {'status': 'solved', 'seconds': round(time.time() - start, 1),
+             'layers': stats.get('layers')}
+    entry.update(summarize(job['path']))
+    return job, entry
+
+
+def load_catalog(outdir):
+    path = os.path.join(outdir, CATALOG)
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return {entry['config']: entry for entry in json.load(f)}
+
+
+def save_catalog(outdir, catalog):
+    """先写临时文件再替换，中途中断时不会留下半个目录文件"""
+    path = os.path.join(outdir, CATALOG)
+    entries = sorted(catalog.values(), key=lambda e: (e['n'], e['m'], e['k']))
+    with open(path + '.tmp', 'w', encoding='utf-8') as f:
+        json.dump(entries, f, ensure_ascii=False, indent=2)
+    os.replace(path + '.tmp', path)
+
+
+def run_batch(outdir, configs, workers=None, job_budget=DEFAULT_JOB_BUDGET, total_memory=None,
+              max_states=DEFAULT_MAX_STATES, deep_check=False, workdir=None, telemetry=False):
+    """求解 configs 中的 (n, m, K)，返回 {配置名: 目录项}
+
+    Args:
+        workers: 进程数，默认 CPU 核数；给出 total_memory 时不超过 total_memory // job_budget
+        job_budget: 每个任务的外存求解内存预算（字节）
+        max_states: 估算标准型数超过该值的配置跳过
+        deep_check: 已有表是否做完整一致性校验后再复用
+        telemetry: 为每个任务在 outdir/telemetry/ 下写 JSON lines 遥测
+    """
+    os.makedirs(outdir, exist_ok=True)
+    if telemetry:
+        os.makedirs(os.path.join(outdir, 'telemetry'), exist_ok=True)
+    catalog = load_catalog(outdir)
+
+    jobs = []
+    for n, m, k in configs:
+        config = BoardConfig(n, m, k)
+        path = os.path.join(outdir, table_name(config))
+        states, cost = estimate_cost(config)
+        entry = {'config': config.name, 'n': n, 'm': m, 'k': k,
+                 'file': table_name(config), 'estimated_states': states}
+        previous = catalog.get(config.name)
+
+        if states > max_states:
+            entry['status'] = 'too_large'
+        elif table_is_valid(path, config, previous, deep_check):
+            if previous and previous.get('status') in ('solved', 'existing'):
+                entry = previous
+            else:
+                entry['status'] = 'existing'
+                entry.update(summarize(path))
+        else:
+            jobs.append({'n': n, 'm': m, 'k': k, 'path': path, 'cost': cost,
+                         'budget': job_budget, 'workdir': workdir,
+                         'telemetry': os.path.join(outdir, 'telemetry', f"{config.name}.jsonl")
+                         if telemetry else None})
+            entry['status'] = 'pending'
+        catalog[config.name] = entry
+    save_catalog(outdir, catalog)
+
+    if workers is None:
+        workers = cpu_count()
+    if total_memory:
+        workers = min(workers, max(1, total_memory // job_budget))
+    workers = max(1, min(workers, len(jobs)))
+
+    # 最长任务优先：大配置先开始，小配置填补空闲核
+    jobs.sort(key=lambda job: -job['cost'])
+    print(f"待求解 {len(jobs)} 个配置，{workers} 个进程，每个任务内存预算 {job_budget >> 20} MB")
+    if jobs:
+        with Pool(workers) as pool:
+            for job, result in pool.imap_unordered(_solve_job, jobs):
+                name = BoardConfig(job['n'], job['m'], job['k']).name
+                catalog[name].update(result)
+                save_catalog(outdir, catalog)
+                print(f"  {name}: {result['status']} {result.get('winner', result.get('error', ''))}")
+    return catalog
+
+
+def print_catalog(catalog):
+    print(f"{'配置':<14}{'状态':<11}{'记录数':>12}  {'先手结果':<8}{'空棋盘步数':>10}{'最大depth':>10}")
+    for entry in sorted(catalog.values(), key=lambda e: (e['n'], e['m'], e['k'])):
+        records = entry.get('records')
+        print(f"{entry['config']:<14}{entry['status']:<11}"
+              f"{records if records is not None else '-':>12}  "
+              f"{entry.get('winner') or '-':<8}"
+              f"{entry.get('empty_board_depth', '-'):>10}{entry.get('max_depth', '-'):>10}")
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='多配置批量求解')
+    parser.add_argument('outdir')
+    parser.add_argument('--n', type=int, nargs='+', default=[3, 4, 5], help='棋盘大小')
+    parser.add_argument('--m', type=int, nargs='+', default=[1, 2, 3, 4, 5], help='max_move')
+    parser.add_argument('--workers', type=int, default=None, help='进程数（默认 CPU 核数）')
+    parser.add_argument('--budget', type=int, default=DEFAULT_JOB_BUDGET >> 20,
+                        help='每个任务的内存预算 (MB)')
+    parser.add_argument('--memory', type=int, default=None, help='总内存上限 (MB)，用于限制进程数')
+    parser.add_argument('--max-states', type=int, default=DEFAULT_MAX_STATES,
+                        help='估算标准型数超过该值的配置跳过')
+    parser.add_argument('--verify', action='store_true', help='复用已有表前做完整一致性校验')
+    parser.add_argument('--workdir', default=None, help='外存求解临时文件目录')
+    parser.add_argument('--telemetry', action='store_true', help='每个任务写遥测 JSON lines')
+    args = parser.parse_args()
+
+    catalog = run_batch(args.outdir, sweep(args.n, args.m), workers=args.workers,
+                        job_budget=args.budget << 20,
+                        total_memory=args.memory << 20 if args.memory else None,
+                        max_states=args.max_states, deep_check=args.verify,
+                        workdir=args.workdir, telemetry=args.telemetry)
+    print_catalog(catalog)
@@ -0,0 +1,138 @@
+"""最优走法表：每个标准型预先算好双方的最优走法
+
+make_move 原本每步要对最多 n² 个后继做标准化 + 查表 + 排序，而一个标准型的答案永远不变。
+这里离线算好写进旁表，make_move 只需一次标准化、一次查表、一次逆变换。
+
+文件格式（小端序）：8 字节记录数头 + 按 state_code 升序的 16 字节记录
+    state(8) | X 走: cell(1) value(1) depth(2) | O 走: cell(1) value(1) depth(2)
+cell 为标准型坐标下的落子位置（NO_MOVE 表示终局 / 无合法走法），value / depth 为
+走子方视角的结果（1 胜，-1 负）和步数。选择规则与各 perfect 策略的 make_move 相同：
+优先胜、步数少；必败时拖延步数。
+
+用法：
+    python -m gametree.bestmove 4 4 4 game_tree_4x4_m4.data game_tree_4x4_m4.best --workers 8
+"""
+
+import mmap
+import os
+import struct
+from multiprocessing import Pool
+
+from gametree.board import BoardConfig
+from gametree.table import KEY, TableFile
+
+ENTRY = struct.Struct('<QBbHBbH')
+NO_MOVE = 255
+DEFAULT_CHUNK = 20000
+
+# 工作进程内的全局只读状态（由 _init_worker 打开）
+_table = None
+_config = None
+
+
+def choose(moves):
+    """moves: [[cell, value, depth], ...]，规则与 make_move 相同，返回选中的一项"""
+    moves = sorted(moves, key=lambda x: (x[1], -x[2]))
+    if moves[-1][1] == -1:
+        moves.sort(key=lambda x: (x[1], x[2]))
+    return moves[-1]
+
+
+def best_moves(table, config, x, y):
+    """返回 (X 走的 (cell, value, depth), O 走的 (cell, value, depth))"""
+    if config.result(x, y):
+        return (NO_MOVE, 0, 0), (NO_MOVE, 0, 0)
+    moves = ([], [])
+    for player, cell, child in config.moves(x, y):
+        result = table.query(child)
+        if result is None:
+            value = depth = 0
+        elif player == 0:
+            value, depth = result[0][1], result[1][1]
+        else:
+            value, depth = -result[0][0], result[1][0]
+        moves[player].append([cell, value, depth])
+    return tuple(tuple(choose(m)) if m else (NO_MOVE, 0, 0) for m in moves)
+
+
+def _init_worker(path, n, m, k):
+    global _table, _config
+    _table = TableFile(path)
+    _config = BoardConfig(n, m, k)
+
+
+def _build_range(bounds):
+    start, stop = bounds
+    out = bytearray()
+    for index in range(start, stop):
+        state = _table.key(index)
+        x_move, o_move = best_moves(_table, _config, *_config.decode(state))
+        out += ENTRY.pack(state, *x_move, *o_move)
+    return bytes(out)
+
+
+def build_best_moves(src, dst, config, workers=None, chunk_size=DEFAULT_CHUNK, progress=False):
+    """由已求解的 .data 表生成最优走法表，返回记录数"""
+    with TableFile(src) as table:
+        count = len(table)
+    tasks = [(start, min(start + chunk_size, count)) for start in range(0, count, chunk_size)]
+    done = 0
+    with open(dst, 'wb') as f, \
+            Pool(workers, initializer=_init_worker, initargs=(src, config.n, config.m, config.k)) as pool:
+        f.write(struct.pack('Q', count))
+        # imap 保持任务顺序，输出仍按 state_code 升序
+        for data in pool.imap(_build_range, tasks):
+            f.write(data)
+            done += len(data) // ENTRY.size
+            if progress:
+                print(f"  已处理 {done:,}/{count:,}", end='\r')
+    if progress:
+        print()
+    return count
+
+
+class BestMoveTable:
+    """最优走法表读取（mmap + 二分查找）"""
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.num_records = struct.unpack('Q', self.mm[0:8])[0]
+
+    def lookup(self, state_code, x_to_move):
+        """返回 (cell, value, depth)，cell 为标准型坐标；不存在或无走法时返回 None"""
+        left, right = 0, self.num_records - 1
+        while left <= right:
+            mid = (left + right) // 2
+            offset = 8 + mid * ENTRY.size
+            current = KEY.unpack_from(self.mm, offset)[0]
+            if current < state_code:
+                left = mid + 1
+            elif current > state_code:
+                right = mid - 1
+            else:
+                _, c0, v0, d0, c1, v1, d1 = ENTRY.unpack_from(self.mm, offset)
+                cell, value, depth = (c0, v0, d0) if x_to_move else (c1, v1, d1)
+                return None if cell == NO_MOVE else (cell, value, depth)
+        return None
+
+    def close(self):
+        self.mm.close()
+        self.file.close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='生成最优走法表')
+    parser.add_argument('n', type=int)
+    parser.add_argument('m', type=int)
+    parser.add_argument('k', type=int)
+    parser.add_argument('src', help='已求解的 .data 表')
+    parser.add_argument('dst')
+    parser.add_argument('--workers', type=int, default=None, help='进程数（默认 CPU 核数）')
+    args = parser.parse_args()
+
+    count = build_best_moves(args.src, args.dst, BoardConfig(args.n, args.m, args.k),
+                             workers=args.workers, progress=True)
+    print(f"{count:,} 个标准型 -> {args.dst} ({os.path.getsize(args.dst):,} 字节)")
@@ -0,0 +1,189 @@
+"""通用 (n, m, K) 棋盘配置：编码、对称标准化、胜负判断、走子生成
+
+编码与各 perfect 策略的 SymmetryHelper 完全一致：
+    code = x_code * SEPARATOR + y_code，x_code = Σ (pos+1) * BASE^i（按落子先后）
+已有训练数据的 BASE / SEPARATOR 见 LEGACY_ENCODINGS，其余配置默认
+BASE = n*n + 1，SEPARATOR = BASE^m。
+"""
+
+from itertools import permutations
+
+# (n, m, K) -> (BASE, SEPARATOR)，与已发布的 .data 文件保持一致
+LEGACY_ENCODINGS = {
+    (3, 3, 3): (10, 1000),
+    (4, 3, 3): (17, 5000),
+    (4, 4, 4): (17, 17 ** 4),
+}
+
+
+def _symmetries(n):
+    """8种对称变换（顺序与 perfect4x4 的 SymmetryHelper.transforms 相同）"""
+    maps = [
+        lambda r, c: (r, c),                   # 0: 恒等
+        lambda r, c: (c, n - 1 - r),           # 1: 逆时针90°
+        lambda r, c: (n - 1 - r, n - 1 - c),   # 2: 180°
+        lambda r, c: (n - 1 - c, r),           # 3: 顺时针90°
+        lambda r, c: (r, n - 1 - c),           # 4: 水平翻转
+        lambda r, c: (n - 1 - r, c),           # 5: 垂直翻转
+        lambda r, c: (c, r),                   # 6: 主对角线翻转
+        lambda r, c: (n - 1 - c, n - 1 - r),   # 7: 副对角线翻转
+    ]
+    transforms = []
+    for f in maps:
+        trans = []
+        for p in range(n * n):
+            r, c = f(p // n, p % n)
+            trans.append(r * n + c)
+        transforms.append(trans)
+    return transforms
+
+
+class BoardConfig:
+    """一个 (n, m, K) 配置的状态空间"""
+
+    def __init__(self, n, m, k=None, base=None, separator=None):
+        self.n = n
+        self.m = m
+        self.k = k if k is not None else m
+        self.cells = n * n
+
+        legacy = LEGACY_ENCODINGS.get((n, m, self.k))
+        if base is None:
+            base = legacy[0] if legacy else self.cells + 1
+        if separator is None:
+            separator = legacy[1] if legacy else base ** m
+        self.base = base
+        self.separator = separator
+
+        self.transforms = _symmetries(n)
+        self.inv_transforms = []
+        for trans in self.transforms:
+            inv = [0] * self.cells
+            for i, t in enumerate(trans):
+                inv[t] = i
+            self.inv_transforms.append(inv)
+
+        # 所有长度为 K 的连线（位掩码），以及经过每个格子的连线
+        self.lines = []
+        for r in range(n):
+            for c in range(n):
+                for dr, dc in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                    er, ec = r + dr * (self.k - 1), c + dc * (self.k - 1)
+                    if 0 <= er < n and 0 <= ec < n:
+                        mask = 0
+                        for s in range(self.k):
+                            mask |= 1 << ((r + dr * s) * n + c + dc * s)
+                        self.lines.append(mask)
+        self.lines_through = [[line for line in self.lines if line >> p & 1]
+                              for p in range(self.cells)]
+
+    def __repr__(self):
+        return f"BoardConfig(n={self.n}, m={self.m}, k={self.k})"
+
+    @property
+    def name(self):
+        return f"{self.n}x{self.n}_m{self.m}_k{self.k}"
+
+    def encode(self, x_list, y_list):
+        """编码状态（pos+1避免0冲突）"""
+        base = self.base
+        x_code = 0
+        for pos in reversed(x_list):
+            x_code = x_code * base + pos + 1
+        y_code = 0
+        for pos in reversed(y_list):
+            y_code = y_code * base + pos + 1
+        return x_code * self.separator + y_code
+
+    def decode(self, code):
+        """解码为 (x_list, y_list)"""
+        x_code, y_code = divmod(code, self.separator)
+        x, y = [], []
+        while x_code:
+            x_code, digit = divmod(x_code, self.base)
+            x.append(digit - 1)
+        while y_code:
+            y_code, digit = divmod(y_code, self.base)
+            y.append(digit - 1)
+        return x, y
+
+    def canonicalize(self, x_list, y_list):
+        """
+        返回标准型
+        Returns: (x_canon, y_canon, trans_id, canon_code)
+        """
+        best = None
+        for trans_id, trans in enumerate(self.transforms):
+            x_trans = [trans[p] for p in x_list]
+            y_trans = [trans[p] for p in y_list]
+            code = self.encode(x_trans, y_trans)
+            if best is None or code < best[3]:
+                best = (x_trans, y_trans, trans_id, code)
+        return best
+
+    def canonical_code(self, x_list, y_list):
+        return self.canonicalize(x_list, y_list)[3]
+
+    def _has_line(self, positions):
+        mask = 0
+        for p in positions:
+            mask |= 1 << p
+        for p in positions:
+            for line in self.lines_through[p]:
+                if mask & line == line:
+                    return True
+        return False
+
+    def result(self, x_list, y_list):
+        """终局判断：1 = X 连成K子，-1 = O 连成K子，0 = 未结束（先判断 X，与训练器一致）"""
+        if len(x_list) >= self.k and self._has_line(x_list):
+            return 1
+        if len(y_list) >= self.k and self._has_line(y_list):
+            return -1
+        return 0
+
+    def is_valid(self, x_list, y_list):
+        """棋子数量关系：X 与 O 一样多，或 X 多一个"""
+        return len(x_list) == len(y_list) or len(x_list) == len(y_list) + 1
+
+    def moves(self, x_list, y_list):
+        """非终局状态的所有走法
+
+        Yields: (player, cell, child_code)，player 0 = X 落子，1 = O 落子；
+        与 GameTreeSolver.add_edge 一样丢弃数量关系非法的后继
+        """
+        occupied = set(x_list) | set(y_list)
+        for t in range(self.cells):
+            if t in occupied:
+                continue
+            x_new = x_list + [t]
+            if len(x_new) > self.m:
+                x_new = x_new[1:]
+            if self.is_valid(x_new, y_list):
+                yield 0, t, self.canonical_code(x_new, y_list)
+
+            y_new = y_list + [t]
+            if len(y_new) > self.m:
+                y_new = y_new[1:]
+            if self.is_valid(x_list, y_new):
+                yield 1, t, self.canonical_code(x_list, y_new)
+
+    def canonical_states(self):
+        """按棋子数量枚举所有标准型，每个只产出一次
+
+        只在当前排列本身就是标准型时产出，不需要全局去重集合。
+        Yields: (x_list, y_list, code)
+        """
+        cells = range(self.cells)
+        for x_count in range(self.m + 1):
+            for y_count in (x_count - 1, x_count):
+                if y_count < 0:
+                    continue
+                for x_perm in permutations(cells, x_count):
+                    x = list(x_perm)
+                    remaining = [p for p in cells if p not in x_perm]
+                    for y_perm in permutations(remaining, y_count):
+                        y = list(y_perm)
+                        code = self.encode(x, y)
+                        if code == self.canonical_code(x, y):
+                            yield x, y, code
@@ -0,0 +1,85 @@
+"""查询结果的有界 LRU 缓存
+
+实际对局反复经过同一小批标准型（开局、棋子消失造成的循环），每次都要在 mmap 上
+重新二分查找。CachedSolver 包在任意提供 query_state / query_many 的求解器外面
+（字典版 GameTreeSolver、mmap 版、RankedTable 均可），按标准型 code 缓存结果。
+
+    strategy = Strategy(game, cache_size=4096)
+    ...
+    print(strategy.solver.stats())   # hits / misses / evictions / hit_rate
+"""
+
+from collections import OrderedDict
+
+
+class CachedSolver:
+    """LRU 缓存 + 命中统计；其余属性透传给被包装的求解器
+
+    Args:
+        solver: 提供 query_state(code) / query_many(codes) 的对象
+        maxsize: 最多缓存的 code 数
+    """
+
+    def __init__(self, solver, maxsize=4096):
+        if maxsize <= 0:
+            raise ValueError("maxsize 必须为正数")
+        self.solver = solver
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def __getattr__(self, name):
+        return getattr(self.solver, name)
+
+    def _put(self, code, result):
+        self.data[code] = result
+        if len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+            self.evictions += 1
+
+    def query_state(self, state_code):
+        if state_code in self.data:
+            self.hits += 1
+            self.data.move_to_end(state_code)
+            return self.data[state_code]
+        self.misses += 1
+        result = self.solver.query_state(state_code)
+        self._put(state_code, result)
+        return result
+
+    def query_many(self, codes):
+        """命中的直接返回，未命中的合并成一次 query_many"""
+        results = [None] * len(codes)
+        missing = []
+        for i, code in enumerate(codes):
+            if code in self.data:
+                self.hits += 1
+                self.data.move_to_end(code)
+                results[i] = self.data[code]
+            else:
+                self.misses += 1
+                missing.append(i)
+        if missing:
+            fetched = self.solver.query_many([codes[i] for i in missing])
+            for i, result in zip(missing, fetched):
+                results[i] = result
+                self._put(codes[i], result)
+        return results
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self.data),
+            'maxsize': self.maxsize,
+            'hit_rate': self.hits / total if total else 0.0,
+        }
+
+    def clear(self):
+        """清空缓存和计数"""
+        self.data.clear()
+        self.hits = self.misses = self.evictions = 0
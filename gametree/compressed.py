@@ -0,0 +1,196 @@
+"""分块压缩的已求解表（zlib / lzma），支持随机访问
+
+已求解表压缩率很高（大段平局、depth 分布集中）。这里把记录按固定条数分块，
+每块按列存放后单独压缩，文件末尾保存块索引（每块首 key、偏移、长度）。
+查询时内存中 bisect 块索引，只解压命中的块，并用一个小的 LRU 缓存保存解压后的块。
+
+块内列布局（小端序）：state 相邻差值(u64) | dp0(i8) | dp1(i8) | depth0(u16) | depth1(u16)
+按列存放让同类字节相邻，差值让 key 列大部分是很小的数，压缩率远高于直接压缩 14 字节记录。
+
+文件格式：
+    HEADER  magic 'TTTZ', version, n, m, k, codec, base(4), separator(8), count(8),
+            block_records(4), blocks(4), index_offset(8)
+    各块压缩数据
+    INDEX   每块 first_key(8) offset(8) length(4)
+
+用法：
+    python -m gametree.compressed game_tree_4x4_m4.data game_tree_4x4_m4.zdata --config 4 4 4 --codec lzma
+"""
+
+import lzma
+import mmap
+import os
+import struct
+import zlib
+from array import array
+from bisect import bisect_left, bisect_right
+from collections import OrderedDict
+from itertools import accumulate
+
+from gametree.board import BoardConfig
+from gametree.table import TableFile
+
+MAGIC = b'TTTZ'
+VERSION = 1
+HEADER = struct.Struct('<4sBBBBBIQQIIQ')
+INDEX_ENTRY = struct.Struct('<QQI')
+
+CODECS = {'zlib': 0, 'lzma': 1}
+DEFAULT_BLOCK_RECORDS = 4096
+DEFAULT_CACHE_BLOCKS = 64
+
+
+def _compress(codec, data, level):
+    if codec == CODECS['lzma']:
+        return lzma.compress(data, preset=6 if level is None else level)
+    return zlib.compress(data, 9 if level is None else level)
+
+
+def _decompress(codec, data):
+    if codec == CODECS['lzma']:
+        return lzma.decompress(data)
+    return zlib.decompress(data)
+
+
+def _encode_block(records):
+    columns = [array('Q'), array('b'), array('b'), array('H'), array('H')]
+    previous = records[0][0]
+    for state, dp0, dp1, depth0, depth1 in records:
+        columns[0].append(state - previous)
+        previous = state
+        columns[1].append(dp0)
+        columns[2].append(dp1)
+        columns[3].append(depth0)
+        columns[4].append(depth1)
+    return b''.join(column.tobytes() for column in columns)
+
+
+def _decode_block(data, first_key, count):
+    """-> (keys, dp0, dp1, depth0, depth1) 五个 array"""
+    columns = []
+    offset = 0
+    for typecode in 'QbbHH':
+        column = array(typecode)
+        size = count * column.itemsize
+        column.frombytes(data[offset:offset + size])
+        offset += size
+        columns.append(column)
+    columns[0] = array('Q', accumulate(columns[0], initial=first_key))[1:]
+    return tuple(columns)
+
+
+def write_compressed(src, dst, config, codec='zlib', block_records=DEFAULT_BLOCK_RECORDS, level=None):
+    """.data 表（4 / 8 字节头）-> 分块压缩表，返回 (记录数, 块数)"""
+    codec_id = CODECS[codec]
+    index = []
+    with TableFile(src) as table, open(dst, 'wb') as f:
+        count = len(table)
+        f.write(bytes(HEADER.size))
+        for start in range(0, count, block_records):
+            records = [table.record(i) for i in range(start, min(start + block_records, count))]
+            data = _compress(codec_id, _encode_block(records), level)
+            index.append((records[0][0], f.tell(), len(data)))
+            f.write(data)
+        index_offset = f.tell()
+        for entry in index:
+            f.write(INDEX_ENTRY.pack(*entry))
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, config.n, config.m, config.k, codec_id, config.base,
+                            config.separator, count, block_records, len(index), index_offset))
+    return count, len(index)
+
+
+class CompressedTable:
+    """分块压缩表读取，接口与 GameTreeSolver.query_state / query_many 相同
+
+    Args:
+        cache_blocks: 解压后块的 LRU 缓存块数（每块约 block_records * 14 字节）
+    """
+
+    def __init__(self, path, cache_blocks=DEFAULT_CACHE_BLOCKS):
+        self.file = open(path, 'rb')
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, n, m, k, self.codec, base, separator, self.num_records,
+         self.block_records, blocks, index_offset) = HEADER.unpack_from(self.mm)
+        if magic != MAGIC or version != VERSION:
+            self.close()
+            raise ValueError(f"{path}: 不是分块压缩表")
+        self.config = BoardConfig(n, m, k, base=base, separator=separator)
+
+        self.first_keys = array('Q')
+        self.offsets = array('Q')
+        self.lengths = array('I')
+        for b in range(blocks):
+            first_key, offset, length = INDEX_ENTRY.unpack_from(self.mm, index_offset + b * INDEX_ENTRY.size)
+            self.first_keys.append(first_key)
+            self.offsets.append(offset)
+            self.lengths.append(length)
+
+        self.cache_blocks = cache_blocks
+        self.cache = OrderedDict()
+        self.decompressed = 0
+
+    def block(self, b):
+        """第 b 块解压后的列（带 LRU 缓存）"""
+        columns = self.cache.get(b)
+        if columns is not None:
+            self.cache.move_to_end(b)
+            return columns
+        start = self.offsets[b]
+        data = _decompress(self.codec, self.mm[start:start + self.lengths[b]])
+        count = min(self.block_records, self.num_records - b * self.block_records)
+        columns = _decode_block(data, self.first_keys[b], count)
+        self.decompressed += 1
+        self.cache[b] = columns
+        if len(self.cache) > self.cache_blocks:
+            self.cache.popitem(last=False)
+        return columns
+
+    def __len__(self):
+        return self.num_records
+
+    def __iter__(self):
+        """按 state_code 升序逐条给出 (state, dp0, dp1, depth0, depth1)，与 TableFile.record 相同"""
+        for b in range(len(self.first_keys)):
+            yield from zip(*self.block(b))
+
+    def query_state(self, state_code):
+        """返回 ([dp0, dp1], [depth0, depth1]) 或 None"""
+        b = bisect_right(self.first_keys, state_code) - 1
+        if b < 0:
+            return None
+        keys, dp0, dp1, depth0, depth1 = self.block(b)
+        i = bisect_left(keys, state_code)
+        if i == len(keys) or keys[i] != state_code:
+            return None
+        return [dp0[i], dp1[i]], [depth0[i], depth1[i]]
+
+    def query_many(self, codes):
+        """按 code 排序后查询，同一块的 code 相邻，每块最多解压一次"""
+        results = [None] * len(codes)
+        for i in sorted(range(len(codes)), key=codes.__getitem__):
+            results[i] = self.query_state(codes[i])
+        return results
+
+    def close(self):
+        self.mm.close()
+        self.file.close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='.data 表转换为分块压缩表')
+    parser.add_argument('src')
+    parser.add_argument('dst')
+    parser.add_argument('--config', type=int, nargs=3, metavar=('N', 'M', 'K'), required=True)
+    parser.add_argument('--codec', choices=sorted(CODECS), default='zlib')
+    parser.add_argument('--block', type=int, default=DEFAULT_BLOCK_RECORDS, help='每块记录数')
+    parser.add_argument('--level', type=int, default=None, help='压缩级别（zlib 0-9，lzma preset 0-9）')
+    args = parser.parse_args()
+
+    count, blocks = write_compressed(args.src, args.dst, BoardConfig(*args.config), codec=args.codec,
+                                     block_records=args.block, level=args.level)
+    src_size, dst_size = os.path.getsize(args.src), os.path.getsize(args.dst)
+    print(f"{count:,} 条记录，{blocks:,} 块")
+    print(f"{src_size:,} -> {dst_size:,} 字节 ({src_size / dst_size:.2f}x)")
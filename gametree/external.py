@@ -0,0 +1,460 @@
+"""外存（out-of-core）逆向求解
+
+状态表和反向边都以按 key 排序的定长记录文件保存在磁盘上，每一层 BFS 都是一次
+流式的排序-归并扫描，内存占用由 memory_budget 限制（思路与 merge_training_data.cpp
+的双指针合并相同，推广到整个求解过程）。
+
+磁盘上的记录一律用大端序打包：字节序即数值序，排序时直接比较 bytes。
+
+    状态表  STATE: code(8) dp0(1) dp1(1) depth0(2) depth1(2) need0(4) need1(4)
+    反向边  EDGE:  to(8) from(8)          （每个玩家一份，按 to 排序）
+    状态列表 CODE: code(8)                 （frontier / 候选集合）
+    输入状态 STATE_IN: code(8) result(1)   （枚举阶段 add_state 写入）
+
+用法：
+    python -m gametree.external 4 4 4 game_tree_4x4_m4.data --budget 2048 --telemetry m4.jsonl
+"""
+
+import heapq
+import os
+import shutil
+import struct
+import sys
+import tempfile
+import time
+
+from gametree.table import RECORD
+from gametree.telemetry import Telemetry
+
+STATE = struct.Struct('>QbbHHII')
+EDGE = struct.Struct('>QQ')
+CODE = struct.Struct('>Q')
+STATE_IN = struct.Struct('>Qb')
+
+# 内存中每条待排序记录的额外开销（bytes 对象头 + list 槽位）
+_BYTES_OVERHEAD = sys.getsizeof(b'') + 8
+
+DEFAULT_BUDGET = 256 * 1024 * 1024
+MAX_FAN_IN = 64
+
+
+def read_records(path, rec, buffer_size=1 << 20):
+    """顺序读取定长记录文件，逐条产出原始 bytes"""
+    size = rec.size
+    chunk = max(size, buffer_size // size * size)
+    with open(path, 'rb') as f:
+        while True:
+            data = f.read(chunk)
+            if not data:
+                break
+            for off in range(0, len(data), size):
+                yield data[off:off + size]
+
+
+class RunWriter:
+    """把定长记录攒到内存预算上限后排序，写出一个有序 run 文件"""
+
+    def __init__(self, workspace, rec, budget, unique=False):
+        self.workspace = workspace
+        self.rec = rec
+        self.capacity = max(1024, budget // (rec.size + _BYTES_OVERHEAD))
+        self.unique = unique
+        self.buffer = []
+        self.runs = []
+        self.count = 0
+
+    def add(self, *values):
+        self.buffer.append(self.rec.pack(*values))
+        self.count += 1
+        if len(self.buffer) >= self.capacity:
+            self._spill()
+
+    def _spill(self):
+        if not self.buffer:
+            return
+        self.buffer.sort()
+        path = self.workspace.new_file('run')
+        with open(path, 'wb') as f:
+            prev = None
+            for data in self.buffer:
+                if self.unique and data == prev:
+                    continue
+                f.write(data)
+                prev = data
+        self.runs.append(path)
+        self.buffer = []
+
+    def finish(self):
+        """写出剩余记录并把所有 run 归并成一个有序文件，返回路径"""
+        self._spill()
+        return self.workspace.merge(self.runs, self.rec, unique=self.unique)
+
+
+class Workspace:
+    """外存工作目录：分配临时文件、多路归并"""
+
+    def __init__(self, workdir=None, budget=DEFAULT_BUDGET):
+        # 给出 workdir 时也在其下新建独立子目录：同一 workdir 上并行的多个求解（run_batch）
+        # 各自从 run_000001 编号，共用目录会互相覆盖 run 文件
+        if workdir is not None:
+            os.makedirs(workdir, exist_ok=True)
+        self.dir = tempfile.mkdtemp(prefix='gametree_', dir=workdir)
+        self.budget = budget
+        self.counter = 0
+
+    def new_file(self, prefix):
+        self.counter += 1
+        return os.path.join(self.dir, f'{prefix}_{self.counter:06d}.bin')
+
+    def remove(self, path):
+        if path and os.path.exists(path):
+            os.remove(path)
+
+    def runs(self, rec, unique=False, budget=None):
+        return RunWriter(self, rec, budget or self.budget, unique=unique)
+
+    def merge(self, paths, rec, unique=False):
+        """多路归并有序 run 文件；超过 MAX_FAN_IN 时分多趟"""
+        if not paths:
+            path = self.new_file('empty')
+            open(path, 'wb').close()
+            return path
+        while len(paths) > 1:
+            merged = []
+            for i in range(0, len(paths), MAX_FAN_IN):
+                group = paths[i:i + MAX_FAN_IN]
+                if len(group) == 1:
+                    merged.append(group[0])
+                    continue
+                buffer_size = max(64 * 1024, self.budget // (len(group) + 1))
+                out = self.new_file('merge')
+                with open(out, 'wb') as f:
+                    prev = None
+                    streams = [read_records(p, rec, buffer_size) for p in group]
+                    for data in heapq.merge(*streams):
+                        if unique and data == prev:
+                            continue
+                        f.write(data)
+                        prev = data
+                for p in group:
+                    self.remove(p)
+                merged.append(out)
+            paths = merged
+        return paths[0]
+
+    def cleanup(self):
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+def _codes(path, buffer_size):
+    for data in read_records(path, CODE, buffer_size):
+        yield CODE.unpack(data)[0]
+
+
+def _join(codes, edges_path, buffer_size):
+    """有序 code 流与按 to 排序的反向边做归并连接，产出匹配边的 from"""
+    key = next(codes, None)
+    if key is None:
+        return
+    for data in read_records(edges_path, EDGE, buffer_size):
+        to, frm = EDGE.unpack(data)
+        while key is not None and key < to:
+            key = next(codes, None)
+        if key is None:
+            return
+        if key == to:
+            yield frm
+
+
+def _dedup_states(path, buffer_size):
+    """有序 (code, result) 流去重；同一 code 的多条记录中终局标记优先
+
+    大端打包下 result 的字节序为 0 < 1 < -1(0xFF)，保留每组最后一条即可。
+    """
+    pending = None
+    for data in read_records(path, STATE_IN, buffer_size):
+        item = STATE_IN.unpack(data)
+        if pending is not None and pending[0] != item[0]:
+            yield pending
+        pending = item
+    if pending is not None:
+        yield pending
+
+
+def _grouped(codes):
+    """有序（含重复）code 流 -> (code, 重复次数)"""
+    prev, cnt = None, 0
+    for code in codes:
+        if code == prev:
+            cnt += 1
+            continue
+        if prev is not None:
+            yield prev, cnt
+        prev, cnt = code, 1
+    if prev is not None:
+        yield prev, cnt
+
+
+class ExternalSolver:
+    """外存版 GameTreeSolver：add_state/add_edge 只追加写 run 文件，solve() 逐层归并
+
+    Args:
+        memory_budget: 排序缓冲与归并缓冲的总字节数上限
+        workdir: 临时文件放在其下新建的子目录中（默认系统临时目录），结束后删除该子目录
+    """
+
+    def __init__(self, memory_budget=DEFAULT_BUDGET, workdir=None):
+        self.ws = Workspace(workdir, memory_budget)
+        self.buffer_size = max(64 * 1024, memory_budget // 16)
+        # 枚举阶段 5 个 run 写入器同时存在，平分预算
+        share = memory_budget // 5
+        self.states = self.ws.runs(STATE_IN, budget=share)
+        self.need = [self.ws.runs(CODE, budget=share), self.ws.runs(CODE, budget=share)]
+        self.rev = [self.ws.runs(EDGE, budget=share), self.ws.runs(EDGE, budget=share)]
+        self.table = None
+        self.num_states = 0
+        self.stats = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.ws.cleanup()
+
+    def add_state(self, state, result=0):
+        """添加状态；result = 1 / -1 表示 X / O 已连成K子的终局"""
+        self.states.add(state, result)
+
+    def add_edge(self, from_state, to_state, player):
+        """添加边（调用方保证 to_state 也会通过 add_state 加入）"""
+        self.need[player].add(from_state)
+        self.rev[player].add(to_state, from_state)
+
+    def _build(self):
+        """归并 run 文件，生成有序状态表和两份有序反向边"""
+        states = self.states.finish()
+        need_paths = [self.need[0].finish(), self.need[1].finish()]
+        need0 = _grouped(_codes(need_paths[0], self.buffer_size))
+        need1 = _grouped(_codes(need_paths[1], self.buffer_size))
+        self.rev = [self.rev[0].finish(), self.rev[1].finish()]
+
+        table = self.ws.new_file('state')
+        frontiers = {1: self.ws.new_file('frontier'), -1: self.ws.new_file('frontier')}
+        n0 = next(need0, None)
+        n1 = next(need1, None)
+        count = 0
+        with open(table, 'wb') as out, \
+                open(frontiers[1], 'wb') as fw, open(frontiers[-1], 'wb') as fl:
+            for code, result in _dedup_states(states, self.buffer_size):
+                c0 = c1 = 0
+                if n0 is not None and n0[0] == code:
+                    c0 = n0[1]
+                    n0 = next(need0, None)
+                if n1 is not None and n1[0] == code:
+                    c1 = n1[1]
+                    n1 = next(need1, None)
+                out.write(STATE.pack(code, result, result, 0, 0, c0, c1))
+                if result == 1:
+                    fw.write(CODE.pack(code))
+                elif result == -1:
+                    fl.write(CODE.pack(code))
+                count += 1
+        for path in [states] + need_paths:
+            self.ws.remove(path)
+        self.table = table
+        self.num_states = count
+        return frontiers
+
+    def _update(self, items, apply):
+        """有序 (code, cnt) 流与状态表归并，重写状态表
+
+        apply(record_list, cnt) 原地修改记录，返回 True 表示该状态的 dp 刚被确定，
+        这些 code 依次写入返回的有序文件。
+        """
+        out_table = self.ws.new_file('state')
+        out_codes = self.ws.new_file('codes')
+        item = next(items, None)
+        updated = 0
+        with open(out_table, 'wb') as ft, open(out_codes, 'wb') as fc:
+            for data in read_records(self.table, STATE, self.buffer_size):
+                if item is not None:
+                    code = STATE.unpack_from(data)[0]
+                    while item is not None and item[0] < code:
+                        item = next(items, None)
+                    if item is not None and item[0] == code:
+                        rec = list(STATE.unpack(data))
+                        if apply(rec, item[1]):
+                            fc.write(CODE.pack(code))
+                            updated += 1
+                        data = STATE.pack(*rec)
+                        item = next(items, None)
+                ft.write(data)
+        self.ws.remove(self.table)
+        self.table = out_table
+        return out_codes, updated
+
+    def _propagate(self, frontier, a, value, on_layer=None):
+        """单方向逐层传播（语义与 GameTreeSolver.solve 相同）
+
+        on_layer(layer, frontier_size, y_count, z_count) 在每层结束时调用
+        """
+        b = 1 - a
+        rev_in, rev_out = self.rev[a], self.rev[b]
+        d = 0
+        layer = 0
+        total = 0
+        while os.path.getsize(frontier):
+            frontier_size = os.path.getsize(frontier) // CODE.size
+            # y：a 方一步可走进 frontier
+            ys = self.ws.runs(CODE, unique=True)
+            for frm in _join(_codes(frontier, self.buffer_size), rev_in, self.buffer_size):
+                ys.add(frm)
+            ys_path = ys.finish()
+
+            def set_y(rec, _):
+                if rec[1 + a] == value:
+                    return False
+                rec[1 + a] = value
+                rec[3 + a] = d + 1
+                return True
+
+            y_path, y_count = self._update(_grouped(_codes(ys_path, self.buffer_size)), set_y)
+            self.ws.remove(ys_path)
+
+            # z：对方的所有走法都进入已确定的 y
+            zs = self.ws.runs(CODE)
+            for frm in _join(_codes(y_path, self.buffer_size), rev_out, self.buffer_size):
+                zs.add(frm)
+            zs_path = zs.finish()
+            self.ws.remove(y_path)
+
+            def set_z(rec, cnt):
+                rec[5 + b] -= cnt
+                if rec[5 + b] != 0:
+                    return False
+                rec[1 + b] = value
+                rec[3 + b] = d + 2
+                return True
+
+            self.ws.remove(frontier)
+            frontier, z_count = self._update(_grouped(_codes(zs_path, self.buffer_size)), set_z)
+            self.ws.remove(zs_path)
+
+            if on_layer is not None:
+                on_layer(layer, frontier_size, y_count, z_count)
+            total += y_count + z_count
+            d += 2
+            layer += 1
+        self.ws.remove(frontier)
+        return total, layer
+
+    def solve(self, debug=False, on_layer=None, telemetry=None):
+        """外存求解
+
+        Args:
+            on_layer: 可选回调 on_layer(phase, layer, y_count, z_count)
+            telemetry: 可选 gametree.telemetry.Telemetry，记录阶段耗时和每层 frontier
+        """
+        if telemetry is None:
+            telemetry = Telemetry()
+
+        start = time.time()
+        with telemetry.phase('reverse_edges') as ph:
+            frontiers = self._build()
+            ph['states'] = self.num_states
+            ph['edges'] = sum(os.path.getsize(path) for path in self.rev) // EDGE.size
+        if debug:
+            print(f"  状态表构建完成: {self.num_states:,} 个状态 ({time.time() - start:.1f}秒)")
+
+        def hook(phase, name):
+            def report(layer, frontier, ys, zs):
+                if debug:
+                    print(f"    [{phase}] 第{layer}层: y={ys:,} z={zs:,}")
+                if on_layer is not None:
+                    on_layer(phase, layer, ys, zs)
+                telemetry.layer(name, layer, frontier, y=ys, z=zs)
+            return report
+
+        with telemetry.phase('win_propagation') as ph:
+            win_count, win_layers = self._propagate(frontiers[1], 0, 1,
+                                                    hook('win', 'win_propagation'))
+            ph['states'] = win_count
+            ph['layers'] = win_layers
+        if debug:
+            print(f"  win传播更新了 {win_count} 次（{win_layers} 层）")
+        with telemetry.phase('loss_propagation') as ph:
+            lose_count, lose_layers = self._propagate(frontiers[-1], 1, -1,
+                                                      hook('lose', 'loss_propagation'))
+            ph['states'] = lose_count
+            ph['layers'] = lose_layers
+        if debug:
+            print(f"  lose传播更新了 {lose_count} 次（{lose_layers} 层）")
+
+        self.stats = {
+            'states': self.num_states,
+            'win_updates': win_count,
+            'lose_updates': lose_count,
+            'layers': max(win_layers, lose_layers),
+        }
+
+    def records(self):
+        """按 state_code 升序产出 (code, dp0, dp1, depth0, depth1)"""
+        for data in read_records(self.table, STATE, self.buffer_size):
+            yield STATE.unpack(data)[:5]
+
+    def save_training_data(self, filename):
+        """流式写出 8 字节头 + 14 字节记录格式（与 C++ 训练器 / load_training_data_mmap 相同）"""
+        with open(filename, 'wb') as f:
+            f.write(struct.pack('Q', self.num_states))
+            for rec in self.records():
+                f.write(RECORD.pack(*rec))
+
+
+def train_external(config, filename, memory_budget=DEFAULT_BUDGET, workdir=None, debug=False,
+                   telemetry=None):
+    """枚举 config 的全部标准型并用外存模式求解，结果写入 filename"""
+    if telemetry is None:
+        telemetry = Telemetry()
+    with ExternalSolver(memory_budget, workdir) as solver:
+        with telemetry.phase('enumerate') as ph:
+            states = edges = 0
+            for x, y, code in config.canonical_states():
+                result = config.result(x, y)
+                solver.add_state(code, result)
+                states += 1
+                if result:
+                    continue
+                for player, _, child in config.moves(x, y):
+                    solver.add_edge(code, child, player)
+                    edges += 1
+            ph['states'] = states
+            ph['edges'] = edges
+        solver.solve(debug=debug, telemetry=telemetry)
+        with telemetry.phase('save') as ph:
+            solver.save_training_data(filename)
+            ph['states'] = solver.num_states
+        return solver.stats
+
+
+if __name__ == '__main__':
+    import argparse
+    from gametree.board import BoardConfig
+
+    parser = argparse.ArgumentParser(description='外存模式训练')
+    parser.add_argument('n', type=int)
+    parser.add_argument('m', type=int)
+    parser.add_argument('k', type=int)
+    parser.add_argument('output')
+    parser.add_argument('--budget', type=int, default=DEFAULT_BUDGET >> 20, help='内存预算 (MB)')
+    parser.add_argument('--workdir', default=None, help='临时文件目录（默认系统临时目录）')
+    parser.add_argument('--telemetry', default=None, help='遥测 JSON lines 输出文件')
+    args = parser.parse_args()
+
+    config = BoardConfig(args.n, args.m, args.k)
+    telemetry = Telemetry(args.telemetry, config=config.name, backend='external',
+                          budget_mb=args.budget)
+    t0 = time.time()
+    stats = train_external(config, args.output, memory_budget=args.budget << 20,
+                           workdir=args.workdir, debug=True, telemetry=telemetry)
+    telemetry.close()
+    print(f"完成: {stats} 耗时 {time.time() - t0:.1f}秒 -> {args.output}")
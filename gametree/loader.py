@@ -0,0 +1,56 @@
+"""按文件格式打开已求解表
+
+同一张表可以有几种存放格式，接口都与 GameTreeSolver.query_state / query_many 相同：
+    .rank   稠密排名表（gametree.ranked）
+    .tt2    v2 自描述按位压缩表（gametree.packed）
+    .zdata  分块压缩表（gametree.compressed）
+    .data   14 字节记录表，由各 Perfect 策略自己的 GameTreeSolver 加载（mmap + fence，
+            可挂载共享内存、可继续训练）
+格式按文件头的 magic 识别，不看扩展名。各 Perfect 策略启动时调用 find_table，
+策略目录下有其他格式的表就直接使用，没有时再加载 .data。
+
+    table = find_table(class_dir, 'game_tree_4x4_m4')   # 没有其他格式时返回 None
+"""
+
+import os
+
+from gametree.compressed import MAGIC as COMPRESSED_MAGIC
+from gametree.packed import MAGIC as PACKED_MAGIC
+from gametree.ranked import MAGIC as RANKED_MAGIC
+
+FORMATS = {RANKED_MAGIC: 'ranked', PACKED_MAGIC: 'packed', COMPRESSED_MAGIC: 'compressed'}
+# 同一张表有多种格式时的优先顺序
+SUFFIXES = ('.rank', '.tt2', '.zdata')
+
+
+def detect_format(path):
+    """'ranked'、'packed'、'compressed'，其他（4 / 8 字节头的 .data）为 'data'"""
+    with open(path, 'rb') as f:
+        magic = f.read(4)
+    return FORMATS.get(magic, 'data')
+
+
+def open_table(path):
+    """按格式打开表；.data 返回 None（由调用方的 GameTreeSolver 加载）"""
+    kind = detect_format(path)
+    if kind == 'ranked':
+        from gametree.ranked import RankedTable
+        return RankedTable(path)
+    if kind == 'packed':
+        from gametree.packed import PackedTable
+        return PackedTable(path)
+    if kind == 'compressed':
+        from gametree.compressed import CompressedTable
+        return CompressedTable(path)
+    return None
+
+
+def find_table(directory, stem):
+    """打开 directory 下 stem + SUFFIXES 中第一个存在的表；都不存在时返回 None"""
+    for suffix in SUFFIXES:
+        path = os.path.join(directory, stem + suffix)
+        if os.path.exists(path):
+            table = open_table(path)
+            if table is not None:
+                return table
+    return None
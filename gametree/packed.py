@@ -0,0 +1,274 @@
+"""自描述、按位压缩的已求解表格式（v2）
+
+旧格式的问题：记录数头有 4 字节 'I'（perfect3x3、旧版 perfect4x4_m3 的 save_training_data）
+和 8 字节 'Q'（C++ 训练器、load_training_data_mmap）两种，文件里不记录配置，
+dp ∈ {-1, 0, 1} 各占 1 字节，depth 各占 2 字节。
+
+文件格式（小端序）：
+    HEADER  magic 'TTT2', version(2), n, m, k, symmetry, key_bytes, depth_bits,
+            base(4), separator(8), count(8), checksum(4)
+    keys    count 个 key_bytes 字节的 state_code，升序
+    values  位流，每条记录 4 + 2 * depth_bits 位（从低位起）：
+            dp0 + 1 (2 位) | dp1 + 1 (2 位) | depth0 | depth1
+checksum 为 HEADER 之后全部字节的 CRC32。depth 用定宽而不用 varint，
+是为了保持按下标随机访问（第 i 条值就在第 i * 位宽 位）。
+symmetry：0 表示存的是原始状态，1 表示存的是 8 种对称变换下的标准型（最小 code）。
+
+3x3 的 14 字节记录变为 3 + 1.5 字节左右，4x4 的变为 5 + 2 字节左右。
+
+用法：
+    python -m gametree.packed strategies/perfect3x3/game_tree_optimized.data game_tree_3x3.tt2 --config 3 3 3
+    python -m gametree.packed game_tree_3x3.rank game_tree_3x3.tt2       # 稠密排名表、分块压缩表自带配置
+    python -m gametree.packed --info game_tree_3x3.tt2 --check
+"""
+
+import mmap
+import os
+import struct
+import zlib
+
+from gametree.board import BoardConfig
+from gametree.table import TableFile
+
+MAGIC = b'TTT2'
+VERSION = 2
+HEADER = struct.Struct('<4sHBBBBBBIQQI')
+
+SYMMETRY_NONE = 0
+SYMMETRY_DIHEDRAL = 1
+
+# 写入时每攒够这么多字节刷一次
+WRITE_CHUNK = 1 << 16
+
+
+class _DataRecords:
+    """.data 表的记录序列（可重复迭代，write_packed 需要扫描两遍）"""
+
+    def __init__(self, table):
+        self.table = table
+
+    def __len__(self):
+        return len(self.table)
+
+    def __iter__(self):
+        return (self.table.record(i) for i in range(len(self.table)))
+
+
+def records_from_dicts(dp, depth):
+    """字典版 GameTreeSolver 的 dp / depth -> 按 state_code 排序的记录列表"""
+    return [(state, dp[state][0], dp[state][1], depth[state][0], depth[state][1])
+            for state in sorted(dp)]
+
+
+def write_packed(dst, config, records, symmetry=SYMMETRY_DIHEDRAL):
+    """写 v2 表，返回记录数
+
+    Args:
+        records: 按 state_code 升序的 (state, dp0, dp1, depth0, depth1)，需可迭代两遍
+            （第一遍求 key / depth 位宽）
+    """
+    count = 0
+    max_key = max_depth = 0
+    previous = -1
+    for state, _, _, depth0, depth1 in records:
+        if state <= previous:
+            raise ValueError(f"记录未按 state_code 严格升序：{previous} 之后是 {state}")
+        previous = state
+        max_key = state
+        max_depth = max(max_depth, depth0, depth1)
+        count += 1
+    key_bytes = max(1, -(-max_key.bit_length() // 8))
+    depth_bits = max(1, max_depth.bit_length())
+    record_bits = 4 + 2 * depth_bits
+
+    checksum = 0
+    with open(dst, 'wb') as f:
+        f.write(bytes(HEADER.size))
+        buf = bytearray()
+        for record in records:
+            buf += record[0].to_bytes(key_bytes, 'little')
+            if len(buf) >= WRITE_CHUNK:
+                checksum = zlib.crc32(buf, checksum)
+                f.write(buf)
+                buf.clear()
+
+        acc = bits = 0
+        for _, dp0, dp1, depth0, depth1 in records:
+            acc |= (dp0 + 1 | (dp1 + 1) << 2 | depth0 << 4 | depth1 << (4 + depth_bits)) << bits
+            bits += record_bits
+            # 累加器保持很短（大整数移位代价与长度成正比），整 64 字节移入 buf
+            if bits >= 512:
+                buf += (acc & ((1 << 512) - 1)).to_bytes(64, 'little')
+                acc >>= 512
+                bits -= 512
+                if len(buf) >= WRITE_CHUNK:
+                    checksum = zlib.crc32(buf, checksum)
+                    f.write(buf)
+                    buf.clear()
+        buf += acc.to_bytes(-(-bits // 8), 'little')
+        checksum = zlib.crc32(buf, checksum)
+        f.write(buf)
+
+        f.seek(0)
+        f.write(HEADER.pack(MAGIC, VERSION, config.n, config.m, config.k, symmetry, key_bytes,
+                            depth_bits, config.base, config.separator, count, checksum))
+    return count
+
+
+def convert(src, dst, config=None):
+    """任意已有格式 -> v2，返回 (配置, 记录数)
+
+    .data 不含配置，必须给出 config；稠密排名表、分块压缩表和 v2 表用文件里的配置。
+    """
+    from gametree.loader import detect_format
+    kind = detect_format(src)
+    if kind == 'data':
+        if config is None:
+            raise ValueError(f"{src}: .data 表不含配置，需要指定 n m k")
+        with TableFile(src) as table:
+            return config, write_packed(dst, config, _DataRecords(table))
+    if kind == 'ranked':
+        from gametree.ranked import RankedTable
+        table = RankedTable(src)
+        try:
+            # 排名表按 rank 顺序存放，需要按 state_code 重新排序
+            records = sorted(table.records())
+            return table.config, write_packed(dst, table.config, records)
+        finally:
+            table.close()
+    if kind == 'compressed':
+        from gametree.compressed import CompressedTable
+        table = CompressedTable(src)
+        try:
+            return table.config, write_packed(dst, table.config, table)
+        finally:
+            table.close()
+    with PackedTable(src) as table:
+        return table.config, write_packed(dst, table.config, table, table.symmetry)
+
+
+class PackedTable:
+    """v2 表读取（mmap + 二分查找），接口与 GameTreeSolver.query_state / query_many 相同
+
+    Args:
+        check: 打开时校验 CRC32（需要把整个文件读一遍）
+    """
+
+    def __init__(self, path, check=False):
+        self.path = path
+        self.file = open(path, 'rb')
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        if len(self.mm) < HEADER.size:
+            self.close()
+            raise ValueError(f"{path}: 文件过短，不是 v2 表")
+        (magic, version, n, m, k, self.symmetry, self.key_bytes, self.depth_bits,
+         base, separator, self.num_records, self.checksum) = HEADER.unpack_from(self.mm)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{path}: 不是 v2 表")
+        if version != VERSION:
+            self.close()
+            raise ValueError(f"{path}: 不支持的版本 {version}")
+        self.config = BoardConfig(n, m, k, base=base, separator=separator)
+        self.record_bits = 4 + 2 * self.depth_bits
+        self.values_offset = HEADER.size + self.num_records * self.key_bytes
+        expected = self.values_offset + -(-self.num_records * self.record_bits // 8)
+        if len(self.mm) != expected:
+            self.close()
+            raise ValueError(f"{path}: 文件大小 {os.path.getsize(path)} 与头部不符（应为 {expected}）")
+        if check and not self.verify():
+            self.close()
+            raise ValueError(f"{path}: 校验和不符")
+
+    def verify(self):
+        """重新计算 CRC32 并与头部比较"""
+        return zlib.crc32(memoryview(self.mm)[HEADER.size:]) == self.checksum
+
+    def __len__(self):
+        return self.num_records
+
+    def key(self, index):
+        offset = HEADER.size + index * self.key_bytes
+        return int.from_bytes(self.mm[offset:offset + self.key_bytes], 'little')
+
+    def value(self, index):
+        """(dp0, dp1, depth0, depth1)"""
+        bit = index * self.record_bits
+        start = self.values_offset + (bit >> 3)
+        stop = self.values_offset + ((bit + self.record_bits + 7) >> 3)
+        v = int.from_bytes(self.mm[start:stop], 'little') >> (bit & 7)
+        mask = (1 << self.depth_bits) - 1
+        return (v & 3) - 1, (v >> 2 & 3) - 1, v >> 4 & mask, v >> (4 + self.depth_bits) & mask
+
+    def record(self, index):
+        """(state, dp0, dp1, depth0, depth1)，与 TableFile.record 相同"""
+        return (self.key(index), *self.value(index))
+
+    def __iter__(self):
+        return (self.record(i) for i in range(self.num_records))
+
+    def find(self, state_code):
+        """返回记录下标，不存在时返回 -1"""
+        left, right = 0, self.num_records - 1
+        while left <= right:
+            mid = (left + right) // 2
+            current = self.key(mid)
+            if current < state_code:
+                left = mid + 1
+            elif current > state_code:
+                right = mid - 1
+            else:
+                return mid
+        return -1
+
+    def query_state(self, state_code):
+        """返回 ([dp0, dp1], [depth0, depth1]) 或 None"""
+        index = self.find(state_code)
+        if index < 0:
+            return None
+        dp0, dp1, depth0, depth1 = self.value(index)
+        return [dp0, dp1], [depth0, depth1]
+
+    def query_many(self, codes):
+        return [self.query_state(code) for code in codes]
+
+    def close(self):
+        self.mm.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='已求解表转换为 v2 格式 / 查看 v2 表信息')
+    parser.add_argument('src')
+    parser.add_argument('dst', nargs='?')
+    parser.add_argument('--config', type=int, nargs=3, metavar=('N', 'M', 'K'),
+                        help='.data 表的配置（其他格式自带）')
+    parser.add_argument('--info', action='store_true', help='只显示 src（v2 表）的头部信息')
+    parser.add_argument('--check', action='store_true', help='校验 CRC32')
+    args = parser.parse_args()
+
+    if args.info:
+        with PackedTable(args.src, check=args.check) as table:
+            print(f"配置 {table.config.name}，base {table.config.base}，separator {table.config.separator}")
+            print(f"记录 {len(table):,}，key {table.key_bytes} 字节，depth {table.depth_bits} 位，"
+                  f"对称 {'标准型' if table.symmetry == SYMMETRY_DIHEDRAL else '无'}")
+            if args.check:
+                print("校验和正确")
+    else:
+        if args.dst is None:
+            parser.error('需要 dst')
+        config = BoardConfig(*args.config) if args.config else None
+        config, count = convert(args.src, args.dst, config)
+        if args.check:
+            PackedTable(args.dst, check=True).close()
+        src_size, dst_size = os.path.getsize(args.src), os.path.getsize(args.dst)
+        print(f"{config.name}: {count:,} 条记录")
+        print(f"{src_size:,} -> {dst_size:,} 字节 ({src_size / dst_size:.2f}x)")
@@ -0,0 +1,253 @@
+"""稠密排名表：不存 state_code，按组合排名（perfect indexing）直接定位
+
+排名：所有合法的有序放置 (x, y) 按 (X 数, O 数) 分组（顺序与 count_placements 相同），
+组内 rank = rank(x 在 n² 个格子中的排列) * P(n² - |x|, |y|) + rank(y 在剩余格子中的排列)。
+排列 rank 用 Lehmer 编码，一次查询只是几次位运算和加乘。
+
+标准型只占所有放置的约 1/8，所以用位图标记哪些 rank 是表中的标准型，
+再配一个每 512 位一项的前缀计数目录：值下标 = 目录[块] + 块内 popcount（rank/select）。
+
+文件格式（小端序）：
+    HEADER    magic 'TTTR', version, n, m, k, depth_bytes, base(4), separator(8), placements(8), states(8)
+    bitmap    ceil(placements / 512) * 64 字节
+    directory 每 512 位一个 u32：该块之前的置位数
+    values    states 条：dp 字节 = (dp0+1)*3 + (dp1+1)，depth0 / depth1 各 depth_bytes 字节
+
+每个状态 1 bit * 8（对称）+ 3 或 5 字节，原 .data 为 14 字节。
+
+用法：
+    python -m gametree.ranked 3 3 3 strategies/perfect3x3/game_tree_optimized.data game_tree_3x3.rank
+"""
+
+import mmap
+import os
+import struct
+from math import perm
+
+from gametree.board import BoardConfig
+from gametree.table import TableFile
+
+MAGIC = b'TTTR'
+VERSION = 1
+HEADER = struct.Struct('<4sBBBBBIQQQ')
+BLOCK_BITS = 512
+DIRECTORY = struct.Struct('<I')
+
+
+class StateRanker:
+    """(x, y) 有序放置 <-> [0, placements) 的双射"""
+
+    def __init__(self, n, m):
+        self.cells = n * n
+        self.m = m
+        self.groups = {}
+        total = 0
+        for x_count in range(m + 1):
+            for y_count in (x_count - 1, x_count):
+                if y_count < 0:
+                    continue
+                y_size = perm(self.cells - x_count, y_count)
+                self.groups[x_count, y_count] = (total, y_size)
+                total += perm(self.cells, x_count) * y_size
+        self.placements = total
+        # weights[pool][k] = 排列第 i 位（还剩 k 位）的权重 P(pool-1-i, k-1-i)
+        self.weights = {pool: [[perm(max(pool - 1 - i, 0), k - 1 - i) for i in range(k)]
+                               for k in range(m + 1)]
+                        for pool in range(self.cells - m, self.cells + 1)}
+
+    def rank(self, x_list, y_list):
+        """返回 rank；不是合法放置（数量关系、越界、重叠）时返回 -1
+
+        用位掩码 popcount 求 Lehmer 编码：第 i 位的数字 = p - 之前已用且小于 p 的格子数。
+        """
+        group = self.groups.get((len(x_list), len(y_list)))
+        if group is None:
+            return -1
+        offset, y_size = group
+        cells = self.cells
+
+        x_rank = 0
+        used = 0
+        for p, w in zip(x_list, self.weights[cells][len(x_list)]):
+            if p < 0 or p >= cells:
+                return -1
+            bit = 1 << p
+            if used & bit:
+                return -1
+            x_rank += (p - (used & (bit - 1)).bit_count()) * w
+            used |= bit
+
+        # y 只能落在 x 之外的格子上，重新编号为剩余格子中的序号
+        x_used = used
+        y_rank = 0
+        used = 0
+        for p, w in zip(y_list, self.weights[cells - len(x_list)][len(y_list)]):
+            if p < 0 or p >= cells:
+                return -1
+            bit = 1 << p
+            if x_used & bit:
+                return -1
+            label = p - (x_used & (bit - 1)).bit_count()
+            label_bit = 1 << label
+            if used & label_bit:
+                return -1
+            y_rank += (label - (used & (label_bit - 1)).bit_count()) * w
+            used |= label_bit
+        return offset + x_rank * y_size + y_rank
+
+    def unrank(self, r):
+        """rank -> (x_list, y_list)，rank 的逆运算"""
+        for (x_count, y_count), (offset, y_size) in self.groups.items():
+            size = perm(self.cells, x_count) * y_size
+            if offset <= r < offset + size:
+                break
+        else:
+            raise ValueError(f"rank {r} 超出范围")
+        x_rank, y_rank = divmod(r - offset, y_size)
+        x_list = self._unrank_perm(x_rank, list(range(self.cells)), x_count)
+        rest = [p for p in range(self.cells) if p not in x_list]
+        return x_list, self._unrank_perm(y_rank, rest, y_count)
+
+    def _unrank_perm(self, rank, labels, k):
+        out = []
+        for w in self.weights[len(labels)][k]:
+            digit, rank = divmod(rank, w)
+            out.append(labels.pop(digit))
+        return out
+
+
+def _select(bitmap, directory, r):
+    """rank -> 值下标；该 rank 不在表中时返回 -1"""
+    if not bitmap[r >> 3] >> (r & 7) & 1:
+        return -1
+    block = r // BLOCK_BITS
+    base = DIRECTORY.unpack_from(directory, block * DIRECTORY.size)[0]
+    start = block * BLOCK_BITS // 8
+    word = int.from_bytes(bitmap[start:(r >> 3) + 1], 'little')
+    return base + (word & ((1 << (r - block * BLOCK_BITS)) - 1)).bit_count()
+
+
+def _pack_dp(dp0, dp1):
+    return (dp0 + 1) * 3 + dp1 + 1
+
+
+def _unpack_dp(byte):
+    return byte // 3 - 1, byte % 3 - 1
+
+
+def write_ranked_table(src, dst, config):
+    """把 .data 表（4 / 8 字节头均可）转换为稠密排名表，返回 (placements, states)
+
+    两遍扫描源表：第一遍置位并统计最大 depth，第二遍按目录把值写到下标处。
+    内存占用约为 位图 + 值数组。
+    """
+    ranker = StateRanker(config.n, config.m)
+    blocks = -(-ranker.placements // BLOCK_BITS)
+    bitmap = bytearray(blocks * BLOCK_BITS // 8)
+    max_depth = 0
+    with TableFile(src) as table:
+        states = len(table)
+        for i in range(states):
+            state, _, _, depth0, depth1 = table.record(i)
+            r = ranker.rank(*config.decode(state))
+            if r < 0:
+                raise ValueError(f"{src}: 第 {i} 条记录 {state} 不是 {config.name} 的合法状态")
+            bitmap[r >> 3] |= 1 << (r & 7)
+            max_depth = max(max_depth, depth0, depth1)
+        if states >= 1 << 32:
+            raise ValueError("状态数超过目录 u32 范围")
+
+        directory = bytearray(blocks * DIRECTORY.size)
+        count = 0
+        block_bytes = BLOCK_BITS // 8
+        for b in range(blocks):
+            DIRECTORY.pack_into(directory, b * DIRECTORY.size, count)
+            count += int.from_bytes(bitmap[b * block_bytes:(b + 1) * block_bytes], 'little').bit_count()
+
+        depth_bytes = 1 if max_depth < 256 else 2
+        value = struct.Struct('<BBB' if depth_bytes == 1 else '<BHH')
+        values = bytearray(states * value.size)
+        for i in range(states):
+            state, dp0, dp1, depth0, depth1 = table.record(i)
+            index = _select(bitmap, directory, ranker.rank(*config.decode(state)))
+            value.pack_into(values, index * value.size, _pack_dp(dp0, dp1), depth0, depth1)
+
+    with open(dst, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, VERSION, config.n, config.m, config.k, depth_bytes,
+                            config.base, config.separator, ranker.placements, states))
+        f.write(bitmap)
+        f.write(directory)
+        f.write(values)
+    return ranker.placements, states
+
+
+class RankedTable:
+    """稠密排名表读取（mmap），接口与 GameTreeSolver.query_state / query_many 相同"""
+
+    def __init__(self, path):
+        self.file = open(path, 'rb')
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, version, n, m, k, depth_bytes, base, separator, placements, states = \
+            HEADER.unpack_from(self.mm)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path}: 不是稠密排名表")
+        self.config = BoardConfig(n, m, k, base=base, separator=separator)
+        self.ranker = StateRanker(n, m)
+        self.num_records = states
+        self.value = struct.Struct('<BBB' if depth_bytes == 1 else '<BHH')
+
+        blocks = -(-placements // BLOCK_BITS)
+        start = HEADER.size
+        self.bitmap = memoryview(self.mm)[start:start + blocks * BLOCK_BITS // 8]
+        start += len(self.bitmap)
+        self.directory = memoryview(self.mm)[start:start + blocks * DIRECTORY.size]
+        self.values_offset = start + len(self.directory)
+
+    def query_state(self, state_code):
+        """返回 ([dp0, dp1], [depth0, depth1]) 或 None"""
+        r = self.ranker.rank(*self.config.decode(state_code))
+        if r < 0:
+            return None
+        index = _select(self.bitmap, self.directory, r)
+        if index < 0:
+            return None
+        dp, depth0, depth1 = self.value.unpack_from(self.mm, self.values_offset + index * self.value.size)
+        return list(_unpack_dp(dp)), [depth0, depth1]
+
+    def query_many(self, codes):
+        return [self.query_state(code) for code in codes]
+
+    def records(self):
+        """按 rank 顺序（不是 state_code 顺序）产生 (state, dp0, dp1, depth0, depth1)"""
+        index = 0
+        for byte_index, byte in enumerate(self.bitmap):
+            while byte:
+                low = byte & -byte
+                r = byte_index * 8 + low.bit_length() - 1
+                byte ^= low
+                dp, depth0, depth1 = self.value.unpack_from(self.mm, self.values_offset + index * self.value.size)
+                index += 1
+                yield (self.config.encode(*self.ranker.unrank(r)), *_unpack_dp(dp), depth0, depth1)
+
+    def close(self):
+        self.bitmap.release()
+        self.directory.release()
+        self.mm.close()
+        self.file.close()
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='.data 表转换为稠密排名表')
+    parser.add_argument('n', type=int)
+    parser.add_argument('m', type=int)
+    parser.add_argument('k', type=int)
+    parser.add_argument('src')
+    parser.add_argument('dst')
+    args = parser.parse_args()
+
+    placements, states = write_ranked_table(args.src, args.dst, BoardConfig(args.n, args.m, args.k))
+    src_size, dst_size = os.path.getsize(args.src), os.path.getsize(args.dst)
+    print(f"放置数 {placements:,}，标准型 {states:,}")
+    print(f"{src_size:,} -> {dst_size:,} 字节 ({src_size / dst_size:.2f}x)")
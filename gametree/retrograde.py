@@ -0,0 +1,147 @@
+"""逐层（level-synchronous）向量化逆向求解
+
+与 GameTreeSolver.solve() 的 deque 版本结果完全一致，但每一层 BFS 的前驱收集、
+need 递减、新确定状态的检测都是对 CSR 图的整体 NumPy 运算：
+百万次 Python 级循环变为几百次向量操作。
+
+状态用 0..N-1 的下标表示（按 state_code 升序），depth 直接由层号得到。
+依赖 numpy（仅此模式需要）。
+"""
+
+from itertools import chain
+
+import numpy as np
+
+from gametree.telemetry import Telemetry
+
+
+def to_csr(states, edges, codes):
+    """dict 邻接表 -> CSR（正向边）
+
+    Args:
+        states: 按升序排列的 state_code 列表
+        edges: {state_code: [后继 state_code, ...]}
+        codes: 与 states 相同的 int64 数组，用于 searchsorted 映射下标
+
+    Returns: (ptr, adj)，第 i 个状态的后继为 adj[ptr[i]:ptr[i+1]]
+    """
+    counts = np.fromiter((len(edges[s]) for s in states), dtype=np.int64, count=len(states))
+    ptr = np.zeros(len(states) + 1, dtype=np.int64)
+    np.cumsum(counts, out=ptr[1:])
+    targets = np.fromiter(chain.from_iterable(edges[s] for s in states),
+                          dtype=np.int64, count=int(ptr[-1]))
+    return ptr, np.searchsorted(codes, targets)
+
+
+def reverse_csr(ptr, adj):
+    """正向 CSR -> 反向 CSR（前驱表），保留重边"""
+    n = len(ptr) - 1
+    src = np.repeat(np.arange(n, dtype=np.int64), np.diff(ptr))
+    order = np.argsort(adj, kind='stable')
+    rptr = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(np.bincount(adj, minlength=n), out=rptr[1:])
+    return rptr, src[order]
+
+
+def gather(ptr, adj, nodes):
+    """一次取出 nodes 中所有状态的邻接表并拼接（保留重复）"""
+    starts = ptr[nodes]
+    counts = ptr[nodes + 1] - starts
+    total = int(counts.sum())
+    if total == 0:
+        return np.empty(0, dtype=adj.dtype)
+    offsets = np.repeat(starts - np.cumsum(counts) + counts, counts) + np.arange(total)
+    return adj[offsets]
+
+
+def propagate(frontier, rev_in, rev_out, dp, depth, need, a, value):
+    """单方向逐层传播
+
+    Args:
+        frontier: 初始层（终局状态下标），它们的 depth[:, 1-a] 为 0
+        rev_in: a 方走子的反向 CSR（找能一步走进 frontier 的状态 y）
+        rev_out: 对方走子的反向 CSR（找 y 的前驱 z）
+        dp, depth, need: (N, 2) 数组，原地更新
+        a: 0 = 传播 X 必胜（value=1），1 = 传播 O 必胜（value=-1）
+
+    Yields: 每层 (层号, 本层 frontier 大小, 新确定的 y 数, 新确定的 z 数)
+    """
+    b = 1 - a
+    d = 0
+    layer = 0
+    while frontier.size:
+        size = int(frontier.size)
+        # y：a 方一步可走进 frontier，直接获胜
+        ys = np.unique(gather(*rev_in, frontier))
+        ys = ys[dp[ys, a] != value]
+        dp[ys, a] = value
+        depth[ys, a] = d + 1
+
+        # z：对方所有走法都进入已确定的 y
+        zs = gather(*rev_out, ys)
+        uz, cnt = np.unique(zs, return_counts=True)
+        need[uz, b] -= cnt
+        frontier = uz[need[uz, b] == 0]
+        dp[frontier, b] = value
+        depth[frontier, b] = d + 2
+
+        yield layer, size, int(ys.size), int(frontier.size)
+        d += 2
+        layer += 1
+
+
+def solve_graph(solver, debug=False, telemetry=None):
+    """对 dict 存储的 GameTreeSolver 做向量化求解，结果写回 solver.dp / solver.depth
+
+    Args:
+        telemetry: 可选 gametree.telemetry.Telemetry，记录各阶段耗时和每层 frontier
+    """
+    if telemetry is None:
+        telemetry = Telemetry()
+
+    with telemetry.phase('build_edges') as ph:
+        states = sorted(solver.edge0)
+        codes = np.array(states, dtype=np.int64)
+        n = len(states)
+        ptr0, adj0 = to_csr(states, solver.edge0, codes)
+        ptr1, adj1 = to_csr(states, solver.edge1, codes)
+        ph['states'] = n
+        ph['edges'] = len(adj0) + len(adj1)
+
+    with telemetry.phase('reverse_edges') as ph:
+        rev0 = reverse_csr(ptr0, adj0)
+        rev1 = reverse_csr(ptr1, adj1)
+        ph['edges'] = len(adj0) + len(adj1)
+
+    dp = np.zeros((n, 2), dtype=np.int8)
+    depth = np.zeros((n, 2), dtype=np.int32)
+    need = np.stack([np.diff(ptr0), np.diff(ptr1)], axis=1)
+
+    win = np.searchsorted(codes, np.array(sorted(solver.win), dtype=np.int64))
+    lose = np.searchsorted(codes, np.array(sorted(solver.lose), dtype=np.int64))
+    dp[win] = 1
+    dp[lose] = -1
+
+    if debug:
+        print(f"  solve开始(向量化): win={len(win)}, lose={len(lose)}")
+        print(f"  总状态数: {n}, 边数: {len(adj0) + len(adj1)}")
+
+    for phase, args in (('win_propagation', (win, rev0, rev1, dp, depth, need, 0, 1)),
+                        ('loss_propagation', (lose, rev1, rev0, dp, depth, need, 1, -1))):
+        with telemetry.phase(phase) as ph:
+            count = layers = 0
+            for layer, frontier, ys, zs in propagate(*args):
+                telemetry.layer(phase, layer, frontier, y=ys, z=zs)
+                count += ys + zs
+                layers += 1
+            ph['states'] = count
+            ph['layers'] = layers
+        if debug:
+            name = 'win' if phase == 'win_propagation' else 'lose'
+            print(f"  {name}传播更新了 {count} 次（{layers} 层）")
+
+    with telemetry.phase('writeback', states=n):
+        for s, d0, d1, h0, h1 in zip(states, dp[:, 0].tolist(), dp[:, 1].tolist(),
+                                     depth[:, 0].tolist(), depth[:, 1].tolist()):
+            solver.dp[s] = [d0, d1]
+            solver.depth[s] = [h0, h1]
@@ -0,0 +1,136 @@
+"""共享内存表：父进程装载一次，子进程按名字挂载
+
+对战 / 服务的每个工作进程各自打开、映射同一张表；字典版加载器更是每个进程完整复制一份。
+这里由父进程把表复制进一块 multiprocessing.shared_memory（同时算好 fence 索引），
+子进程拿到一个很小的 TableHandle（可 pickle），挂载后直接在共享内存上二分查找，
+不读文件、不复制，工作进程数增加时内存不变。批量查询也走共享的 fence 索引，
+各进程不再各自建立 key 列。
+
+共享块布局：记录数(8) | 14 字节记录 × count | 对齐到 8 字节 | fence key(u64) × fence_count
+
+父进程：
+    table = SharedTable.create('game_tree_4x4_m4.data')
+    with Pool(8, initializer=init_worker, initargs=(table.handle,)) as pool: ...
+    table.close()                      # 创建者 close 时同时 unlink
+
+子进程：
+    solver = GameTreeSolver()
+    solver.load_shared(handle)         # 或 Strategy(game, shared=handle)
+"""
+
+import struct
+from collections import namedtuple
+from multiprocessing.shared_memory import SharedMemory
+
+from gametree.table import KEY, RECORD, FenceIndex, read_header
+
+HEADER_SIZE = 8
+COPY_CHUNK = 16 * 1024 * 1024
+
+TableHandle = namedtuple('TableHandle', ['name', 'count', 'fence_offset', 'fence_count'])
+
+
+def _attach(name):
+    """挂载已有共享块
+
+    3.13 之前挂载也会向 resource_tracker 登记；子进程与父进程共用同一个 tracker，
+    重复登记没有影响，块仍由创建者 unlink（子进程里不能再 unregister，否则父进程 unlink 时出错）。
+    """
+    try:
+        return SharedMemory(name=name, track=False)   # Python 3.13+
+    except TypeError:
+        return SharedMemory(name=name)
+
+
+class SharedTable:
+    """共享内存中的一张 .data 表；接口与 GameTreeSolver.query_state / query_many 相同"""
+
+    def __init__(self, shm, handle, owner):
+        self.shm = shm
+        self.handle = handle
+        self.owner = owner
+        self.num_records = handle.count
+        self.buf = shm.buf[:handle.fence_offset + handle.fence_count * KEY.size]
+        self.keys = self.buf[handle.fence_offset:].cast('Q')
+        self.fence = FenceIndex(self.buf, HEADER_SIZE, handle.count, self.keys)
+        self.records = None
+
+    @classmethod
+    def create(cls, path, name=None):
+        """把 .data 表（4 / 8 字节头均可）复制进新的共享块，返回创建者对象"""
+        header_size, _ = read_header(path)
+        with open(path, 'rb') as f:
+            f.seek(0, 2)
+            count = (f.tell() - header_size) // RECORD.size
+            fence_offset = -(-(HEADER_SIZE + count * RECORD.size) // 8) * 8
+            fence_count = FenceIndex._blocks(HEADER_SIZE, count)
+            shm = SharedMemory(name=name, create=True, size=max(1, fence_offset + fence_count * KEY.size))
+
+            struct.pack_into('<Q', shm.buf, 0, count)
+            f.seek(header_size)
+            offset = HEADER_SIZE
+            end = HEADER_SIZE + count * RECORD.size
+            while offset < end:
+                chunk = f.read(min(COPY_CHUNK, end - offset))
+                shm.buf[offset:offset + len(chunk)] = chunk
+                offset += len(chunk)
+
+        for b in range(fence_count):
+            first = FenceIndex._first(HEADER_SIZE, b)
+            KEY.pack_into(shm.buf, fence_offset + b * KEY.size,
+                          KEY.unpack_from(shm.buf, HEADER_SIZE + first * RECORD.size)[0])
+        return cls(shm, TableHandle(shm.name, count, fence_offset, fence_count), owner=True)
+
+    @classmethod
+    def attach(cls, handle):
+        """子进程按 handle 挂载（不复制）"""
+        return cls(_attach(handle.name), handle, owner=False)
+
+    def __len__(self):
+        return self.num_records
+
+    def query_state(self, state_code):
+        """返回 ([dp0, dp1], [depth0, depth1]) 或 None"""
+        return self.fence.query(state_code)
+
+    def record_array(self):
+        """共享块上的 RecordArray（numpy 零拷贝视图，按块查找用共享的 fence key），没有 numpy 时抛 ImportError"""
+        if self.records is None:
+            from gametree.table import RecordArray
+            self.records = RecordArray(buffer=self.buf, header_size=HEADER_SIZE, count=self.num_records,
+                                       fence_keys=self.keys)
+        return self.records
+
+    def query_many(self, codes):
+        """用共享块中的 fence 索引逐个查找，不在本进程复制任何 key"""
+        return self.fence.query_many(codes)
+
+    def close(self):
+        """释放视图并关闭；创建者同时 unlink（已挂载的进程仍可继续使用到各自 close）"""
+        if self.shm is None:
+            return
+        self.records = None
+        self.fence = None
+        self.keys.release()
+        self.buf.release()
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+        self.shm = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def __del__(self):
+        if getattr(self, 'shm', None) is not None and not self.owner:
+            try:
+                self.close()
+            except BufferError:
+                pass
+
+    def __reduce__(self):
+        # 传给子进程时只传 handle，子进程自动挂载
+        return SharedTable.attach, (self.handle,)
@@ -0,0 +1,280 @@
+"""已求解训练数据（.data）的读取
+
+格式：记录数头 + 按 state_code 升序排列的 14 字节记录
+    state(8) dp0(1) dp1(1) depth0(2) depth1(2)，小端序
+记录数头有两种：C++ 训练器 / load_training_data_mmap / perfect4x4_m3 用 8 字节 'Q'，
+perfect3x3 的 save_training_data（以及旧版 perfect4x4_m3）用 4 字节 'I'。
+"""
+
+import mmap
+import os
+import struct
+from array import array
+from bisect import bisect_right
+
+RECORD = struct.Struct('<QbbHH')
+KEY = struct.Struct('<Q')
+
+# 与 RECORD 相同布局的 numpy 结构化类型（紧凑排列，itemsize = 14）
+RECORD_DTYPE = [('state', '<u8'), ('dp0', 'i1'), ('dp1', 'i1'), ('depth0', '<u2'), ('depth1', '<u2')]
+
+# FenceIndex：每个 4KB 块（按文件偏移对齐）记一个首 key
+FENCE_BLOCK = 4096
+FENCE_HEADER = struct.Struct('<4sIQQQ')   # magic, 块大小, 表文件大小, 表 mtime_ns, fence 数
+FENCE_MAGIC = b'FNC1'
+
+# RecordArray：key 列不超过该大小时整列复制进内存，一次 searchsorted 直接命中；
+# 更大的表用 fence 索引（每 4KB 块的首 key，旁文件持久化）定位块，再在块内比较
+KEYS_IN_MEMORY = 64 * 1024 * 1024
+
+
+def read_header(path):
+    """识别记录数头
+
+    按 (文件大小 - 头长度) 能否被 14 整除判断头长度（4 与 8 不会同时成立）。
+    Returns: (header_size, count)，count 为头里写的记录数，不保证与文件大小一致
+    """
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        head = f.read(8)
+    if size >= 8 and (size - 8) % RECORD.size == 0:
+        return 8, struct.unpack('<Q', head)[0]
+    if size >= 4 and (size - 4) % RECORD.size == 0:
+        return 4, struct.unpack('<I', head[:4])[0]
+    raise ValueError(f"{path}: 文件大小 {size} 不符合 4/8 字节头 + 14 字节记录格式")
+
+
+class TableFile:
+    """mmap 只读访问 + 二分查找（与各 perfect 策略的 query_state 相同）"""
+
+    def __init__(self, path):
+        self.path = path
+        self.header_size, self.header_count = read_header(path)
+        self.count = (os.path.getsize(path) - self.header_size) // RECORD.size
+        self.file = open(path, 'rb')
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if self.count else b''
+
+    def __len__(self):
+        return self.count
+
+    def key(self, index):
+        return KEY.unpack_from(self.mm, self.header_size + index * RECORD.size)[0]
+
+    def record(self, index):
+        """(state, dp0, dp1, depth0, depth1)"""
+        return RECORD.unpack_from(self.mm, self.header_size + index * RECORD.size)
+
+    def find(self, state_code):
+        """返回记录下标，不存在时返回 -1"""
+        left, right = 0, self.count - 1
+        while left <= right:
+            mid = (left + right) // 2
+            current = self.key(mid)
+            if current < state_code:
+                left = mid + 1
+            elif current > state_code:
+                right = mid - 1
+            else:
+                return mid
+        return -1
+
+    def query(self, state_code):
+        """返回 ([dp0, dp1], [depth0, depth1])，不存在时返回 None"""
+        index = self.find(state_code)
+        if index < 0:
+            return None
+        _, dp0, dp1, depth0, depth1 = self.record(index)
+        return [dp0, dp1], [depth0, depth1]
+
+    def close(self):
+        if isinstance(self.mm, mmap.mmap):
+            self.mm.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class RecordArray:
+    """numpy.memmap 结构化数组视图 + 批量查找（需要 numpy）
+
+    记录是 14 字节交错存放的，直接对 records['state'] 做 searchsorted 每次都会把整列
+    复制成连续数组。这里在打开时准备好一列有序的 key：小表复制整列；大表用 FenceIndex
+    的块首 key（从 .fence 旁文件加载，不扫描表文件），一次 searchsorted 定位所有 code
+    所在的 4KB 块，再在块内向量化比较。
+    """
+
+    def __init__(self, path=None, header_size=None, buffer=None, count=None, fence_keys=None):
+        """path 为表文件；或者给出 buffer（如共享内存）+ header_size + count，直接在其上建视图
+
+        Args:
+            fence_keys: 已有的 fence 块首 key（如共享内存中的），给出时不论表大小都按块查找
+        """
+        import numpy as np
+        self.np = np
+        dtype = np.dtype(RECORD_DTYPE)
+        if header_size is None:
+            header_size = read_header(path)[0]
+        if buffer is not None:
+            self.count = count
+        else:
+            self.count = (os.path.getsize(path) - header_size) // RECORD.size
+        if self.count and buffer is not None:
+            self.records = np.frombuffer(buffer, dtype=dtype, count=self.count, offset=header_size)
+        elif self.count:
+            self.records = np.memmap(path, dtype=dtype, mode='r', offset=header_size,
+                                     shape=(self.count,))
+        else:
+            self.records = np.zeros(0, dtype=dtype)
+        self.keys = self.records['state']
+
+        if fence_keys is None and self.count * KEY.size > KEYS_IN_MEMORY:
+            with open(path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                fence_keys = FenceIndex.open(path, mm, header_size, self.count).keys
+        if fence_keys is None or not self.count:
+            self.starts = None
+            self.samples = np.ascontiguousarray(self.keys)
+        else:
+            blocks = np.arange(len(fence_keys), dtype=np.int64)
+            self.samples = np.frombuffer(fence_keys, dtype=np.uint64)
+            # 每块第一条完整记录的下标（与 FenceIndex._first 相同）和块内最多记录数
+            self.starts = np.maximum(0, -((header_size - blocks * FENCE_BLOCK) // RECORD.size))
+            self.width = int(np.diff(np.append(self.starts, self.count)).max())
+
+    def __len__(self):
+        return self.count
+
+    def find_many(self, codes):
+        """返回 (下标数组, 是否存在数组)；不存在的下标无意义"""
+        np = self.np
+        codes = np.asarray(codes, dtype=np.uint64)
+        if not self.count:
+            return np.zeros(len(codes), dtype=np.int64), np.zeros(len(codes), dtype=bool)
+        if self.starts is None:
+            index = np.minimum(np.searchsorted(self.samples, codes), self.count - 1)
+            return index, self.samples[index] == codes
+
+        block = np.searchsorted(self.samples, codes, side='right') - 1
+        start = self.starts[np.maximum(block, 0)]
+        offsets = start[:, None] + np.arange(self.width)
+        inside = offsets < self.count
+        keys = self.keys[np.minimum(offsets, self.count - 1)]
+        index = start + ((keys < codes[:, None]) & inside).sum(axis=1)
+        clipped = np.minimum(index, self.count - 1)
+        found = (block >= 0) & (index < self.count) & (self.keys[clipped] == codes)
+        return clipped, found
+
+    def query_many(self, codes):
+        """与 codes 等长的列表，元素同 TableFile.query：([dp0, dp1], [depth0, depth1]) 或 None"""
+        index, found = self.find_many(codes)
+        rows = self.records[index]
+        return [([dp0, dp1], [depth0, depth1]) if ok else None
+                for dp0, dp1, depth0, depth1, ok in zip(
+                    rows['dp0'].tolist(), rows['dp1'].tolist(),
+                    rows['depth0'].tolist(), rows['depth1'].tolist(), found.tolist())]
+
+
+class FenceIndex:
+    """稀疏 fence 索引：内存中保存每个 4KB 块第一条完整记录的 key
+
+    查询 = 内存 bisect 定位块 + 在该块内二分（只读这一页，跨页的最后一条记录最多多读一页），
+    冷缓存下从约 log2(n) 次随机读页降到 1 次。索引保存为旁文件 <表>.fence（按表文件大小和
+    mtime 校验），下次直接加载，不必为建索引把整张表读一遍。
+
+    Args:
+        mm: 表文件的 mmap
+        header_size / count: 记录数头长度和记录数
+        advise: 在 mmap 上调用 madvise(MADV_RANDOM) 关闭预读，query_many 前用 MADV_WILLNEED 预取
+    """
+
+    def __init__(self, mm, header_size, count, keys, advise=False):
+        self.mm = mm
+        self.header_size = header_size
+        self.count = count
+        self.keys = keys
+        self.advise = advise and hasattr(mm, 'madvise')
+        if self.advise and hasattr(mmap, 'MADV_RANDOM'):
+            mm.madvise(mmap.MADV_RANDOM)
+
+    @classmethod
+    def open(cls, path, mm, header_size, count, save=True, advise=False):
+        """加载旁文件；不存在或与表不匹配时扫描建立，save=True 时写回旁文件（失败则忽略）"""
+        sidecar = path + '.fence'
+        st = os.stat(path)
+        try:
+            with open(sidecar, 'rb') as f:
+                magic, block, size, mtime, n = FENCE_HEADER.unpack(f.read(FENCE_HEADER.size))
+                if (magic, block, size, mtime) == (FENCE_MAGIC, FENCE_BLOCK, st.st_size, st.st_mtime_ns):
+                    keys = array('Q')
+                    keys.frombytes(f.read(n * keys.itemsize))
+                    if len(keys) == n:
+                        return cls(mm, header_size, count, keys, advise)
+        except (OSError, struct.error):
+            pass
+
+        keys = array('Q', (KEY.unpack_from(mm, header_size + cls._first(header_size, b) * RECORD.size)[0]
+                           for b in range(cls._blocks(header_size, count))))
+        if save:
+            try:
+                with open(sidecar, 'wb') as f:
+                    f.write(FENCE_HEADER.pack(FENCE_MAGIC, FENCE_BLOCK, st.st_size, st.st_mtime_ns, len(keys)))
+                    f.write(keys.tobytes())
+            except OSError:
+                pass
+        return cls(mm, header_size, count, keys, advise)
+
+    @staticmethod
+    def _first(header_size, block):
+        """第 block 块中第一条完整开始的记录下标"""
+        return max(0, -(-(block * FENCE_BLOCK - header_size) // RECORD.size))
+
+    @staticmethod
+    def _blocks(header_size, count):
+        """最后一条记录开始于第几块（记录比块小，每块都至少有一条记录开始）"""
+        if not count:
+            return 0
+        return (header_size + (count - 1) * RECORD.size) // FENCE_BLOCK + 1
+
+    def find(self, state_code):
+        """返回记录下标，不存在时返回 -1"""
+        block = bisect_right(self.keys, state_code) - 1
+        if block < 0:
+            return -1
+        left = self._first(self.header_size, block)
+        right = min(self._first(self.header_size, block + 1), self.count) - 1
+        while left <= right:
+            mid = (left + right) // 2
+            current = KEY.unpack_from(self.mm, self.header_size + mid * RECORD.size)[0]
+            if current < state_code:
+                left = mid + 1
+            elif current > state_code:
+                right = mid - 1
+            else:
+                return mid
+        return -1
+
+    def query(self, state_code):
+        """返回 ([dp0, dp1], [depth0, depth1]) 或 None"""
+        index = self.find(state_code)
+        if index < 0:
+            return None
+        _, dp0, dp1, depth0, depth1 = RECORD.unpack_from(self.mm, self.header_size + index * RECORD.size)
+        return [dp0, dp1], [depth0, depth1]
+
+    def prefetch(self, codes):
+        """对 codes 所在的页发出 MADV_WILLNEED，让内核并行读入"""
+        if not self.advise or not hasattr(mmap, 'MADV_WILLNEED'):
+            return
+        for code in codes:
+            block = bisect_right(self.keys, code) - 1
+            if block >= 0:
+                start = block * FENCE_BLOCK
+                start -= start % mmap.PAGESIZE
+                self.mm.madvise(mmap.MADV_WILLNEED, start, min(2 * FENCE_BLOCK, len(self.mm) - start))
+
+    def query_many(self, codes):
+        self.prefetch(codes)
+        return [self.query(code) for code in codes]
@@ -0,0 +1,100 @@
+"""训练 / 求解遥测：阶段耗时、吞吐量、峰值内存、每层 frontier 大小
+
+所有记录都是扁平 dict，写成 JSON lines（每行一条），便于对比不同求解后端、
+在启动长时间任务前估算机器配置。
+
+    telemetry = Telemetry('train_4x4_m3.jsonl', config='4x4_m3', backend='vectorized')
+    strategy.train(telemetry=telemetry)
+
+记录类型（event 字段）：
+    phase  阶段结束：phase, seconds, peak_rss_mb, 以及 states / edges 和对应 *_per_sec
+    layer  BFS 每层：phase, layer, frontier, 以及各后端自己的计数
+"""
+
+import json
+import sys
+import time
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+
+def peak_rss_mb():
+    """进程峰值常驻内存（MB），平台不支持时返回 None"""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux 单位 KB，macOS 单位字节
+    if sys.platform == 'darwin':
+        return round(peak / 1024 / 1024, 1)
+    return round(peak / 1024, 1)
+
+
+class Telemetry:
+    """遥测记录器
+
+    Args:
+        path: JSON lines 输出文件（追加写）；None 表示只保存在 self.records 中
+        **meta: 附加到每条记录上的字段，如 config / backend
+    """
+
+    def __init__(self, path=None, **meta):
+        self.meta = meta
+        self.records = []
+        self.file = open(path, 'a', encoding='utf-8') if path else None
+        self.start = time.perf_counter()
+
+    def emit(self, event, **fields):
+        record = {'event': event, 't': round(time.perf_counter() - self.start, 6)}
+        record.update(self.meta)
+        record.update(fields)
+        self.records.append(record)
+        if self.file is not None:
+            self.file.write(json.dumps(record, ensure_ascii=False) + '\n')
+            self.file.flush()
+        return record
+
+    @contextmanager
+    def phase(self, name, **fields):
+        """计时一个阶段；在 with 块中往 yield 出的 dict 里填 states / edges 等计数"""
+        counters = dict(fields)
+        start = time.perf_counter()
+        yield counters
+        self.record_phase(name, time.perf_counter() - start, **counters)
+
+    def record_phase(self, name, seconds, **counters):
+        """记录一个已经自行计时的阶段（循环体太长、不便包进 with 时使用）"""
+        for key in ('states', 'edges'):
+            if key in counters and seconds > 0:
+                counters[f'{key}_per_sec'] = round(counters[key] / seconds, 1)
+        return self.emit('phase', phase=name, seconds=round(seconds, 6),
+                         peak_rss_mb=peak_rss_mb(), **counters)
+
+    def layer(self, phase, layer, frontier, **fields):
+        """记录一层 BFS 的 frontier 大小"""
+        self.emit('layer', phase=phase, layer=layer, frontier=frontier, **fields)
+
+    def depth_layers(self, phase, initial, y_depths, z_depths):
+        """deque 求解器的逐层统计：按 depth 计数换算成层
+
+        第 k 层 frontier 的 depth 为 2k，新确定的 y / z 的 depth 为 2k+1 / 2k+2。
+        """
+        frontier = initial
+        layer = 0
+        while frontier:
+            z = z_depths.get(2 * layer + 2, 0)
+            self.layer(phase, layer, frontier, y=y_depths.get(2 * layer + 1, 0), z=z)
+            frontier = z
+            layer += 1
+
+    def phases(self):
+        """{阶段名: 耗时秒数}"""
+        return {r['phase']: r['seconds'] for r in self.records if r['event'] == 'phase'}
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
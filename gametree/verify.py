@@ -0,0 +1,183 @@
+"""已求解训练数据的一致性校验
+
+把 .data 表按下标分块交给进程池，每个状态重新生成后继并在表中查找，检查：
+    - 头部 / 文件大小、state_code 严格升序
+    - 状态本身合法且是标准型，终局状态 dp = [r, r]、depth = [0, 0]
+    - 极小极大关系（a 方走子，b = 1 - a，w 为 a 方获胜时的 dp 值）：
+        dp[s][a] == w   当且仅当存在后继 c 有 dp[c][b] == w，depth = min(depth[c][b]) + 1
+        dp[s][a] == -w  当且仅当所有后继都有 dp[c][b] == -w，depth = max(depth[c][b]) + 1
+        其余为平局，depth = 0；没有合法后继时求解器的 need 为 0，同样保持平局
+不需要重新训练即可检查一份已发布的表。
+
+用法：
+    python -m gametree.verify 3 3 3 strategies/perfect3x3/game_tree_optimized.data --workers 4
+"""
+
+import os
+from collections import Counter
+from multiprocessing import Pool
+
+from gametree.board import BoardConfig
+from gametree.table import RECORD, TableFile, read_header
+
+DEFAULT_CHUNK = 20000
+DEFAULT_EXAMPLES = 20
+
+# 工作进程内的全局只读状态（由 _init_worker 打开）
+_table = None
+_config = None
+
+
+def _init_worker(path, n, m, k):
+    global _table, _config
+    _table = TableFile(path)
+    _config = BoardConfig(n, m, k)
+
+
+def expected_value(children, a):
+    """由后继 [(dp[c][b], depth[c][b]), ...] 推出 (dp[s][a], depth[s][a])"""
+    w = 1 if a == 0 else -1
+    wins = [depth for dp, depth in children if dp == w]
+    if wins:
+        return w, min(wins) + 1
+    if children and all(dp == -w for dp, _ in children):
+        return -w, max(depth for _, depth in children) + 1
+    return 0, 0
+
+
+def check_state(table, config, index):
+    """校验单条记录，产出 (kind, detail)"""
+    state, dp0, dp1, depth0, depth1 = table.record(index)
+    if index > 0 and table.key(index - 1) >= state:
+        yield 'order', f"前一条 {table.key(index - 1)} >= {state}"
+
+    x, y = config.decode(state)
+    positions = x + y
+    if (any(p < 0 or p >= config.cells for p in positions)
+            or len(set(positions)) != len(positions)
+            or len(x) > config.m or len(y) > config.m
+            or not config.is_valid(x, y)):
+        yield 'invalid', f"x={x} y={y}"
+        return
+    if config.canonical_code(x, y) != state:
+        yield 'not_canonical', f"标准型为 {config.canonical_code(x, y)}"
+
+    dp = (dp0, dp1)
+    depth = (depth0, depth1)
+    if any(v not in (-1, 0, 1) for v in dp):
+        yield 'dp_range', f"dp={list(dp)}"
+        return
+
+    result = config.result(x, y)
+    if result:
+        if dp != (result, result) or depth != (0, 0):
+            yield 'terminal', f"终局 {result}: dp={list(dp)} depth={list(depth)}"
+        return
+
+    children = ([], [])
+    for player, _, child in config.moves(x, y):
+        found = table.find(child)
+        if found < 0:
+            yield 'missing_child', f"player={player} child={child}"
+            continue
+        _, c0, c1, cd0, cd1 = table.record(found)
+        b = 1 - player
+        children[player].append(((c0, c1)[b], (cd0, cd1)[b]))
+    for a in (0, 1):
+        value, d = expected_value(children[a], a)
+        if dp[a] != value:
+            kind = {1: 'win', -1: 'lose', 0: 'draw'}[value]
+            yield kind, f"dp[{a}]={dp[a]} 应为 {value}"
+        elif depth[a] != d:
+            yield 'depth', f"depth[{a}]={depth[a]} 应为 {d}"
+
+
+def _check_range(bounds):
+    start, stop, max_examples = bounds
+    counts = Counter()
+    examples = []
+    for index in range(start, stop):
+        for kind, detail in check_state(_table, _config, index):
+            counts[kind] += 1
+            if len(examples) < max_examples:
+                examples.append((index, _table.key(index), kind, detail))
+    return stop - start, counts, examples
+
+
+def verify_table(path, config, workers=None, chunk_size=DEFAULT_CHUNK,
+                 max_examples=DEFAULT_EXAMPLES, progress=False):
+    """校验整张表
+
+    Returns: dict(records, header_size, checked, violations=Counter, examples=[(index, state, kind, detail)])
+    """
+    report = {'path': path, 'records': 0, 'header_size': None, 'checked': 0,
+              'violations': Counter(), 'examples': []}
+    try:
+        header_size, header_count = read_header(path)
+    except ValueError as e:
+        report['violations']['size'] += 1
+        report['examples'].append((None, None, 'size', str(e)))
+        return report
+
+    records = (os.path.getsize(path) - header_size) // RECORD.size
+    report['records'] = records
+    report['header_size'] = header_size
+    if header_count != records:
+        report['violations']['size'] += 1
+        report['examples'].append((None, None, 'size', f"头部记录数 {header_count} != 实际 {records}"))
+
+    with TableFile(path) as table:
+        if records and table.find(0) < 0:
+            report['violations']['missing_root'] += 1
+            report['examples'].append((None, 0, 'missing_root', "空棋盘状态不在表中"))
+
+    tasks = [(start, min(start + chunk_size, records), max_examples)
+             for start in range(0, records, chunk_size)]
+    initargs = (path, config.n, config.m, config.k)
+    with Pool(workers, initializer=_init_worker, initargs=initargs) as pool:
+        for checked, counts, examples in pool.imap_unordered(_check_range, tasks):
+            report['checked'] += checked
+            report['violations'].update(counts)
+            room = max_examples - len(report['examples'])
+            report['examples'].extend(examples[:max(room, 0)])
+            if progress:
+                print(f"  已校验 {report['checked']:,}/{records:,}", end='\r')
+    if progress:
+        print()
+    report['examples'].sort(key=lambda e: -1 if e[0] is None else e[0])
+    return report
+
+
+def print_report(report):
+    print(f"文件: {report['path']}")
+    print(f"  头部: {report['header_size']} 字节, 记录数: {report['records']:,}, "
+          f"已校验: {report['checked']:,}")
+    if not report['violations']:
+        print("  ✓ 未发现问题")
+        return
+    print(f"  ✗ 共 {sum(report['violations'].values()):,} 处问题:")
+    for kind, count in report['violations'].most_common():
+        print(f"    {kind}: {count:,}")
+    print("  示例:")
+    for index, state, kind, detail in report['examples']:
+        print(f"    [{kind}] #{index} state={state}: {detail}")
+
+
+if __name__ == '__main__':
+    import argparse
+    import sys
+
+    parser = argparse.ArgumentParser(description='校验已求解训练数据的一致性')
+    parser.add_argument('n', type=int)
+    parser.add_argument('m', type=int)
+    parser.add_argument('k', type=int)
+    parser.add_argument('data')
+    parser.add_argument('--workers', type=int, default=None, help='进程数（默认 CPU 核数）')
+    parser.add_argument('--chunk', type=int, default=DEFAULT_CHUNK, help='每个任务的记录数')
+    parser.add_argument('--examples', type=int, default=DEFAULT_EXAMPLES, help='最多打印的问题示例数')
+    args = parser.parse_args()
+
+    report = verify_table(args.data, BoardConfig(args.n, args.m, args.k), workers=args.workers,
+                          chunk_size=args.chunk, max_examples=args.examples, progress=True)
+    print_report(report)
+    sys.exit(1 if report['violations'] else 0)
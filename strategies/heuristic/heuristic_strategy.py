@@ -1,46 +1,383 @@
+import json
 import math
+import os
+import random
+import time
+from collections import OrderedDict
+
+# 候选落子的默认半径（与已有棋子的切比雪夫距离）
+DEFAULT_RADIUS = 2
+# 局面估值缓存的默认条目数
+DEFAULT_CACHE_SIZE = 65536
+# 落子前威胁空间搜索的深度（进攻方步数，见 strategies/search/threat_space.py）
+DEFAULT_THREAT_DEPTH = 6
+# 对手有必胜序列时，最多检查多少个按得分排序的落子能否化解
+DEFAULT_DEFENSE_MOVES = 12
+
+# 评估参数的默认值（手工选定）；按配置调优后的值见 tuned_params.json（tuning.py 生成）
+DEFAULT_PARAMS = {
+    # 威胁级别基础分
+    'immediate_win': 10000,
+    'one_move_threat': 5000,
+    'building_threat': 1000,
+    'potential_threat': 100,
+    # 长度权重的基础值（差 1 / 2 / 3 步和更远）
+    'length_k1': 100.0,
+    'length_k2': 30.0,
+    'length_k3': 10.0,
+    'length_far': 1.0,
+    # 进攻系数
+    'attack_factor': 1.2,
+    # 立即获胜 / 堵住对手立即获胜
+    'win_score': 100000,
+    'block_score': 50000,
+    # 防守权重及其威胁阈值
+    'defense_urgent': 1.5,
+    'defense_important': 1.2,
+    'defense_normal': 0.8,
+    'urgent_threshold': 5000,
+    'important_threshold': 1000,
+    # 中心价值：落子位置得分、棋盘评分中每颗棋子的得分
+    'center_move': 100,
+    'center_board': 10,
+}
+TUNED_PARAMS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'tuned_params.json')
+
+
+def params_key(n, m, k):
+    """tuned_params.json 中配置的键，如 '9,5,5'"""
+    return f"{n},{m},{k}"
+
+
+def load_tuned_params(n, m, k, path=TUNED_PARAMS_FILE):
+    """(n, m, k) 调优后的参数（缺少的项用默认值），没有调优结果时返回 DEFAULT_PARAMS 的副本"""
+    params = dict(DEFAULT_PARAMS)
+    try:
+        with open(path, encoding='utf-8') as f:
+            entry = json.load(f).get(params_key(n, m, k))
+    except (OSError, ValueError):
+        entry = None
+    if entry:
+        params.update((name, value) for name, value in entry['params'].items() if name in params)
+    return params
+
+class LineGeometry:
+    """(n, K) 棋盘上的 K 长连线窗口，每个 (n, K) 只计算一次
+
+    windows 是所有横、竖、斜的 K 长窗口，每个窗口是格子下标（i * n + j）的元组；
+    through[p] 是经过格子 p 的窗口在 windows 中的编号。
+    """
+
+    _cache = {}
+
+    def __init__(self, n, K):
+        self.n = n
+        self.K = K
+        self.windows = []
+        for di, dj in ((0, 1), (1, 0), (1, 1), (1, -1)):
+            for i in range(n):
+                for j in range(n):
+                    ei, ej = i + di * (K - 1), j + dj * (K - 1)
+                    if 0 <= ei < n and 0 <= ej < n:
+                        self.windows.append(tuple((i + di * k) * n + j + dj * k for k in range(K)))
+        self.through = [[] for _ in range(n * n)]
+        for w, window in enumerate(self.windows):
+            for p in window:
+                self.through[p].append(w)
+
+    @classmethod
+    def get(cls, n, K):
+        geometry = cls._cache.get((n, K))
+        if geometry is None:
+            geometry = cls._cache[(n, K)] = cls(n, K)
+        return geometry
+
+
+class IncrementalBoard:
+    """按落子 / 棋子消失增量维护的棋盘统计的公共部分（ThreatTable、CandidateSet）
+
+    子类实现 place(p, player)、remove(p, player) 和 _clear()；
+    play / undo 成对使用可撤销，follow(game) 跟上对局的新落子。
+    """
+
+    def __init__(self, n):
+        self.n = n
+        self.stack = []
+        # follow() 已经跟到的棋盘对象、对局步数和最后一步
+        self.board = None
+        self.seen = 0
+        self.last = None
+
+    def play(self, p, player, evicted=None):
+        """落子并（按限步规则）提走 evicted 格的同色棋子，记录下来供 undo"""
+        self.place(p, player)
+        if evicted is not None:
+            self.remove(evicted, player)
+        self.stack.append((p, player, evicted))
+
+    def undo(self):
+        p, player, evicted = self.stack.pop()
+        if evicted is not None:
+            self.place(evicted, player)
+        self.remove(p, player)
+
+    def sync(self, board):
+        """按棋盘重建"""
+        self._clear()
+        self.stack.clear()
+        for i, row in enumerate(board):
+            for j, v in enumerate(row):
+                if v:
+                    self.place(i * self.n + j, v)
+
+    def follow(self, game):
+        """跟上 game 的新落子（含棋子消失）；对局被重置或不连续时按棋盘重建"""
+        history = game.history
+        if game.board is not self.board or len(history) < self.seen \
+                or (self.seen and history[self.seen - 1] != self.last):
+            self.seen = 0
+        if self.seen == 0:
+            self.sync(game.board)
+        else:
+            m = game.m
+            for idx in range(self.seen, len(history)):
+                i, j = history[idx]
+                player = 1 if idx % 2 == 0 else -1
+                self.place(i * self.n + j, player)
+                # 同一玩家 m 步之前的棋子在这一步消失
+                if idx >= 2 * m:
+                    ei, ej = history[idx - 2 * m]
+                    self.remove(ei * self.n + ej, player)
+        self.board = game.board
+        self.seen = len(history)
+        self.last = history[-1] if history else None
+        return self
+
+
+class ThreatTable(IncrementalBoard):
+    """K 长窗口的增量威胁表
+
+    counts[w] = [X 棋子数, O 棋子数]（空位数 = K - 两者之和）；
+    levels[player][length] 是只有该玩家棋子、且恰有 length 个的窗口集合（length = K 即已连成）。
+    落子、棋子消失都只更新经过该格的窗口（O(经过该格的窗口数)），play / undo 成对使用可撤销。
+    """
+
+    def __init__(self, n, K):
+        super().__init__(n)
+        self.geometry = LineGeometry.get(n, K)
+        self.K = K
+        self.counts = [[0, 0] for _ in self.geometry.windows]
+        self.levels = {1: [set() for _ in range(K + 1)], -1: [set() for _ in range(K + 1)]}
+
+    def _update(self, p, player, delta):
+        side = 0 if player == 1 else 1
+        levels = self.levels
+        for w in self.geometry.through[p]:
+            count = self.counts[w]
+            x, o = count
+            if x and not o:
+                levels[1][x].discard(w)
+            elif o and not x:
+                levels[-1][o].discard(w)
+            count[side] += delta
+            x, o = count
+            if x and not o:
+                levels[1][x].add(w)
+            elif o and not x:
+                levels[-1][o].add(w)
+
+    def place(self, p, player):
+        """格子 p（i * n + j）放上 player 的棋子"""
+        self._update(p, player, 1)
+
+    def remove(self, p, player):
+        """提走格子 p 上 player 的棋子（棋子消失）"""
+        self._update(p, player, -1)
+
+    def _clear(self):
+        for count in self.counts:
+            count[0] = count[1] = 0
+        for player in (1, -1):
+            for level in self.levels[player]:
+                level.clear()
+
+    def count(self, player, length):
+        """player 恰有 length 子、无对手棋子的窗口数，O(1)"""
+        return len(self.levels[player][length])
+
+    def wins_at(self, p, player, evicted=None):
+        """player 在空格 p 落子能否连成 K 子：经过 p 的窗口中有一个已有 K - 1 个 player 棋子且无对手棋子
+
+        evicted: 这一步同时消失的 player 棋子所在格，经过它的窗口不算
+        """
+        side = 0 if player == 1 else 1
+        need = self.K - 1
+        lines = self.geometry.windows
+        for w in self.geometry.through[p]:
+            count = self.counts[w]
+            if count[side] == need and count[1 - side] == 0 and (evicted is None or evicted not in lines[w]):
+                return True
+        return False
 
-class DynamicPatternDetector:
-    """动态模式检测器，适应不同的win_count(K)"""
-
-    def __init__(self, win_count):
-        self.K = win_count  # 胜利所需连线长度
-
-    def detect_threats(self, board, player):
-        """检测所有威胁级别
-
-        Args:
-            board: 二维数组棋盘
-            player: 当前玩家 (1=X, -1=O)
 
-        Returns:
-            包含各级别威胁的字典
-        """
-        threats = {
-            'immediate_win': [],      # 下一步就能赢
-            'one_move_threat': [],    # 再一步能赢
-            'building_threat': [],    # 正在构建的威胁
-            'potential_threat': []    # 潜在威胁
+class CandidateSet(IncrementalBoard):
+    """候选落子：与已有棋子的切比雪夫距离不超过 radius 的空格，外加棋盘中心的后备格
+
+    大棋盘上离所有棋子都很远的空格几乎不可能是好棋，这里只保留棋子附近的空格。
+    near[p] 是以 p 为中心、边长 2 * radius + 1 的方块内的棋子数，落子 / 棋子消失时
+    只更新该方块（O(radius²)）；active 是 near > 0 的格子。后备格（离中心不超过 radius）
+    保证开局无子时也有候选。成 K / 堵 K 的空格一定紧挨着己方或对手的棋子，radius >= 1 时不会被剪掉。
+    棋盘不大于 2 * radius + 1 时不剪枝（cells 返回全部空格）。
+    """
+
+    def __init__(self, n, radius=2):
+        super().__init__(n)
+        self.radius = radius
+        self.occupied = [0] * (n * n)
+        self.near = [0] * (n * n)
+        self.active = set()
+        self.neighbors = []
+        for p in range(n * n):
+            i, j = p // n, p % n
+            self.neighbors.append([a * n + b
+                                   for a in range(max(0, i - radius), min(n, i + radius + 1))
+                                   for b in range(max(0, j - radius), min(n, j + radius + 1))])
+        center = (n - 1) / 2
+        self.fallback = [p for p in range(n * n)
+                         if max(abs(p // n - center), abs(p % n - center)) <= radius]
+        self.pruning = n > 2 * radius + 1
+
+    def _update(self, p, delta):
+        near = self.near
+        for q in self.neighbors[p]:
+            near[q] += delta
+            if near[q]:
+                self.active.add(q)
+            else:
+                self.active.discard(q)
+
+    def place(self, p, player):
+        self.occupied[p] = player
+        self._update(p, 1)
+
+    def remove(self, p, player):
+        self.occupied[p] = 0
+        self._update(p, -1)
+
+    def _clear(self):
+        self.occupied = [0] * (self.n * self.n)
+        self.near = [0] * (self.n * self.n)
+        self.active.clear()
+
+    def cells(self):
+        """候选空格下标 i * n + j，行优先升序"""
+        board = self.occupied
+        if not self.pruning:
+            return [p for p, v in enumerate(board) if v == 0]
+        return sorted(p for p in self.active.union(self.fallback) if board[p] == 0)
+
+
+class PositionHash(IncrementalBoard):
+    """棋盘内容的 64 位 Zobrist 哈希（只看每格是谁的棋子，不含先后顺序）
+
+    落子、棋子消失各异或一项；moved() 不改动自身，O(1) 得到试落子后的哈希。
+    随机数表每个 n 只生成一次。
+    """
+
+    _tables = {}
+
+    def __init__(self, n):
+        super().__init__(n)
+        table = self._tables.get(n)
+        if table is None:
+            rng = random.Random(n)
+            table = self._tables[n] = ({player: [rng.getrandbits(64) for _ in range(n * n)] for player in (1, -1)},
+                                       rng.getrandbits(64))
+        self.keys, self.side = table
+        self.key = 0
+
+    def place(self, p, player):
+        self.key ^= self.keys[player][p]
+
+    def remove(self, p, player):
+        self.key ^= self.keys[player][p]
+
+    def _clear(self):
+        self.key = 0
+
+    def moved(self, p, player, evicted=None):
+        """player 在 p 落子（并提走 evicted）后的哈希"""
+        key = self.key ^ self.keys[player][p]
+        if evicted is not None:
+            key ^= self.keys[player][evicted]
+        return key
+
+    def for_player(self, key, player):
+        """把评估方并入 key（同一棋盘对双方的估值不同）"""
+        return key ^ self.side if player == -1 else key
+
+
+class EvaluationCache:
+    """局面估值的有界 LRU 缓存 + 命中统计，key 为局面哈希（PositionHash 或搜索的 Zobrist key）
+
+    限步规则下棋子不断消失，对局和搜索里反复回到同一局面，估值可以直接复用。
+
+        evaluator.cache.stats()   # hits / misses / evictions / hit_rate
+    """
+
+    def __init__(self, maxsize=DEFAULT_CACHE_SIZE):
+        if maxsize <= 0:
+            raise ValueError("maxsize 必须为正数")
+        self.maxsize = maxsize
+        self.data = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key):
+        """命中返回估值，否则返回 None"""
+        value = self.data.get(key)
+        if value is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.data.move_to_end(key)
+        return value
+
+    def put(self, key, value):
+        self.data[key] = value
+        if len(self.data) > self.maxsize:
+            self.data.popitem(last=False)
+            self.evictions += 1
+
+    def stats(self):
+        total = self.hits + self.misses
+        return {
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'size': len(self.data),
+            'maxsize': self.maxsize,
+            'hit_rate': self.hits / total if total else 0.0,
         }
 
-        # 根据K值动态检测不同长度的模式
-        for length in range(1, self.K):
-            pattern_type = self._classify_pattern_length(length)
+    def clear(self):
+        """清空缓存和计数"""
+        self.data.clear()
+        self.hits = self.misses = self.evictions = 0
 
-            # 查找所有可能形成length连线的位置序列
-            lines = self._find_all_lines(board, length)
 
-            for line in lines:
-                if self._is_potential_threat(board, line, player):
-                    pattern = {
-                        'positions': line,
-                        'length': length,
-                        'type': pattern_type,
-                        'age_info': self._get_age_info(board, line, player)
-                    }
-                    threats[pattern_type].append(pattern)
+class DynamicPatternDetector:
+    """威胁级别划分，适应不同的win_count(K)
+
+    pattern_types[length] 是 K 长窗口中有 length 个己方棋子、没有对手棋子时的威胁级别；
+    窗口计数由 ThreatTable 增量维护（见 evaluate_threats、score_all_moves）。
+    """
 
-        return threats
+    def __init__(self, win_count):
+        self.K = win_count  # 胜利所需连线长度
+        # 长度 -> 威胁级别
+        self.pattern_types = {length: self._classify_pattern_length(length) for length in range(1, self.K)}
 
     def _classify_pattern_length(self, length):
         """根据当前长度和K值分类威胁级别"""
@@ -53,80 +390,14 @@ class DynamicPatternDetector:
         else:
             return 'potential_threat'   # 潜在威胁
 
-    def _find_all_lines(self, board, length):
-        """查找所有可能形成length连线的位置序列"""
-        lines = []
-        n = len(board)
-
-        # 横线
-        for i in range(n):
-            for j in range(n - length + 1):
-                line = [(i, j+k) for k in range(length)]
-                lines.append(line)
-
-        # 竖线
-        for i in range(n - length + 1):
-            for j in range(n):
-                line = [(i+k, j) for k in range(length)]
-                lines.append(line)
-
-        # 对角线（主对角线）
-        for i in range(n - length + 1):
-            for j in range(n - length + 1):
-                line = [(i+k, j+k) for k in range(length)]
-                lines.append(line)
-
-        # 反对角线
-        for i in range(n - length + 1):
-            for j in range(length - 1, n):
-                line = [(i+k, j-k) for k in range(length)]
-                lines.append(line)
-
-        return lines
-
-    def _is_potential_threat(self, board, line, player):
-        """判断一条线是否可能形成威胁"""
-        player_count = 0
-        opponent_count = 0
-        empty_count = 0
-
-        for (i, j) in line:
-            if board[i][j] == player:
-                player_count += 1
-            elif board[i][j] == -player:
-                opponent_count += 1
-            else:
-                empty_count += 1
-
-        # 对手棋子不能存在
-        if opponent_count > 0:
-            return False
-
-        # 至少有玩家棋子，并且有足够的空位可以完成连线
-        if player_count > 0 and player_count + empty_count >= self.K:
-            return True
-
-        return False
-
-    def _get_age_info(self, board, line, player):
-        """获取棋子年龄信息"""
-        ages = []
-        for (i, j) in line:
-            if board[i][j] == player:
-                # 这里需要从游戏中获取棋子年龄信息
-                # 暂时返回占位值
-                ages.append(0)
-            else:
-                ages.append(-1)  # 空位
-        return ages
-
 
 class AdaptiveWeightCalculator:
     """自适应权重计算器，根据K和M调整权重"""
 
-    def __init__(self, win_count, max_move):
+    def __init__(self, win_count, max_move, params=DEFAULT_PARAMS):
         self.K = win_count
         self.M = max_move
+        self.params = params
 
     def calculate_weights(self):
         """根据K和M计算动态权重
@@ -139,13 +410,13 @@ class AdaptiveWeightCalculator:
         for length in range(1, self.K):
             # 基础权重：越接近K，权重越高
             if length == self.K - 1:
-                base_weight = 100.0  # 差一步胜利
+                base_weight = self.params['length_k1']   # 差一步胜利
             elif length == self.K - 2:
-                base_weight = 30.0   # 差两步胜利
+                base_weight = self.params['length_k2']   # 差两步胜利
             elif length >= self.K - 3:
-                base_weight = 10.0   # 构建中的威胁
+                base_weight = self.params['length_k3']   # 构建中的威胁
             else:
-                base_weight = 1.0    # 潜在威胁
+                base_weight = self.params['length_far']  # 潜在威胁
 
             # 时间因子调整：M越小，短期威胁越重要
             time_factor = self._calculate_time_factor(length)
@@ -169,22 +440,34 @@ class AdaptiveWeightCalculator:
 
 
 class UniversalEvaluator:
-    """通用评估器，整合所有评估因素"""
+    """通用评估器，整合所有评估因素
 
-    def __init__(self, game):
+    Args:
+        params: 评估参数（键同 DEFAULT_PARAMS，缺少的用默认值）；None 时读取该配置的调优结果
+    """
+
+    def __init__(self, game, params=None):
         self.game = game
+        if params is None:
+            params = load_tuned_params(game.n, game.m, game.win_count)
+        self.params = dict(DEFAULT_PARAMS, **params)
         self.K = game.win_count
         self.M = game.m
         self.detector = DynamicPatternDetector(self.K)
-        self.weights = AdaptiveWeightCalculator(self.K, self.M).calculate_weights()
+        # score_all_moves 用：numpy 模块（None 未检查，False 不可用）、中心价值表、窗口下标数组
+        self.np = None
+        self.centrality_maps = {}
+        self.window_arrays = {}
+        # 当前对局的增量威胁表（随 game 落子 / 棋子消失更新）
+        self.threats = ThreatTable(game.n, self.K)
+        # 当前对局棋盘的哈希和 _evaluate_board_score 的估值缓存
+        self.position = PositionHash(game.n)
+        self.cache = EvaluationCache()
+        self.weights = AdaptiveWeightCalculator(self.K, self.M, self.params).calculate_weights()
 
         # 基础评分表
-        self.base_scores = {
-            'immediate_win': 10000,
-            'one_move_threat': 5000,
-            'building_threat': 1000,
-            'potential_threat': 100
-        }
+        self.base_scores = {level: self.params[level]
+                            for level in ('immediate_win', 'one_move_threat', 'building_threat', 'potential_threat')}
 
     def evaluate_position(self, player):
         """评估当前局面得分
@@ -195,45 +478,30 @@ class UniversalEvaluator:
         Returns:
             局面评估分数
         """
-        score = 0
+        # 1. 位置控制得分
+        score = self._evaluate_position_control(player)
 
-        # 1. 威胁评估
-        threats = self.detector.detect_threats(self.game.board, player)
-        opponent_threats = self.detector.detect_threats(self.game.board, -player)
-
-        # 进攻得分
-        for threat_type, patterns in threats.items():
-            for pattern in patterns:
-                score += self._score_pattern(pattern, threat_type, is_attack=True)
-
-        # 防守得分（阻止对手）
-        for threat_type, patterns in opponent_threats.items():
-            for pattern in patterns:
-                score += self._score_pattern(pattern, threat_type, is_attack=False)
-
-        # 2. 位置控制得分
-        score += self._evaluate_position_control(player)
-
-        # 3. 时间线调整（考虑棋子消失）
+        # 2. 时间线调整（考虑棋子消失）
         score = self._adjust_for_fading_timeline(score)
 
         return score
 
-    def _score_pattern(self, pattern, threat_type, is_attack):
-        """评分单个模式"""
-        base_score = self.base_scores.get(threat_type, 0)
-
-        # 根据模式长度调整
-        length = pattern['length']
-        length_factor = self.weights.get(length, 1.0)
-
-        # 进攻/防守调整
-        attack_factor = 1.2 if is_attack else 1.0
+    def evaluate_threats(self, table, player):
+        """由增量威胁表估值（搜索的叶子估值），O(K)
 
-        # 棋子年龄调整（考虑棋子消失）
-        age_factor = self._calculate_age_factor(pattern['age_info'])
+        双方 "只有己方棋子" 的 K 长窗口按棋子数计数，每个窗口按威胁级别基础分 × 长度权重计分，
+        己方乘进攻系数（attack_factor），对手记负分。
 
-        return base_score * length_factor * attack_factor * age_factor
+        Args:
+            table: 与局面同步的 ThreatTable
+            player: 要评估的玩家（一般是轮到走棋的一方）
+        """
+        score = 0.0
+        attack = self.params['attack_factor']
+        for length in range(1, self.K):
+            value = self.base_scores[self.detector.pattern_types[length]] * self.weights[length]
+            score += value * (attack * table.count(player, length) - table.count(-player, length))
+        return score
 
     def _evaluate_position_control(self, player):
         """评估位置控制得分"""
@@ -274,39 +542,6 @@ class UniversalEvaluator:
 
         return density
 
-    def _calculate_age_factor(self, age_info):
-        """根据棋子年龄计算调整因子
-
-        新棋子权重高，即将消失的棋子权重低
-
-        """
-
-        if not age_info or all(age == -1 for age in age_info):
-            return 1.0  # 全是空位
-
-        # 计算有效棋子的平均年龄
-
-        valid_ages = [age for age in age_info if age != -1]
-
-        if not valid_ages:
-
-            return 1.0
-
-        avg_age = sum(valid_ages) / len(valid_ages)
-
-
-        # 年龄因子：年龄越小（越新），因子越大
-
-        if self.M > 0:
-
-            age_ratio = avg_age / self.M
-
-            # 指数衰减：新棋子权重高，旧棋子权重低
-
-            return math.exp(-2 * age_ratio)
-
-        return 1.0
-
     def _adjust_for_fading_timeline(self, score):
         """根据棋子消失时间线调整分数
 
@@ -324,13 +559,24 @@ class UniversalEvaluator:
 
         return score
 
-    def _check_win_at_position(self, board, player, i, j):
+    def _evicted_piece(self, board, player):
+        """player 此时落子会消失的己方棋子 (i, j)；不会消失，或 board 不是当前对局棋盘时返回 None"""
+        if board is not self.game.board:
+            return None
+        pieces = self.game.x if player == 1 else self.game.y
+        if len(pieces) < self.M:
+            return None
+        i, j = pieces[0]
+        return i, j
+
+    def _check_win_at_position(self, board, player, i, j, evicted=None):
         """检查在位置(i,j)落子后，玩家是否获胜
 
         Args:
             board: 棋盘状态
             player: 玩家 (1=X, -1=O)
             i, j: 落子位置
+            evicted: 落子后消失的己方棋子 (i, j)，不计入连线
 
         Returns:
             True如果获胜，否则False
@@ -338,10 +584,12 @@ class UniversalEvaluator:
         n = len(board)
         K = self.game.win_count
 
-        # 临时创建模拟棋盘
-        sim_board = [row[:] for row in board]
-        sim_board[i][j] = player
+        # 当前对局棋盘：查增量威胁表，只看经过该格的窗口
+        if board is self.game.board and board[i][j] == 0:
+            return self.threats.follow(self.game).wins_at(
+                i * n + j, player, None if evicted is None else evicted[0] * n + evicted[1])
 
+        # 只沿四个方向数 (i, j) 两侧的相邻棋子，(i, j) 本身不必放到棋盘上，也就不用复制棋盘
         # 检查所有方向
         directions = [
             [(0, 1), (0, -1)],  # 水平
@@ -355,7 +603,7 @@ class UniversalEvaluator:
             for (di, dj) in dir_pair:
                 length_in_dir = 0
                 ni, nj = i + di, j + dj
-                while 0 <= ni < n and 0 <= nj < n and sim_board[ni][nj] == player:
+                while 0 <= ni < n and 0 <= nj < n and board[ni][nj] == player and (ni, nj) != evicted:
                     length_in_dir += 1
                     ni += di
                     nj += dj
@@ -379,40 +627,40 @@ class UniversalEvaluator:
         """
         n = len(board)
         opponent = -player
+        # 双方在此落子时各自消失的最早棋子（限步规则）
+        evicted = self._evicted_piece(board, player)
+        opponent_evicted = self._evicted_piece(board, opponent)
 
         # 1. 紧急情况检查：如果自己能立即获胜，直接给最高分
-        if self._check_win_at_position(board, player, move_i, move_j):
-            return 100000  # 立即获胜，最高优先级
+        if self._check_win_at_position(board, player, move_i, move_j, evicted):
+            return self.params['win_score']  # 立即获胜，最高优先级
 
         # 2. 防守紧急情况：如果对手在此位置落子能立即获胜，给予极高防守分
-        if self._check_win_at_position(board, opponent, move_i, move_j):
+        if self._check_win_at_position(board, opponent, move_i, move_j, opponent_evicted):
             # 防守立即获胜威胁，优先级仅次于自己立即获胜
-            defensive_score = 50000
+            defensive_score = self.params['block_score']
         else:
             # 3. 常规防守得分：评估对手在此位置落子后的威胁潜力
-            sim_board_opp = [row[:] for row in board]  # 深拷贝
-            sim_board_opp[move_i][move_j] = opponent
-            defensive_threat = self._evaluate_board_score(sim_board_opp, opponent)
+            defensive_threat = self._evaluate_board_score_after_move(board, opponent, move_i, move_j, opponent_evicted)
 
             # 动态防守权重：根据威胁级别调整
-            if defensive_threat > 5000:
-                defensive_weight = 1.5  # 紧急防守
-            elif defensive_threat > 1000:
-                defensive_weight = 1.2  # 重要防守
+            params = self.params
+            if defensive_threat > params['urgent_threshold']:
+                defensive_weight = params['defense_urgent']     # 紧急防守
+            elif defensive_threat > params['important_threshold']:
+                defensive_weight = params['defense_important']  # 重要防守
             else:
-                defensive_weight = 0.8  # 常规防守
+                defensive_weight = params['defense_normal']     # 常规防守
 
             defensive_score = defensive_threat * defensive_weight
 
         # 4. 常规进攻得分
-        sim_board_ai = [row[:] for row in board]  # 深拷贝
-        sim_board_ai[move_i][move_j] = player
-        offensive_score = self._evaluate_board_score(sim_board_ai, player)
+        offensive_score = self._evaluate_board_score_after_move(board, player, move_i, move_j, evicted)
 
         # 5. 位置控制得分（中心价值）
         center_dist = math.sqrt(((move_i - n/2) ** 2 + (move_j - n/2) ** 2))
         position_value = 10.0 / (1.0 + center_dist)
-        position_score = position_value * 100
+        position_score = position_value * self.params['center_move']
 
         # 6. 综合得分：进攻 + 防守 + 位置
         total_score = offensive_score + defensive_score + position_score
@@ -420,6 +668,34 @@ class UniversalEvaluator:
 
         return total_score
 
+    def _evaluate_board_score_after_move(self, board, player, i, j, evicted=None):
+        """player 在 (i, j) 落子（并提走 evicted）后的 _evaluate_board_score
+
+        直接在 board 上落子、评估、还原，不复制棋盘。当前对局棋盘上的估值按局面哈希缓存。
+        """
+        key = None
+        if board is self.game.board:
+            n = len(board)
+            position = self.position.follow(self.game)
+            key = position.for_player(
+                position.moved(i * n + j, player, None if evicted is None else evicted[0] * n + evicted[1]), player)
+            score = self.cache.get(key)
+            if score is not None:
+                return score
+
+        board[i][j] = player
+        if evicted is not None:
+            board[evicted[0]][evicted[1]] = 0
+        try:
+            score = self._evaluate_board_score(board, player)
+        finally:
+            if evicted is not None:
+                board[evicted[0]][evicted[1]] = player
+            board[i][j] = 0
+        if key is not None:
+            self.cache.put(key, score)
+        return score
+
     def _evaluate_board_score(self, board, player):
         """评估指定棋盘状态对指定玩家的得分
 
@@ -432,20 +708,6 @@ class UniversalEvaluator:
         """
         score = 0
 
-        # 使用detector检测威胁
-        threats = self.detector.detect_threats(board, player)
-        opponent_threats = self.detector.detect_threats(board, -player)
-
-        # 进攻得分（己方威胁）
-        for threat_type, patterns in threats.items():
-            for pattern in patterns:
-                score += self._score_pattern(pattern, threat_type, is_attack=True)
-
-        # 防守得分（对手威胁）
-        for threat_type, patterns in opponent_threats.items():
-            for pattern in patterns:
-                score += self._score_pattern(pattern, threat_type, is_attack=False)
-
         # 位置控制得分（简化版本）
         n = len(board)
         position_score = 0
@@ -455,55 +717,210 @@ class UniversalEvaluator:
                     # 中心价值
                     center_dist = math.sqrt(((i - n/2) ** 2 + (j - n/2) ** 2))
                     position_value = 1.0 / (1.0 + center_dist)
-                    position_score += position_value * 10
+                    position_score += position_value * self.params['center_board']
 
         score += position_score
 
         return score
 
 
+    def _centrality(self, n):
+        """(棋盘评分用的中心价值, 落子位置得分) 两张 n*n 表，与逐格计算的浮点值完全相同"""
+        maps = self.centrality_maps.get(n)
+        if maps is None:
+            board_values, move_values = [], []
+            for i in range(n):
+                for j in range(n):
+                    center_dist = math.sqrt(((i - n/2) ** 2 + (j - n/2) ** 2))
+                    board_values.append(1.0 / (1.0 + center_dist) * self.params['center_board'])
+                    move_values.append(10.0 / (1.0 + center_dist) * self.params['center_move'])
+            maps = self.centrality_maps[n] = (self.np.array(board_values), self.np.array(move_values))
+        return maps
+
+    def score_all_moves(self, board, player, candidates=None):
+        """用 NumPy 一次算出所有空位（或 candidates 中各空格）的 evaluate_move_score
+
+        Returns:
+            (空位下标数组 i * n + j（行优先）, 得分数组)；没有 numpy 时返回 None，
+            由调用方逐格调用 evaluate_move_score。
+            得分与逐格计算逐位相同，因此 argmax（取第一个最大值）选出的落子也相同。
+        """
+        if self.np is None:
+            try:
+                import numpy
+                self.np = numpy
+            except ImportError:
+                self.np = False
+        if self.np is False:
+            return None
+        np = self.np
+        n = len(board)
+
+        flat = np.array(board, dtype=np.int8).ravel()
+        cells = np.flatnonzero(flat == 0) if candidates is None else np.asarray(candidates, dtype=np.intp)
+        if not len(cells):
+            return cells, np.zeros(0)
+        board_values, move_values = self._centrality(n)
+
+        # 每个 K 长窗口的双方棋子数（窗口下标表 + 求和 = 所有方向的滑动窗口和）
+        geometry = LineGeometry.get(n, self.K)
+        windows = self.window_arrays.get(n)
+        if windows is None:
+            windows = self.window_arrays[n] = np.array(geometry.windows, dtype=np.intp).reshape(-1, self.K)
+        values = flat[windows]
+        own = (values == player).sum(axis=1)
+        opp = (values == -player).sum(axis=1)
+
+        def evicted_cell(side):
+            piece = self._evicted_piece(board, side)
+            return None if piece is None else piece[0] * n + piece[1]
+
+        def completes(mine, theirs, evicted):
+            """落子后能连成 K 子的空格：己方 K - 1 子、无对手棋子、且不含消失棋子的窗口里唯一的空格"""
+            hits = np.zeros(n * n, dtype=bool)
+            ready = windows[(mine == self.K - 1) & (theirs == 0)]
+            if evicted is not None:
+                ready = ready[(ready != evicted).all(axis=1)]
+            hits[ready[flat[ready] == 0]] = True
+            return hits[cells]
+
+        def board_score(side, evicted):
+            """_evaluate_board_score 中的位置得分：按行优先顺序累加 side 的棋子（除去消失的）和新落子"""
+            pieces = np.flatnonzero(flat == side)
+            if evicted is not None:
+                pieces = pieces[pieces != evicted]
+            insert = np.searchsorted(pieces, cells)
+            total = np.zeros(len(cells))
+            for step in range(len(pieces) + 1):
+                before = board_values[pieces[step]] if step < len(pieces) else 0.0
+                after = board_values[pieces[step - 1]] if step else 0.0
+                total = total + np.where(step < insert, before,
+                                         np.where(step == insert, board_values[cells], after))
+            return total
+
+        evicted, opponent_evicted = evicted_cell(player), evicted_cell(-player)
+        defensive_threat = board_score(-player, opponent_evicted)
+        params = self.params
+        defensive_weight = np.where(defensive_threat > params['urgent_threshold'], params['defense_urgent'],
+                                    np.where(defensive_threat > params['important_threshold'],
+                                             params['defense_important'], params['defense_normal']))
+        defensive_score = np.where(completes(opp, own, opponent_evicted), params['block_score'],
+                                   defensive_threat * defensive_weight)
+        total = board_score(player, evicted) + defensive_score + move_values[cells]
+        return cells, np.where(completes(own, opp, evicted), params['win_score'], total)
+
+
 class Strategy:
-    """启发式AI策略"""
+    """启发式AI策略
+
+    Args:
+        radius: 只评估与已有棋子距离不超过 radius 的空格（见 CandidateSet），None 表示评估全部空格
+        params: 评估参数，None 时使用该配置的调优结果（没有则用默认值）
+        threat_depth: 落子前威胁空间搜索的深度，None 表示不做
+    """
 
-    def __init__(self, game):
+    def __init__(self, game, radius=DEFAULT_RADIUS, params=None, threat_depth=DEFAULT_THREAT_DEPTH):
         self.name = "Heuristic AI"
         self.game = game
-        self.evaluator = UniversalEvaluator(game)
+        self.params = params
+        self.evaluator = UniversalEvaluator(game, params)
+        self.candidates = CandidateSet(game.n, radius) if radius is not None else None
+        self.threat_depth = threat_depth
+        self.threat_search = None
+        # 最近一次威胁空间搜索的结论：('win' / 'defend' / 'lost', 序列)，没有发现时为 None
+        self.tactic = None
+
+    def make_move(self, deadline=None):
+        """执行AI落子
+
+        Args:
+            deadline: time.perf_counter() 截止时刻；逐格评估时到点即停，下已评估过的最佳位置
+        """
+        # display 会把缓存的策略实例换到新的 game 上；评估器的消失判断、威胁表和估值缓存只认它自己的 game
+        if self.evaluator.game is not self.game:
+            self.evaluator = UniversalEvaluator(self.game, self.params)
 
-    def make_move(self):
-        """执行AI落子"""
         # 确定当前该谁下棋
         # 0 = X的回合，1 = O的回合
         current_turn = len(self.game.history) % 2
         ai_player = 1 if current_turn == 0 else -1  # X=1, O=-1
 
-        best_score = -float('inf')
-        best_move = None
-
         # 获取当前棋盘状态
         n = self.game.n
-        current_board = self.game.board  # 直接引用，evaluate_move_score会深拷贝
+        current_board = self.game.board  # 直接引用，evaluate_move_score 试落子后会还原
 
-        # 评估所有空位
-        for i in range(n):
-            for j in range(n):
-                if current_board[i][j] == 0:
-                    # 使用UniversalEvaluator评估落子位置的综合得分
-                    score = self.evaluator.evaluate_move_score(
-                        current_board, ai_player, i, j
-                    )
+        # 候选空格（行优先）；不剪枝时为全部空格
+        if self.candidates is not None:
+            candidates = self.candidates.follow(self.game).cells()
+        else:
+            candidates = [t for t in range(n * n) if current_board[t // n][t % n] == 0]
 
-                    if score > best_score:
-                        best_score = score
-                        best_move = (i, j)
+        # 有 numpy 时一次算出所有候选的得分（与逐格计算相同）
+        scored = self.evaluator.score_all_moves(current_board, ai_player, candidates)
+        if scored is not None:
+            cells, scores = scored
+            pairs = list(zip(cells.tolist(), scores.tolist()))
+        else:
+            # 逐个评估候选
+            pairs = []
+            for t in candidates:
+                if pairs and deadline is not None and time.perf_counter() > deadline:
+                    break
+                # 使用UniversalEvaluator评估落子位置的综合得分
+                pairs.append((t, self.evaluator.evaluate_move_score(current_board, ai_player, t // n, t % n)))
+        if not pairs:
+            return False
+
+        # 最高分（同分取行优先靠前的）
+        t = max(pairs, key=lambda pair: pair[1])[0]
+        if self.threat_depth is not None:
+            forced = self._threat_pass(ai_player, pairs, deadline)
+            if forced is not None:
+                t = forced
 
         # 执行最佳落子
-        if best_move:
-            i, j = best_move
-            self.game.play(i, j)
-            return True
+        self.game.play(t // n, t % n)
+        return True
 
-        return False
+    def _threat_pass(self, ai_player, pairs, deadline=None):
+        """威胁空间搜索：自己有必胜序列时走它的第一步；对手有必胜序列（自己停一步的话）时，
+        按得分从高到低找一个能化解的落子。其他情况返回 None，按估值落子。
+
+        只看必胜序列，不做评估；对手一步就能连成 K 时交给估值的堵点分处理。
+        """
+        from strategies.search.search_strategy import SearchState
+        from strategies.search.threat_space import ThreatSpaceSearch
+
+        if self.threat_search is None or self.threat_search.max_depth != self.threat_depth:
+            self.threat_search = ThreatSpaceSearch(self.threat_depth)
+        search = self.threat_search
+        self.tactic = None
+        state = SearchState(self.game, radius=None)
+
+        line = search.find_win(state, ai_player, deadline)
+        if line is not None:
+            self.tactic = ('win', line)
+            return line[0]
+        line = search.find_win(state, -ai_player, deadline)
+        if line is None or len(line) == 1:
+            return None
+
+        # 候选：对手序列中的格子 + 得分最高的若干个，按得分从高到低检查
+        ranked = sorted(pairs, key=lambda pair: -pair[1])
+        cells = set(line)
+        tries = [p for k, (p, _) in enumerate(ranked) if k < DEFAULT_DEFENSE_MOVES or p in cells]
+        for p in tries:
+            if deadline is not None and time.perf_counter() > deadline:
+                break
+            state.make(p)
+            # 搜索中途放弃的不算化解
+            refuted = search.find_win(state, -ai_player, deadline) is None and search.complete
+            state.unmake()
+            if refuted:
+                self.tactic = ('defend', line)
+                return p
+        self.tactic = ('lost', line)
+        return None
 
     def _evaluate_position_score(self, board, player, move_i, move_j):
         """评估落子位置得分"""
@@ -0,0 +1,283 @@
+"""启发式 AI 评估参数的自对弈调优（SPSA）
+
+DEFAULT_PARAMS 里的威胁基础分、长度权重、防守系数和阈值、中心价值都是手工选定的，
+不同 (n, m, K) 下的最优值并不相同。这里按配置用 SPSA 调优：
+
+    1. 参数在对数空间里表示：value = 默认值 * exp(theta)，theta 从当前调优结果（或 0）开始
+    2. 每轮随机取 ±1 扰动方向 delta，对比 theta + c*delta 与 theta - c*delta：
+       - opponent='self'：两者直接对弈
+       - opponent='heuristic' / 'perfect'：两者分别对战默认参数的启发式 AI / 完美 AI，取得分之差
+       每组对局使用随机开局（开局前 opening 步随机），每个开局交换先后手各下一盘
+    3. theta += a_k * 得分差 / (2 * c_k * delta)（a_k、c_k 按 SPSA 标准速率衰减）
+    4. 每 check_every 轮用 validation_games 盘对局检验当前参数（对默认参数或对手），
+       连续 patience 次没有超过最好成绩则提前停止；所有验证和默认参数的基准都用同一组开局，
+       得分之差不含开局带来的噪声
+    5. 最好参数是按验证开局选出来的，验证得分偏高；最后换一组没用过的开局（留出种子）
+       再和默认参数比一次，只有留出得分也超过默认参数时才写入 tuned_params.json 的 "n,m,k" 项；
+       UniversalEvaluator 按配置自动读取（启发式 AI 和 Alpha-Beta AI 都用它）
+
+被调优的一方可以是一步启发式 AI（player='heuristic'），也可以是固定深度的 alpha-beta 搜索
+（player='search'，叶子估值用威胁基础分、长度权重和进攻系数）。一步启发式的选择主要由
+中心价值和防守项决定，对多数参数不敏感；搜索对威胁权重敏感得多，更适合调优。
+对局分发到进程池（每盘一个任务），工作进程各自创建策略实例；固定深度的搜索是确定性的，结果可复现。
+
+用法：
+    python -m strategies.heuristic.tuning --config 9 5 5 --iterations 200 --games 64 --workers 8
+    python -m strategies.heuristic.tuning --config 7 4 4 --player search --depth 2 --workers 8
+    python -m strategies.heuristic.tuning --config 3 3 3 --opponent perfect --games 200
+"""
+
+import json
+import math
+import os
+import random
+import time
+from importlib import import_module
+from multiprocessing import Pool
+
+from Game import GameBase
+from strategies.heuristic.heuristic_strategy import (DEFAULT_PARAMS, TUNED_PARAMS_FILE, Strategy,
+                                                     load_tuned_params, params_key)
+
+# 参与调优的参数（立即获胜 / 堵点分只用于排序，不调）
+TUNABLE = [
+    'immediate_win', 'one_move_threat', 'building_threat', 'potential_threat',
+    'length_k1', 'length_k2', 'length_k3', 'length_far', 'attack_factor',
+    'defense_urgent', 'defense_important', 'defense_normal', 'urgent_threshold', 'important_threshold',
+    'center_move', 'center_board',
+]
+# theta 的取值范围：默认值的 e^-3 ~ e^3 倍
+THETA_LIMIT = 3.0
+
+# 有完美 AI 的配置
+PERFECT_STRATEGIES = {
+    (3, 3, 3): 'strategies.perfect3x3.perfect_strategy',
+    (4, 3, 3): 'strategies.perfect4x4_m3.perfect_strategy',
+    (4, 4, 4): 'strategies.perfect4x4_m4.perfect_strategy',
+}
+
+DEFAULT_OPENING = 2
+DEFAULT_MAX_MOVES = 100
+DEFAULT_DEPTH = 2
+
+# 工作进程内的全局状态（由 _init_worker 设置）
+_config = None
+_opponent = None
+_player = None
+_depth = None
+_perfect = None
+
+
+def params_from_theta(theta, base=DEFAULT_PARAMS):
+    """theta（与 TUNABLE 对应）-> 完整参数字典"""
+    params = dict(base)
+    for name, t in zip(TUNABLE, theta):
+        params[name] = base[name] * math.exp(t)
+    return params
+
+
+def theta_from_params(params, base=DEFAULT_PARAMS):
+    return [math.log(params[name] / base[name]) if params[name] > 0 else 0.0 for name in TUNABLE]
+
+
+def _init_worker(config, opponent, player='heuristic', depth=DEFAULT_DEPTH):
+    global _config, _opponent, _player, _depth, _perfect
+    _config = config
+    _opponent = opponent
+    _player = player
+    _depth = depth
+    if opponent == 'perfect':
+        # 完美 AI 只加载一次表，之后每盘换上新的 game
+        _perfect = import_module(PERFECT_STRATEGIES[config]).Strategy(GameBase(*config))
+
+
+def _make_player(game, params):
+    """被调优的一方（或默认参数的同类对手）"""
+    if _player == 'search':
+        from strategies.search.search_strategy import Strategy as SearchStrategy
+        return SearchStrategy(game, time_limit=None, max_depth=_depth, params=params)
+    return Strategy(game, params=params)
+
+
+def _make_opponent(game):
+    if _opponent == 'perfect':
+        _perfect.game = game
+        return _perfect
+    return _make_player(game, DEFAULT_PARAMS)
+
+
+def play_game(task):
+    """(params_a, params_b, seed, a_first, opening, max_moves) -> A 的得分：胜 1、负 -1、平 0
+
+    params_b 为 None 时 B 是对手（默认参数的同类 AI 或完美 AI）。
+    """
+    params_a, params_b, seed, a_first, opening, max_moves = task
+    n, m, k = _config
+    rng = random.Random(seed)
+    game = GameBase(n, m, k)
+    for _ in range(opening):
+        empty = [(i, j) for i in range(n) for j in range(n) if game.board[i][j] == 0]
+        game.play(*rng.choice(empty))
+        if game.get_result():
+            return 0
+
+    a = _make_player(game, params_a)
+    b = _make_player(game, params_b) if params_b is not None else _make_opponent(game)
+    players = (a, b) if a_first else (b, a)
+    # 开局步数为奇数时轮到 O，players[0] 始终是当前该走的一方
+    for step in range(max_moves):
+        if not players[step % 2].make_move():
+            return 0
+        result = game.get_result()
+        if result:
+            mover = players[step % 2]
+            return 1 if mover is a else -1
+    return 0
+
+
+class Match:
+    """用进程池下一组配对对局
+
+    Args:
+        pool: multiprocessing.Pool（initializer=_init_worker）
+        opening / max_moves: 随机开局步数、每盘最多步数
+    """
+
+    def __init__(self, pool, opening=DEFAULT_OPENING, max_moves=DEFAULT_MAX_MOVES):
+        self.pool = pool
+        self.opening = opening
+        self.max_moves = max_moves
+        self.games = 0
+
+    def score(self, params_a, params_b, games, seed):
+        """A 的平均得分（-1 ~ 1）；games 盘，每个开局交换先后手各一盘"""
+        tasks = []
+        for g in range(max(1, games // 2)):
+            for a_first in (True, False):
+                tasks.append((params_a, params_b, seed * 1000003 + g, a_first, self.opening, self.max_moves))
+        results = self.pool.map(play_game, tasks, chunksize=max(1, len(tasks) // 32))
+        self.games += len(results)
+        return sum(results) / len(results)
+
+
+def spsa(match, opponent='self', iterations=100, games=64, validation_games=200, check_every=10, patience=3,
+         a=0.5, c=0.2, theta=None, seed=0, log=print):
+    """SPSA 调优，返回 (最好参数, 最好验证得分, 留出得分, 已下盘数)
+
+    验证得分为对默认参数（opponent='self'）或对手的平均得分；默认参数本身记 0（对手时单独测一次）。
+    每次验证和默认参数的基准都用同一个种子（同一组开局），返回的最好得分是相对默认参数的提升。
+    最好参数是按这组开局挑出来的，最后在另一个种子的开局上重新与默认参数比较，得到留出得分
+    （同样是相对默认参数的提升；最好参数就是默认参数时为 0）。
+    """
+    rng = random.Random(seed)
+    theta = list(theta) if theta is not None else [0.0] * len(TUNABLE)
+    stability = max(1, iterations // 10)
+    baseline = DEFAULT_PARAMS if opponent == 'self' else None
+    validation_seed = rng.getrandbits(30)
+
+    default_score = 0.0 if opponent == 'self' else match.score(DEFAULT_PARAMS, None, validation_games,
+                                                                 validation_seed)
+    best_params = params_from_theta(theta)
+    if best_params == DEFAULT_PARAMS:
+        best_score = default_score
+    else:
+        best_score = match.score(best_params, baseline, validation_games, validation_seed)
+    log(f"初始: {best_score:+.3f}（默认参数 {default_score:+.3f}）")
+    stale = 0
+    for k in range(iterations):
+        ak = a / (k + 1 + stability) ** 0.602
+        ck = c / (k + 1) ** 0.101
+        delta = [rng.choice((-1, 1)) for _ in TUNABLE]
+        plus = params_from_theta([t + ck * d for t, d in zip(theta, delta)])
+        minus = params_from_theta([t - ck * d for t, d in zip(theta, delta)])
+        round_seed = rng.getrandbits(30)
+        if opponent == 'self':
+            diff = match.score(plus, minus, games, round_seed)
+        else:
+            diff = match.score(plus, None, games, round_seed) - match.score(minus, None, games, round_seed)
+        theta = [max(-THETA_LIMIT, min(THETA_LIMIT, t + ak * diff / (2 * ck * d))) for t, d in zip(theta, delta)]
+
+        if (k + 1) % check_every == 0 or k + 1 == iterations:
+            params = params_from_theta(theta)
+            score = match.score(params, baseline, validation_games, validation_seed)
+            if score > best_score:
+                best_params, best_score, stale = params, score, 0
+            else:
+                stale += 1
+            log(f"第 {k + 1} 轮: 验证 {score:+.3f}，最好 {best_score:+.3f}，已下 {match.games:,} 盘")
+            if stale >= patience:
+                log(f"连续 {patience} 次没有提升，提前停止")
+                break
+    if opponent != 'self':
+        best_score -= default_score
+
+    holdout_score = 0.0
+    if best_params != DEFAULT_PARAMS:
+        holdout_seed = rng.getrandbits(30)
+        while holdout_seed == validation_seed:
+            holdout_seed = rng.getrandbits(30)
+        holdout_score = match.score(best_params, baseline, validation_games, holdout_seed)
+        if opponent != 'self':
+            holdout_score -= match.score(DEFAULT_PARAMS, None, validation_games, holdout_seed)
+        log(f"留出开局: {holdout_score:+.3f}（验证 {best_score:+.3f}）")
+    return best_params, best_score, holdout_score, match.games
+
+
+def save_tuned_params(config, params, info, path=TUNED_PARAMS_FILE):
+    """写入 path 的 "n,m,k" 项（先写临时文件再替换）"""
+    try:
+        with open(path, encoding='utf-8') as f:
+            table = json.load(f)
+    except (OSError, ValueError):
+        table = {}
+    table[params_key(*config)] = dict(info, params={name: params[name] for name in TUNABLE})
+    tmp = path + '.tmp'
+    with open(tmp, 'w', encoding='utf-8') as f:
+        json.dump(table, f, indent=2, sort_keys=True)
+        f.write('\n')
+    os.replace(tmp, path)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    parser = argparse.ArgumentParser(description='启发式 AI 评估参数的 SPSA 自对弈调优')
+    parser.add_argument('--config', type=int, nargs=3, metavar=('N', 'M', 'K'), required=True)
+    parser.add_argument('--opponent', choices=['self', 'heuristic', 'perfect'], default='self',
+                        help='self：扰动参数互相对弈；heuristic / perfect：各自对战默认参数 / 完美 AI')
+    parser.add_argument('--player', choices=['heuristic', 'search'], default='heuristic',
+                        help='被调优的 AI：一步启发式，或固定深度的 alpha-beta 搜索')
+    parser.add_argument('--depth', type=int, default=DEFAULT_DEPTH, help='--player search 的搜索深度')
+    parser.add_argument('--iterations', type=int, default=100)
+    parser.add_argument('--games', type=int, default=64, help='每轮每组对局盘数')
+    parser.add_argument('--validation-games', type=int, default=200, help='每次验证的盘数')
+    parser.add_argument('--check-every', type=int, default=10, help='每隔多少轮验证一次')
+    parser.add_argument('--patience', type=int, default=3, help='连续多少次验证没有提升就停止')
+    parser.add_argument('--opening', type=int, default=DEFAULT_OPENING, help='随机开局步数')
+    parser.add_argument('--max-moves', type=int, default=DEFAULT_MAX_MOVES, help='每盘最多步数（超过记平局）')
+    parser.add_argument('--workers', type=int, default=None, help='进程数（默认 CPU 核数）')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--fresh', action='store_true', help='从默认参数开始（默认从已有调优结果继续）')
+    parser.add_argument('--output', default=TUNED_PARAMS_FILE)
+    args = parser.parse_args()
+
+    config = tuple(args.config)
+    if args.opponent == 'perfect' and config not in PERFECT_STRATEGIES:
+        parser.error(f"{params_key(*config)} 没有完美 AI，可用：{', '.join(params_key(*c) for c in PERFECT_STRATEGIES)}")
+
+    start = time.time()
+    theta = None if args.fresh else theta_from_params(load_tuned_params(*config, path=args.output))
+    with Pool(args.workers, initializer=_init_worker, initargs=(config, args.opponent, args.player, args.depth)) as pool:
+        params, validation_score, score, games = spsa(Match(pool, args.opening, args.max_moves), args.opponent,
+                                    iterations=args.iterations, games=args.games,
+                                    validation_games=args.validation_games, check_every=args.check_every,
+                                    patience=args.patience, theta=theta, seed=args.seed)
+    elapsed = time.time() - start
+    print(f"共 {games:,} 盘，{elapsed:.1f}s，相对默认参数：验证 {validation_score:+.3f}，留出 {score:+.3f}")
+    if score > 0:
+        save_tuned_params(config, params, {'score': round(score, 4), 'validation_score': round(validation_score, 4),
+                                          'games': games, 'opponent': args.opponent, 'player': args.player},
+                          args.output)
+        print(f"已写入 {args.output} [{params_key(*config)}]")
+    else:
+        print("留出开局上没有超过默认参数，不写入")
@@ -4,7 +4,7 @@ class Strategy:
         self.game = game
         self.input_func = input_func
 
-    def make_move(self):
+    def make_move(self, deadline=None):
         if self.input_func is None:
             return False
         i, j = self.input_func()
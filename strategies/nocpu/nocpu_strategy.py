@@ -3,6 +3,6 @@ class Strategy:
         self.name = 'AI Not Available'
         self.game = game
 
-    def make_move(self):
+    def make_move(self, deadline=None):
         """AI 不可用占位策略，返回 False"""
         return False
@@ -1,7 +1,8 @@
-from collections import deque
+from collections import Counter, deque
 import os
 import struct
 import inspect
+import time
 
 class SymmetryHelper:
     """处理3×3棋盘的对称性"""
@@ -82,6 +83,12 @@ class GameTreeSolver:
         self.mmap_obj = None
         self.record_size = 14  # state(8) + dp0(1) + dp1(1) + depth0(2) + depth1(2)
         self.num_records = 0
+        # numpy.memmap 结构化数组视图（query_many 首次调用时创建，False 表示没有 numpy）
+        self.records = None
+        # fence 稀疏索引（gametree.table.FenceIndex）
+        self.fence = None
+        # 共享内存表（gametree.shared.SharedTable，load_shared 挂载）
+        self.shared = None
 
     def add_state(self, state):
         """添加状态"""
@@ -145,56 +152,86 @@ class GameTreeSolver:
             self.add_state(s)
             self.dp[s] = [-1, -1]
 
-    def solve(self, debug=False):
-        """博弈树求解"""
-        edge0_ = {s: [] for s in self.edge0}
-        edge1_ = {s: [] for s in self.edge1}
-        for s in self.edge0:
-            for t in self.edge0[s]:
-                edge0_[t].append(s)
-            for t in self.edge1[s]:
-                edge1_[t].append(s)
+    def solve(self, debug=False, vectorized=False, telemetry=None):
+        """博弈树求解
 
-        need = {s: [len(self.edge0[s]), len(self.edge1[s])] for s in self.edge0}
+        Args:
+            vectorized: 使用逐层 NumPy 传播（gametree.retrograde），结果与 deque 版本一致
+            telemetry: 可选 gametree.telemetry.Telemetry，记录阶段耗时和每层 frontier
+        """
+        if vectorized:
+            from gametree.retrograde import solve_graph
+            solve_graph(self, debug=debug, telemetry=telemetry)
+            return
+
+        # 只有需要遥测时才在传播循环里按 depth 计数
+        count_layers = telemetry is not None
+        y_depths = z_depths = None
+        if telemetry is None:
+            from gametree.telemetry import Telemetry
+            telemetry = Telemetry()
+
+        with telemetry.phase('reverse_edges') as ph:
+            edge0_ = {s: [] for s in self.edge0}
+            edge1_ = {s: [] for s in self.edge1}
+            for s in self.edge0:
+                for t in self.edge0[s]:
+                    edge0_[t].append(s)
+                for t in self.edge1[s]:
+                    edge1_[t].append(s)
+
+            need = {s: [len(self.edge0[s]), len(self.edge1[s])] for s in self.edge0}
+            ph['states'] = len(need)
+            ph['edges'] = sum(n0 + n1 for n0, n1 in need.values())
 
         if debug:
             print(f"  solve开始: win={len(self.win)}, lose={len(self.lose)}")
             print(f"  edge0_有反向边的状态数: {sum(1 for s in edge0_ if edge0_[s])}")
             print(f"  edge1_有反向边的状态数: {sum(1 for s in edge1_ if edge1_[s])}")
 
-        deq = deque(self.win)
-        win_propagate_count = 0
-        first_batch_updates = []
-        iteration = 0
-        while deq:
-            x = deq.popleft()
-
-            # 调试：记录第一轮的详细信息
-            if debug and iteration < 3:
-                edge0_predecessors = edge0_.get(x, [])
-                if edge0_predecessors:
-                    print(f"    迭代{iteration}: win状态{x}, edge0_前驱={len(edge0_predecessors)}个")
-                    for pred in edge0_predecessors[:2]:
-                        print(f"      前驱{pred}: dp[{pred}][0]={self.dp[pred][0]}")
-                iteration += 1
-
-            for y in edge0_.get(x, []):
-                if self.dp[y][0] == 1:
-                    continue
-                self.dp[y][0] = 1
-                self.depth[y][0] = self.depth[x][1] + 1
-                win_propagate_count += 1
-
-                if debug and len(first_batch_updates) < 5:
-                    first_batch_updates.append((y, len(edge1_[y])))
-
-                for z in edge1_[y]:
-                    need[z][1] -= 1
-                    if need[z][1] == 0:
-                        deq.append(z)
-                        self.dp[z][1] = 1
-                        self.depth[z][1] = self.depth[y][0] + 1
-                        win_propagate_count += 1
+        with telemetry.phase('win_propagation') as ph:
+            if count_layers:
+                y_depths, z_depths = Counter(), Counter()
+            deq = deque(self.win)
+            win_propagate_count = 0
+            first_batch_updates = []
+            iteration = 0
+            while deq:
+                x = deq.popleft()
+
+                # 调试：记录第一轮的详细信息
+                if debug and iteration < 3:
+                    edge0_predecessors = edge0_.get(x, [])
+                    if edge0_predecessors:
+                        print(f"    迭代{iteration}: win状态{x}, edge0_前驱={len(edge0_predecessors)}个")
+                        for pred in edge0_predecessors[:2]:
+                            print(f"      前驱{pred}: dp[{pred}][0]={self.dp[pred][0]}")
+                    iteration += 1
+
+                for y in edge0_.get(x, []):
+                    if self.dp[y][0] == 1:
+                        continue
+                    self.dp[y][0] = 1
+                    self.depth[y][0] = self.depth[x][1] + 1
+                    win_propagate_count += 1
+                    if count_layers:
+                        y_depths[self.depth[y][0]] += 1
+
+                    if debug and len(first_batch_updates) < 5:
+                        first_batch_updates.append((y, len(edge1_[y])))
+
+                    for z in edge1_[y]:
+                        need[z][1] -= 1
+                        if need[z][1] == 0:
+                            deq.append(z)
+                            self.dp[z][1] = 1
+                            self.depth[z][1] = self.depth[y][0] + 1
+                            win_propagate_count += 1
+                            if count_layers:
+                                z_depths[self.depth[z][1]] += 1
+            ph['states'] = win_propagate_count
+            if count_layers:
+                telemetry.depth_layers('win_propagation', len(self.win), y_depths, z_depths)
 
         if debug:
             print(f"  win传播更新了 {win_propagate_count} 次")
@@ -202,23 +239,33 @@ class GameTreeSolver:
             for state, edge1_count in first_batch_updates:
                 print(f"    {state}: edge1_后继数={edge1_count}")
 
-        deq = deque(self.lose)
-        lose_propagate_count = 0
-        while deq:
-            x = deq.popleft()
-            for y in edge1_[x]:
-                if self.dp[y][1] == -1:
-                    continue
-                self.dp[y][1] = -1
-                self.depth[y][1] = self.depth[x][0] + 1
-                lose_propagate_count += 1
-                for z in edge0_[y]:
-                    need[z][0] -= 1
-                    if need[z][0] == 0:
-                        deq.append(z)
-                        self.dp[z][0] = -1
-                        self.depth[z][0] = self.depth[y][1] + 1
-                        lose_propagate_count += 1
+        with telemetry.phase('loss_propagation') as ph:
+            if count_layers:
+                y_depths, z_depths = Counter(), Counter()
+            deq = deque(self.lose)
+            lose_propagate_count = 0
+            while deq:
+                x = deq.popleft()
+                for y in edge1_[x]:
+                    if self.dp[y][1] == -1:
+                        continue
+                    self.dp[y][1] = -1
+                    self.depth[y][1] = self.depth[x][0] + 1
+                    lose_propagate_count += 1
+                    if count_layers:
+                        y_depths[self.depth[y][1]] += 1
+                    for z in edge0_[y]:
+                        need[z][0] -= 1
+                        if need[z][0] == 0:
+                            deq.append(z)
+                            self.dp[z][0] = -1
+                            self.depth[z][0] = self.depth[y][1] + 1
+                            lose_propagate_count += 1
+                            if count_layers:
+                                z_depths[self.depth[z][0]] += 1
+            ph['states'] = lose_propagate_count
+            if count_layers:
+                telemetry.depth_layers('loss_propagation', len(self.lose), y_depths, z_depths)
 
         if debug:
             print(f"  lose传播更新了 {lose_propagate_count} 次")
@@ -237,20 +284,17 @@ class GameTreeSolver:
                 f.write(struct.pack('H', self.depth[state][1]))
 
     def load_training_data(self, filename='game_tree.data'):
-        """加载二进制格式"""
+        """加载二进制格式（一次读入整个文件，struct.iter_unpack 批量解析）"""
+        from gametree.table import read_header
+        header_size, _ = read_header(filename)
         with open(filename, 'rb') as f:
-            n = struct.unpack('I', f.read(4))[0]
-
-            self.dp = {}
-            self.depth = {}
-            for _ in range(n):
-                state = struct.unpack('Q', f.read(8))[0]
-                dp0 = struct.unpack('b', f.read(1))[0]
-                dp1 = struct.unpack('b', f.read(1))[0]
-                depth0 = struct.unpack('H', f.read(2))[0]
-                depth1 = struct.unpack('H', f.read(2))[0]
-                self.dp[state] = [dp0, dp1]
-                self.depth[state] = [depth0, depth1]
+            data = f.read()
+
+        self.dp = {}
+        self.depth = {}
+        for state, dp0, dp1, depth0, depth1 in struct.iter_unpack('<QbbHH', data[header_size:]):
+            self.dp[state] = [dp0, dp1]
+            self.depth[state] = [depth0, depth1]
 
         # 从dp中重建win和lose集合
         self.win = set()
@@ -261,17 +305,35 @@ class GameTreeSolver:
             elif dp_val == [-1, -1]:
                 self.lose.add(state)
 
-    def load_training_data_mmap(self, filename):
-        """加载 C++ 生成的新格式文件（8字节头，mmap + 二分查找，不占额外内存）"""
+    def load_training_data_mmap(self, filename, fence=True, advise=False):
+        """加载 C++ 生成的新格式文件（8字节头，mmap + 二分查找，不占额外内存）
+
+        Args:
+            fence: 建立 / 加载 4KB 块 fence 索引（旁文件 filename.fence），查询只读一页
+            advise: 对 mmap 调用 madvise（关闭预读，批量查询前预取）
+        """
         import mmap
         self.mmap_file = open(filename, 'rb')
         self.mmap_obj = mmap.mmap(self.mmap_file.fileno(), 0, access=mmap.ACCESS_READ)
         self.num_records = struct.unpack('Q', self.mmap_obj[0:8])[0]
+        if fence:
+            from gametree.table import FenceIndex
+            self.fence = FenceIndex.open(filename, self.mmap_obj, 8, self.num_records, advise=advise)
+
+    def load_shared(self, handle):
+        """挂载父进程放进共享内存的表（gametree.shared.SharedTable.create 的 handle），不打开文件、不复制"""
+        from gametree.shared import SharedTable
+        self.shared = SharedTable.attach(handle)
+        self.num_records = self.shared.num_records
 
     def query_state(self, state_code):
         """二分查找：返回 ([dp0, dp1], [depth0, depth1]) 或 None"""
+        if self.shared is not None:
+            return self.shared.query_state(state_code)
         if self.mmap_obj is None:
             return None
+        if self.fence is not None:
+            return self.fence.query(state_code)
         left, right = 0, self.num_records - 1
         while left <= right:
             mid = (left + right) // 2
@@ -289,6 +351,30 @@ class GameTreeSolver:
                 return [dp0, dp1], [depth0, depth1]
         return None
 
+    def query_many(self, codes):
+        """批量查询：有 fence 索引时按块查找（冷启动每个 code 只读一页）；
+        否则用 numpy.memmap 结构化数组 + 一次 searchsorted
+
+        Returns: 与 codes 等长的列表，元素同 query_state 的返回值；
+        字典模式直接查 dp / depth，没有 numpy 时逐个二分查找
+        """
+        if self.shared is not None:
+            return self.shared.query_many(codes)
+        if self.mmap_obj is None:
+            return [(self.dp[code], self.depth[code]) if code in self.dp else None
+                    for code in codes]
+        if self.fence is not None:
+            return self.fence.query_many(codes)
+        if self.records is None:
+            try:
+                from gametree.table import RecordArray
+                self.records = RecordArray(self.mmap_file.name, header_size=8)
+            except ImportError:
+                self.records = False
+        if self.records is False:
+            return [self.query_state(code) for code in codes]
+        return self.records.query_many(codes)
+
     def __del__(self):
         if self.mmap_obj is not None:
             self.mmap_obj.close()
@@ -296,8 +382,38 @@ class GameTreeSolver:
             self.mmap_file.close()
 
 
+def convert_to_mmap_format(src, dst):
+    """旧格式（4字节头）-> mmap 格式（8字节头），记录原样复制，返回记录数
+
+    先在 dst 所在目录写唯一命名的临时文件再替换，中途失败不会留下半个文件，
+    多个进程同时转换也不会互相覆盖临时文件。
+    """
+    import tempfile
+    from gametree.table import read_header
+    header_size, _ = read_header(src)
+    with open(src, 'rb') as f:
+        data = f.read()
+    count = (len(data) - header_size) // 14
+    tmp = tempfile.NamedTemporaryFile(dir=os.path.dirname(os.path.abspath(dst)), delete=False)
+    try:
+        with tmp:
+            tmp.write(struct.pack('Q', count))
+            tmp.write(memoryview(data)[header_size:header_size + count * 14])
+        os.replace(tmp.name, dst)
+    except BaseException:
+        os.unlink(tmp.name)
+        raise
+    return count
+
+
 class Strategy:
-    def __init__(self, game):
+    def __init__(self, game, cache_size=0, auto_train=False, shared=None):
+        """
+        Args:
+            cache_size: >0 时在 query_state / query_many 前加一层该大小的 LRU 缓存
+            auto_train: 找不到训练数据时当场训练（耗时较长）；默认抛出 FileNotFoundError
+            shared: gametree.shared 的 TableHandle；给出时挂载父进程的共享内存表，不读文件
+        """
         self.name = 'Perfect AI Test'
         self.game = game
         self.sym = SymmetryHelper()
@@ -308,23 +424,66 @@ class Strategy:
         new_file = os.path.join(class_dir, 'game_tree_3x3_new.data')
         old_file = os.path.join(class_dir, 'game_tree_optimized.data')
 
-        if os.path.exists(new_file):
+        # 预计算的最优走法表（python -m gametree.bestmove 生成），存在时 make_move 直接查表
+        self.best_moves = None
+        best_file = os.path.join(class_dir, 'game_tree_3x3.best')
+        if os.path.exists(best_file):
+            from gametree.bestmove import BestMoveTable
+            self.best_moves = BestMoveTable(best_file)
+
+        self.train_file = old_file
+        self.mmap_train_file = new_file
+
+        # 其他格式的表（稠密排名表、分块压缩表等，见 gametree.loader）存在时优先使用，接口相同
+        from gametree.loader import find_table
+        table = find_table(class_dir, 'game_tree_3x3') if shared is None else None
+        if shared is not None:
+            self.solver.load_shared(shared)
+            self.use_mmap = True
+        elif table is not None:
+            self.solver = table
+            self.use_mmap = True
+        elif os.path.exists(new_file):
             self.solver.load_training_data_mmap(new_file)
             self.use_mmap = True
-        else:
-            self.train_file = old_file
+        elif os.path.exists(old_file):
+            # 首次加载时一次性转换为 mmap 格式，之后启动直接 mmap；目录不可写时退回字典加载
             try:
+                convert_to_mmap_format(old_file, new_file)
+            except OSError:
                 self.solver.load_training_data(old_file)
-            except:
-                self.train()
+                self.use_mmap = False
+            else:
+                self.solver.load_training_data_mmap(new_file)
+                self.use_mmap = True
+        elif auto_train:
+            print("未找到训练数据，开始训练...")
+            self.train()
             self.use_mmap = False
+        else:
+            print("未找到训练数据，请先运行训练程序")
+            raise FileNotFoundError(old_file)
+
+        # 可选的 LRU 查询缓存（gametree.cache），self.solver.stats() 查看命中情况
+        if cache_size:
+            from gametree.cache import CachedSolver
+            self.solver = CachedSolver(self.solver, cache_size)
 
     def trans(self, deq):
         """将棋子位置队列转为列表"""
         return [i * 3 + j for i, j in deq]
 
-    def train(self):
-        """训练：枚举所有状态并标准化"""
+    def train(self, vectorized=False, telemetry=None):
+        """训练：枚举所有状态并标准化
+
+        Args:
+            vectorized: 求解阶段使用逐层 NumPy 传播（需要 numpy）
+            telemetry: 可选 gametree.telemetry.Telemetry，记录各阶段耗时 / 吞吐量 / 峰值内存
+        """
+        # 其他格式的表只读，训练时换回字典求解器
+        if not isinstance(self.solver, GameTreeSolver):
+            self.solver = GameTreeSolver()
+        enumerate_start = time.perf_counter()
         max_code = 1000 * 1000
         processed = 0
         edge_added = 0
@@ -435,11 +594,24 @@ class Strategy:
 
             processed += 1
 
-        self.solver.solve(debug=True)
-        self.solver.save_training_data(self.train_file)
+        if telemetry is not None:
+            telemetry.record_phase('enumerate', time.perf_counter() - enumerate_start,
+                                   states=len(self.solver.edge0),
+                                   edges=sum(map(len, self.solver.edge0.values()))
+                                   + sum(map(len, self.solver.edge1.values())))
+        self.solver.solve(debug=True, vectorized=vectorized, telemetry=telemetry)
+        if telemetry is not None:
+            with telemetry.phase('save') as ph:
+                self.solver.save_training_data(self.train_file)
+                ph['states'] = len(self.solver.dp)
+        else:
+            self.solver.save_training_data(self.train_file)
+        # 已有的 mmap 格式副本随之更新
+        if os.path.exists(self.mmap_train_file):
+            convert_to_mmap_format(self.train_file, self.mmap_train_file)
 
-    def make_move(self):
-        """选择最优走法"""
+    def make_move(self, deadline=None):
+        """选择最优走法（只查表，耗时很短，不受 deadline 限制）"""
         p = 0
         if len(self.game.history) & 1 == 0:
             p = 1
@@ -447,9 +619,20 @@ class Strategy:
         x_pos = self.trans(self.game.x)
         y_pos = self.trans(self.game.y)
 
-        x_canon, y_canon, trans_id, _ = self.sym.canonicalize(x_pos, y_pos)
+        x_canon, y_canon, trans_id, state_code = self.sym.canonicalize(x_pos, y_pos)
 
-        moves = []
+        # 最优走法表：一次查表 + 一次逆变换
+        if self.best_moves is not None:
+            entry = self.best_moves.lookup(state_code, p == 1)
+            if entry is not None:
+                t = self.sym.inverse_transform(entry[0], trans_id)
+                i, j = t // 3, t % 3
+                if self.game.board[i][j] == 0:
+                    self.game.play(i, j)
+                    return True
+
+        cells = []
+        codes = []
         for i in range(3):
             for j in range(3):
                 if self.game.board[i][j] != 0:
@@ -463,35 +646,27 @@ class Strategy:
                     if len(x_new) > 3:
                         x_new = x_new[1:]
                     _, _, _, next_code = self.sym.canonicalize(x_new, y_canon)
-
-                    if self.use_mmap:
-                        result = self.solver.query_state(next_code)
-                        dp_val    = result[0][1] if result else 0
-                        depth_val = result[1][1] if result else 0
-                    elif next_code in self.solver.dp:
-                        dp_val    = self.solver.dp[next_code][1]
-                        depth_val = self.solver.depth[next_code][1]
-                    else:
-                        dp_val = depth_val = 0
-
-                    moves.append([t, dp_val, depth_val])
                 else:
                     y_new = y_canon + [t_canon]
                     if len(y_new) > 3:
                         y_new = y_new[1:]
                     _, _, _, next_code = self.sym.canonicalize(x_canon, y_new)
+                cells.append(t)
+                codes.append(next_code)
+
+        # 所有后继一次批量查询（mmap 模式为 memmap + searchsorted）
+        moves = []
+        for t, result in zip(cells, self.solver.query_many(codes)):
+            if not result:
+                dp_val = depth_val = 0
+            elif p == 1:
+                dp_val    = result[0][1]
+                depth_val = result[1][1]
+            else:
+                dp_val    = -result[0][0]
+                depth_val =  result[1][0]
 
-                    if self.use_mmap:
-                        result = self.solver.query_state(next_code)
-                        dp_val    = -result[0][0] if result else 0
-                        depth_val =  result[1][0] if result else 0
-                    elif next_code in self.solver.dp:
-                        dp_val    = -self.solver.dp[next_code][0]
-                        depth_val =  self.solver.depth[next_code][0]
-                    else:
-                        dp_val = depth_val = 0
-
-                    moves.append([t, dp_val, depth_val])
+            moves.append([t, dp_val, depth_val])
 
         moves.sort(key=lambda x: (x[1], -x[2]))
         if moves[-1][1] == -1:
@@ -0,0 +1,77 @@
+"""
+3×3 表格式测试：稠密排名表（.rank）、v2 表（.tt2）、分块压缩表（.zdata）
+与源 .data 表的查询结果完全相同；StateRanker.rank / unrank 互逆
+"""
+
+import os
+import random
+import tempfile
+
+from gametree.board import BoardConfig
+from gametree.compressed import write_compressed
+from gametree.loader import detect_format, open_table
+from gametree.packed import convert
+from gametree.ranked import StateRanker, write_ranked_table
+from gametree.table import TableFile
+import strategies.perfect3x3.perfect_strategy as perfect_strategy
+
+class_dir = os.path.dirname(os.path.abspath(perfect_strategy.__file__))
+source_file = os.path.join(class_dir, 'game_tree_optimized.data')
+config = BoardConfig(3, 3, 3)
+
+print("=" * 60)
+print("3×3 表格式测试")
+print("=" * 60)
+
+with TableFile(source_file) as source:
+    codes = [source.record(i)[0] for i in range(len(source))]
+    expected = [source.query(code) for code in codes]
+# 不在表中的 code：相邻 code 中未出现的，以及超出范围的
+missing = sorted(set(code + 1 for code in codes) - set(codes))[:200] + [codes[-1] + 1000]
+print(f"源表: {len(codes):,} 条记录，另查 {len(missing)} 个不存在的 code")
+
+with tempfile.TemporaryDirectory() as tmp:
+    rank_file = os.path.join(tmp, 'game_tree_3x3.rank')
+    packed_file = os.path.join(tmp, 'game_tree_3x3.tt2')
+    zdata_file = os.path.join(tmp, 'game_tree_3x3.zdata')
+    write_ranked_table(source_file, rank_file, config)
+    convert(source_file, packed_file, config)
+    write_compressed(source_file, zdata_file, config, block_records=512)
+
+    for path, kind in ((rank_file, 'ranked'), (packed_file, 'packed'), (zdata_file, 'compressed')):
+        assert detect_format(path) == kind, f"{path}: 格式识别为 {detect_format(path)}"
+        table = open_table(path)
+        try:
+            assert [table.query_state(code) for code in codes] == expected, f"{kind}: query_state 结果不同"
+            assert table.query_many(codes[::-1]) == expected[::-1], f"{kind}: query_many 结果不同"
+            assert all(table.query_state(code) is None for code in missing), f"{kind}: 查到了不存在的 code"
+        finally:
+            table.close()
+        print(f"✓ {os.path.basename(path)} ({kind}) 与 .data 查询结果相同")
+    assert detect_format(source_file) == 'data' and open_table(source_file) is None
+
+# StateRanker：3×3 全部放置逐一往返，4×4 抽样
+ranker = StateRanker(3, 3)
+for r in range(ranker.placements):
+    assert ranker.rank(*ranker.unrank(r)) == r, f"rank(unrank({r})) != {r}"
+print(f"✓ 3×3 m=3 全部 {ranker.placements:,} 个放置 rank / unrank 互逆")
+
+ranker = StateRanker(4, 4)
+rng = random.Random(0)
+for r in rng.sample(range(ranker.placements), 20000):
+    assert ranker.rank(*ranker.unrank(r)) == r, f"rank(unrank({r})) != {r}"
+print("✓ 4×4 m=4 抽样 20,000 个放置 rank / unrank 互逆")
+
+ranker = StateRanker(3, 3)
+bad_inputs = [
+    ([0, 0], [1]),          # x 重复
+    ([0], [0]),             # x、y 重叠
+    ([0, 1], [2, 2]),       # y 重复
+    ([9], []),              # 越界
+    ([-1], []),             # 负下标
+    ([0], [1, 2]),          # y 比 x 多
+    ([0, 1, 2, 3], []),     # 超过 m 个
+]
+for x_list, y_list in bad_inputs:
+    assert ranker.rank(x_list, y_list) == -1, f"rank({x_list}, {y_list}) 应为 -1"
+print(f"✓ {len(bad_inputs)} 种非法放置 rank 返回 -1")
@@ -0,0 +1,48 @@
+"""
+3×3 求解一致性测试：deque 版、向量化版、外存版求解的结果逐字节相同
+"""
+
+import filecmp
+import os
+import tempfile
+
+from Game import GameBase
+from gametree.board import BoardConfig
+from gametree.external import train_external
+import strategies.perfect3x3.perfect_strategy as perfect_strategy
+
+class_dir = os.path.dirname(os.path.abspath(perfect_strategy.__file__))
+shipped_file = os.path.join(class_dir, 'game_tree_optimized.data')
+
+print("=" * 60)
+print("3×3 求解一致性测试")
+print("=" * 60)
+
+with tempfile.TemporaryDirectory() as tmp:
+    strategy = perfect_strategy.Strategy(GameBase(3, 3))
+    # 训练结果写到临时目录，不覆盖策略目录下的表
+    strategy.mmap_train_file = os.path.join(tmp, 'unused.data')
+
+    deque_file = os.path.join(tmp, 'deque.data')
+    strategy.train_file = deque_file
+    strategy.train(vectorized=False)
+
+    vectorized_file = os.path.join(tmp, 'vectorized.data')
+    strategy.train_file = vectorized_file
+    strategy.train(vectorized=True)
+
+    external_file = os.path.join(tmp, 'external.data')
+    train_external(BoardConfig(3, 3, 3), external_file)
+
+    # 外存版写 8 字节头，转换 deque 版的 4 字节头后再比较
+    deque_mmap_file = os.path.join(tmp, 'deque_mmap.data')
+    count = perfect_strategy.convert_to_mmap_format(deque_file, deque_mmap_file)
+
+    print(f"\n记录数: {count:,}")
+    assert filecmp.cmp(deque_file, vectorized_file, shallow=False), "向量化求解与 deque 求解结果不同"
+    print("✓ 向量化求解与 deque 求解逐字节相同")
+    assert filecmp.cmp(deque_mmap_file, external_file, shallow=False), "外存求解与 deque 求解结果不同"
+    print("✓ 外存求解与 deque 求解逐字节相同")
+    if os.path.exists(shipped_file):
+        assert filecmp.cmp(deque_file, shipped_file, shallow=False), "求解结果与已发布的表不同"
+        print("✓ 与已发布的 game_tree_optimized.data 相同")
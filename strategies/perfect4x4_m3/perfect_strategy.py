@@ -1,4 +1,4 @@
-from collections import deque
+from collections import Counter, deque
 import os
 import struct
 import inspect
@@ -82,7 +82,7 @@ class SymmetryHelper:
 
 
 class GameTreeSolver:
-    """使用字典存储的博弈图求解器"""
+    """使用字典存储的博弈图求解器；对局时用 mmap + 二分查找 查询训练数据"""
 
     def __init__(self):
         self.edge0 = {}
@@ -91,6 +91,18 @@ class GameTreeSolver:
         self.lose = set()
         self.dp = {}
         self.depth = {}
+        # mmap相关（load_training_data 默认方式，不占内存）
+        self.mmap_file = None
+        self.mmap_obj = None
+        self.record_size = 14  # state(8) + dp0(1) + dp1(1) + depth0(2) + depth1(2)
+        self.header_size = 8
+        self.num_records = 0
+        # numpy.memmap 结构化数组视图（query_many 首次调用时创建，False 表示没有 numpy）
+        self.records = None
+        # fence 稀疏索引（gametree.table.FenceIndex）
+        self.fence = None
+        # 共享内存表（gametree.shared.SharedTable，load_shared 挂载）
+        self.shared = None
 
     def add_state(self, state):
         """添加状态"""
@@ -155,107 +167,238 @@ class GameTreeSolver:
             self.add_state(s)
             self.dp[s] = [-1, -1]
 
-    def solve(self, debug=False):
-        """博弈树求解"""
-        edge0_ = {s: [] for s in self.edge0}
-        edge1_ = {s: [] for s in self.edge1}
-        for s in self.edge0:
-            for t in self.edge0[s]:
-                edge0_[t].append(s)
-            for t in self.edge1[s]:
-                edge1_[t].append(s)
+    def solve(self, debug=False, vectorized=False, telemetry=None):
+        """博弈树求解
 
-        need = {s: [len(self.edge0[s]), len(self.edge1[s])] for s in self.edge0}
+        Args:
+            vectorized: 使用逐层 NumPy 传播（gametree.retrograde），结果与 deque 版本一致
+            telemetry: 可选 gametree.telemetry.Telemetry，记录阶段耗时和每层 frontier
+        """
+        if vectorized:
+            from gametree.retrograde import solve_graph
+            solve_graph(self, debug=debug, telemetry=telemetry)
+            return
+
+        # 只有需要遥测时才在传播循环里按 depth 计数
+        count_layers = telemetry is not None
+        y_depths = z_depths = None
+        if telemetry is None:
+            from gametree.telemetry import Telemetry
+            telemetry = Telemetry()
+
+        with telemetry.phase('reverse_edges') as ph:
+            edge0_ = {s: [] for s in self.edge0}
+            edge1_ = {s: [] for s in self.edge1}
+            for s in self.edge0:
+                for t in self.edge0[s]:
+                    edge0_[t].append(s)
+                for t in self.edge1[s]:
+                    edge1_[t].append(s)
+
+            need = {s: [len(self.edge0[s]), len(self.edge1[s])] for s in self.edge0}
+            ph['states'] = len(need)
+            ph['edges'] = sum(n0 + n1 for n0, n1 in need.values())
 
         if debug:
             print(f"  solve开始: win={len(self.win)}, lose={len(self.lose)}")
             print(f"  总状态数: {len(self.edge0)}")
 
-        deq = deque(self.win)
-        win_propagate_count = 0
-        while deq:
-            x = deq.popleft()
+        with telemetry.phase('win_propagation') as ph:
+            if count_layers:
+                y_depths, z_depths = Counter(), Counter()
+            deq = deque(self.win)
+            win_propagate_count = 0
+            while deq:
+                x = deq.popleft()
 
-            for y in edge0_.get(x, []):
-                if self.dp[y][0] == 1:
-                    continue
-                self.dp[y][0] = 1
-                self.depth[y][0] = self.depth[x][1] + 1
-                win_propagate_count += 1
-
-                for z in edge1_.get(y, []):
-                    need[z][1] -= 1
-                    if need[z][1] == 0:
-                        deq.append(z)
-                        self.dp[z][1] = 1
-                        self.depth[z][1] = self.depth[y][0] + 1
-                        win_propagate_count += 1
+                for y in edge0_.get(x, []):
+                    if self.dp[y][0] == 1:
+                        continue
+                    self.dp[y][0] = 1
+                    self.depth[y][0] = self.depth[x][1] + 1
+                    win_propagate_count += 1
+                    if count_layers:
+                        y_depths[self.depth[y][0]] += 1
+
+                    for z in edge1_.get(y, []):
+                        need[z][1] -= 1
+                        if need[z][1] == 0:
+                            deq.append(z)
+                            self.dp[z][1] = 1
+                            self.depth[z][1] = self.depth[y][0] + 1
+                            win_propagate_count += 1
+                            if count_layers:
+                                z_depths[self.depth[z][1]] += 1
+            ph['states'] = win_propagate_count
+            if count_layers:
+                telemetry.depth_layers('win_propagation', len(self.win), y_depths, z_depths)
 
         if debug:
             print(f"  win传播更新了 {win_propagate_count} 次")
 
-        deq = deque(self.lose)
-        lose_propagate_count = 0
-        while deq:
-            x = deq.popleft()
-            for y in edge1_.get(x, []):
-                if self.dp[y][1] == -1:
-                    continue
-                self.dp[y][1] = -1
-                self.depth[y][1] = self.depth[x][0] + 1
-                lose_propagate_count += 1
-                for z in edge0_.get(y, []):
-                    need[z][0] -= 1
-                    if need[z][0] == 0:
-                        deq.append(z)
-                        self.dp[z][0] = -1
-                        self.depth[z][0] = self.depth[y][1] + 1
-                        lose_propagate_count += 1
+        with telemetry.phase('loss_propagation') as ph:
+            if count_layers:
+                y_depths, z_depths = Counter(), Counter()
+            deq = deque(self.lose)
+            lose_propagate_count = 0
+            while deq:
+                x = deq.popleft()
+                for y in edge1_.get(x, []):
+                    if self.dp[y][1] == -1:
+                        continue
+                    self.dp[y][1] = -1
+                    self.depth[y][1] = self.depth[x][0] + 1
+                    lose_propagate_count += 1
+                    if count_layers:
+                        y_depths[self.depth[y][1]] += 1
+                    for z in edge0_.get(y, []):
+                        need[z][0] -= 1
+                        if need[z][0] == 0:
+                            deq.append(z)
+                            self.dp[z][0] = -1
+                            self.depth[z][0] = self.depth[y][1] + 1
+                            lose_propagate_count += 1
+                            if count_layers:
+                                z_depths[self.depth[z][0]] += 1
+            ph['states'] = lose_propagate_count
+            if count_layers:
+                telemetry.depth_layers('loss_propagation', len(self.lose), y_depths, z_depths)
 
         if debug:
             print(f"  lose传播更新了 {lose_propagate_count} 次")
 
     def save_training_data(self, filename='game_tree.data'):
-        """保存为紧凑二进制格式"""
+        """保存为紧凑二进制格式（8字节记录数头，与 C++ 训练器 / mmap 加载一致）"""
+        # 文件可能正被本对象 mmap（先加载后重新训练），覆盖前先释放
+        self.close()
         with open(filename, 'wb') as f:
-            n = len(self.dp)
-            f.write(struct.pack('I', n))
-
+            f.write(struct.pack('Q', len(self.dp)))
             for state in sorted(self.dp.keys()):
-                f.write(struct.pack('Q', state))
-                f.write(struct.pack('b', self.dp[state][0]))
-                f.write(struct.pack('b', self.dp[state][1]))
-                f.write(struct.pack('H', self.depth[state][0]))
-                f.write(struct.pack('H', self.depth[state][1]))
+                f.write(struct.pack('<QbbHH', state, self.dp[state][0], self.dp[state][1],
+                                    self.depth[state][0], self.depth[state][1]))
 
-    def load_training_data(self, filename='game_tree.data'):
-        """加载二进制格式"""
-        with open(filename, 'rb') as f:
-            n = struct.unpack('I', f.read(4))[0]
+    def load_training_data(self, filename='game_tree.data', training=False, fence=True):
+        """加载训练数据
 
+        默认 mmap 只读映射（瞬间完成，不占内存），query_state / query_many 直接二分查找；
+        training=True 时读入 dp / depth 字典并重建 win / lose 集合（继续求解时需要）。
+        旧版本 save_training_data 写的是 4 字节记录数头，这里按文件大小识别。
+
+        Args:
+            fence: mmap 方式下建立 / 加载 4KB 块 fence 索引（旁文件 filename.fence）
+        """
+        from gametree.table import read_header
+        header_size, _ = read_header(filename)
+        num_records = (os.path.getsize(filename) - header_size) // self.record_size
+
+        if training:
+            self.close()
+            with open(filename, 'rb') as f:
+                data = f.read()
             self.dp = {}
             self.depth = {}
-            for _ in range(n):
-                state = struct.unpack('Q', f.read(8))[0]
-                dp0 = struct.unpack('b', f.read(1))[0]
-                dp1 = struct.unpack('b', f.read(1))[0]
-                depth0 = struct.unpack('H', f.read(2))[0]
-                depth1 = struct.unpack('H', f.read(2))[0]
+            for state, dp0, dp1, depth0, depth1 in struct.iter_unpack('<QbbHH', data[header_size:]):
                 self.dp[state] = [dp0, dp1]
                 self.depth[state] = [depth0, depth1]
 
-        # 从dp中重建win和lose集合
-        self.win = set()
-        self.lose = set()
-        for state, dp_val in self.dp.items():
-            if dp_val == [1, 1]:
-                self.win.add(state)
-            elif dp_val == [-1, -1]:
-                self.lose.add(state)
+            # 从dp中重建win和lose集合
+            self.win = set()
+            self.lose = set()
+            for state, dp_val in self.dp.items():
+                if dp_val == [1, 1]:
+                    self.win.add(state)
+                elif dp_val == [-1, -1]:
+                    self.lose.add(state)
+            return
+
+        import mmap
+        self.close()
+        self.mmap_file = open(filename, 'rb')
+        self.mmap_obj = mmap.mmap(self.mmap_file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.header_size = header_size
+        self.num_records = num_records
+        if fence:
+            from gametree.table import FenceIndex
+            self.fence = FenceIndex.open(filename, self.mmap_obj, header_size, num_records)
+
+    def close(self):
+        """释放 mmap / 共享内存表，之后 query_state 回到字典查询"""
+        self.records = None
+        self.fence = None
+        if self.shared is not None:
+            self.shared.close()
+            self.shared = None
+        if self.mmap_obj is not None:
+            self.mmap_obj.close()
+            self.mmap_obj = None
+        if self.mmap_file is not None:
+            self.mmap_file.close()
+            self.mmap_file = None
+        self.num_records = 0
+
+    def __del__(self):
+        self.close()
+
+    def load_shared(self, handle):
+        """挂载父进程放进共享内存的表（gametree.shared.SharedTable.create 的 handle），不打开文件、不复制"""
+        from gametree.shared import SharedTable
+        self.close()
+        self.shared = SharedTable.attach(handle)
+        self.num_records = self.shared.num_records
+
+    def query_state(self, state_code):
+        """返回 ([dp0, dp1], [depth0, depth1]) 或 None（与 mmap 版接口相同）"""
+        if self.shared is not None:
+            return self.shared.query_state(state_code)
+        if self.mmap_obj is None:
+            if state_code not in self.dp:
+                return None
+            return self.dp[state_code], self.depth[state_code]
+        if self.fence is not None:
+            return self.fence.query(state_code)
+
+        # 二分查找
+        left, right = 0, self.num_records - 1
+        while left <= right:
+            mid = (left + right) // 2
+            offset = self.header_size + mid * self.record_size
+            current_code = struct.unpack_from('<Q', self.mmap_obj, offset)[0]
+            if current_code < state_code:
+                left = mid + 1
+            elif current_code > state_code:
+                right = mid - 1
+            else:
+                _, dp0, dp1, depth0, depth1 = struct.unpack_from('<QbbHH', self.mmap_obj, offset)
+                return [dp0, dp1], [depth0, depth1]
+        return None
+
+    def query_many(self, codes):
+        """批量查询：mmap 方式下有 fence 索引时按块查找（冷启动每个 code 只读一页），
+        否则用 numpy.memmap 结构化数组 + 一次 searchsorted（没有 numpy 时逐个查）"""
+        if self.shared is not None:
+            return self.shared.query_many(codes)
+        if self.mmap_obj is None:
+            return [self.query_state(code) for code in codes]
+        if self.fence is not None:
+            return self.fence.query_many(codes)
+        if self.records is None:
+            try:
+                from gametree.table import RecordArray
+                self.records = RecordArray(self.mmap_file.name, header_size=self.header_size)
+            except ImportError:
+                self.records = False
+        if self.records is False:
+            return [self.query_state(code) for code in codes]
+        return self.records.query_many(codes)
 
 
 class Strategy:
-    def __init__(self, game):
+    def __init__(self, game, cache_size=0, shared=None):
+        """
+        Args:
+            cache_size: >0 时在 query_state / query_many 前加一层该大小的 LRU 缓存
+            shared: gametree.shared 的 TableHandle；给出时挂载父进程的共享内存表，不读文件
+        """
         self.name = 'Perfect AI 4x4'
         self.game = game
         self.sym = SymmetryHelper()
@@ -265,23 +408,49 @@ class Strategy:
         class_dir = os.path.abspath(os.path.dirname(class_file))
         self.train_file = os.path.join(class_dir, 'game_tree_4x4_m3.data')
 
+        # 预计算的最优走法表（python -m gametree.bestmove 生成），存在时 make_move 直接查表
+        self.best_moves = None
+        best_file = os.path.join(class_dir, 'game_tree_4x4_m3.best')
+        if os.path.exists(best_file):
+            from gametree.bestmove import BestMoveTable
+            self.best_moves = BestMoveTable(best_file)
+
+        # 其他格式的表（稠密排名表、分块压缩表等，见 gametree.loader）存在时优先使用，接口相同
+        from gametree.loader import find_table
         try:
-            self.solver.load_training_data(self.train_file)
-            print(f"已加载训练数据: {len(self.solver.dp)} 个状态")
+            table = find_table(class_dir, 'game_tree_4x4_m3') if shared is None else None
+            if shared is not None:
+                self.solver.load_shared(shared)
+            elif table is not None:
+                self.solver = table
+            else:
+                self.solver.load_training_data(self.train_file)
+            print(f"已加载训练数据: {self.solver.num_records} 个状态")
         except:
             print("未找到训练数据，需要进行训练")
             # 不自动训练，等待用户手动调用
 
+        # 可选的 LRU 查询缓存（gametree.cache），self.solver.stats() 查看命中情况
+        if cache_size:
+            from gametree.cache import CachedSolver
+            self.solver = CachedSolver(self.solver, cache_size)
+
     def trans(self, deq):
         """将棋子位置队列转为列表"""
         return [i * 4 + j for i, j in deq]
 
-    def train(self, max_states=None):
+    def train(self, max_states=None, vectorized=False, telemetry=None):
         """训练：枚举所有状态并标准化
 
         Args:
             max_states: 限制处理的最大状态数，用于测试。None表示处理所有状态
+            vectorized: 求解阶段使用逐层 NumPy 传播（需要 numpy）
+            telemetry: 可选 gametree.telemetry.Telemetry，记录各阶段耗时 / 吞吐量 / 峰值内存
         """
+        # 其他格式的表只读，训练时换回字典求解器
+        if not isinstance(self.solver, GameTreeSolver):
+            self.solver = GameTreeSolver()
+
         # 编码上限计算：
         # max_move=3, 4×4棋盘，基数17编码
         # x_code_max ≈ 16*17^2 + 16*17 + 16 = 4912
@@ -445,6 +614,10 @@ class Strategy:
             processed += 1
 
         enumeration_time = time.time() - start_time
+        if telemetry is not None:
+            telemetry.record_phase('enumerate', enumeration_time, states=len(self.solver.edge0),
+                                   edges=sum(map(len, self.solver.edge0.values()))
+                                   + sum(map(len, self.solver.edge1.values())))
         print(f"\n枚举完成 (耗时: {enumeration_time:.1f}秒):")
         print(f"  找到标准型: {len(canons):,}")
         if not max_states:
@@ -456,14 +629,19 @@ class Strategy:
         print(f"  Lose状态: {len(self.solver.lose):,}")
         print(f"\n开始博弈树求解...")
 
-        self.solver.solve(debug=True)
+        self.solver.solve(debug=True, vectorized=vectorized, telemetry=telemetry)
 
         print(f"\n求解完成，保存训练数据...")
-        self.solver.save_training_data(self.train_file)
+        if telemetry is not None:
+            with telemetry.phase('save') as ph:
+                self.solver.save_training_data(self.train_file)
+                ph['states'] = len(self.solver.dp)
+        else:
+            self.solver.save_training_data(self.train_file)
         print(f"训练数据已保存到: {self.train_file}")
 
-    def make_move(self):
-        """选择最优走法"""
+    def make_move(self, deadline=None):
+        """选择最优走法（只查表，耗时很短，不受 deadline 限制）"""
         p = 0
         if len(self.game.history) & 1 == 0:
             p = 1
@@ -471,9 +649,20 @@ class Strategy:
         x_pos = self.trans(self.game.x)
         y_pos = self.trans(self.game.y)
 
-        x_canon, y_canon, trans_id, _ = self.sym.canonicalize(x_pos, y_pos)
+        x_canon, y_canon, trans_id, state_code = self.sym.canonicalize(x_pos, y_pos)
 
-        moves = []
+        # 最优走法表：一次查表 + 一次逆变换
+        if self.best_moves is not None:
+            entry = self.best_moves.lookup(state_code, p == 1)
+            if entry is not None:
+                t = self.sym.inverse_transform(entry[0], trans_id)
+                i, j = t // 4, t % 4
+                if self.game.board[i][j] == 0:
+                    self.game.play(i, j)
+                    return True
+
+        cells = []
+        codes = []
         for i in range(4):
             for j in range(4):
                 if self.game.board[i][j] != 0:
@@ -487,29 +676,29 @@ class Strategy:
                     if len(x_new) > 3:
                         x_new = x_new[1:]
                     _, _, _, next_code = self.sym.canonicalize(x_new, y_canon)
-
-                    if next_code in self.solver.dp:
-                        dp_val = self.solver.dp[next_code][1]
-                        depth_val = self.solver.depth[next_code][1]
-                    else:
-                        dp_val = 0
-                        depth_val = 0
-
-                    moves.append([t, dp_val, depth_val])
                 else:
                     y_new = y_canon + [t_canon]
                     if len(y_new) > 3:
                         y_new = y_new[1:]
                     _, _, _, next_code = self.sym.canonicalize(x_canon, y_new)
+                cells.append(t)
+                codes.append(next_code)
 
-                    if next_code in self.solver.dp:
-                        dp_val = -self.solver.dp[next_code][0]
-                        depth_val = self.solver.depth[next_code][0]
-                    else:
-                        dp_val = 0
-                        depth_val = 0
+        moves = []
+        for t, result in zip(cells, self.solver.query_many(codes)):
+            if result:
+                dp, depth = result
+                if p == 1:
+                    dp_val = dp[1]
+                    depth_val = depth[1]
+                else:
+                    dp_val = -dp[0]
+                    depth_val = depth[0]
+            else:
+                dp_val = 0
+                depth_val = 0
 
-                    moves.append([t, dp_val, depth_val])
+            moves.append([t, dp_val, depth_val])
 
         moves.sort(key=lambda x: (x[1], -x[2]))
         if moves[-1][1] == -1:
@@ -90,9 +90,20 @@ class GameTreeSolver:
         self.mmap_obj = None
         self.record_size = 14  # state(8) + dp0(1) + dp1(1) + depth0(2) + depth1(2)
         self.num_records = 0
-
-    def load_training_data(self, filename='game_tree.data'):
-        """使用mmap加载（瞬间完成，不占内存）"""
+        # numpy.memmap 结构化数组视图（query_many 首次调用时创建，False 表示没有 numpy）
+        self.records = None
+        # fence 稀疏索引（gametree.table.FenceIndex）
+        self.fence = None
+        # 共享内存表（gametree.shared.SharedTable，load_shared 挂载）
+        self.shared = None
+
+    def load_training_data(self, filename='game_tree.data', fence=True, advise=False):
+        """使用mmap加载（瞬间完成，不占内存）
+
+        Args:
+            fence: 建立 / 加载 4KB 块 fence 索引（旁文件 filename.fence），查询只读一页
+            advise: 对 mmap 调用 madvise（关闭预读，批量查询前预取）
+        """
         import mmap
         import time
 
@@ -106,19 +117,36 @@ class GameTreeSolver:
         # 读取记录数
         self.num_records = struct.unpack('Q', self.mmap_obj[0:8])[0]
 
+        if fence:
+            from gametree.table import FenceIndex
+            self.fence = FenceIndex.open(filename, self.mmap_obj, 8, self.num_records, advise=advise)
+
         load_time = time.time() - load_start
         print(f"  加载完成！耗时: {load_time:.3f} 秒")
         print(f"  记录数: {self.num_records:,}")
         print(f"  文件大小: {len(self.mmap_obj) / 1024 / 1024:.1f} MB")
-        print(f"  查询方式: 二分查找（O(log n) ≈ {self.num_records.bit_length()} 次比较）")
+        if self.fence is not None:
+            print(f"  查询方式: fence 索引（{len(self.fence.keys):,} 个块）+ 块内二分，每次只读一页")
+        else:
+            print(f"  查询方式: 二分查找（O(log n) ≈ {self.num_records.bit_length()} 次比较）")
+
+    def load_shared(self, handle):
+        """挂载父进程放进共享内存的表（gametree.shared.SharedTable.create 的 handle），不打开文件、不复制"""
+        from gametree.shared import SharedTable
+        self.shared = SharedTable.attach(handle)
+        self.num_records = self.shared.num_records
 
     def query_state(self, state_code):
         """二分查找指定状态的dp和depth值
 
         Returns: (dp, depth) 或 None（如果不存在）
         """
+        if self.shared is not None:
+            return self.shared.query_state(state_code)
         if self.mmap_obj is None:
             return None
+        if self.fence is not None:
+            return self.fence.query(state_code)
 
         # 二分查找
         left, right = 0, self.num_records - 1
@@ -145,6 +173,28 @@ class GameTreeSolver:
 
         return None
 
+    def query_many(self, codes):
+        """批量查询：有 fence 索引时按块查找（冷启动每个 code 只读一页）；
+        否则用 numpy.memmap 结构化数组 + 一次 searchsorted
+
+        Returns: 与 codes 等长的列表，元素同 query_state 的返回值；没有 numpy 时逐个二分查找
+        """
+        if self.shared is not None:
+            return self.shared.query_many(codes)
+        if self.mmap_obj is None:
+            return [None] * len(codes)
+        if self.fence is not None:
+            return self.fence.query_many(codes)
+        if self.records is None:
+            try:
+                from gametree.table import RecordArray
+                self.records = RecordArray(self.mmap_file.name, header_size=8)
+            except ImportError:
+                self.records = False
+        if self.records is False:
+            return [self.query_state(code) for code in codes]
+        return self.records.query_many(codes)
+
     def __del__(self):
         """清理mmap资源"""
         if self.mmap_obj is not None:
@@ -154,7 +204,12 @@ class GameTreeSolver:
 
 
 class Strategy:
-    def __init__(self, game):
+    def __init__(self, game, cache_size=0, shared=None):
+        """
+        Args:
+            cache_size: >0 时在 query_state / query_many 前加一层该大小的 LRU 缓存
+            shared: gametree.shared 的 TableHandle；给出时挂载父进程的共享内存表，不读文件
+        """
         self.name = 'Perfect AI 4x4 (m4)'
         self.game = game
         self.sym = SymmetryHelper()
@@ -164,18 +219,38 @@ class Strategy:
         class_dir = os.path.abspath(os.path.dirname(class_file))
         self.train_file = os.path.join(class_dir, 'game_tree_4x4_m4.data')
 
-        try:
-            self.solver.load_training_data(self.train_file)
-        except FileNotFoundError:
-            print("未找到训练数据，请先运行训练程序")
-            raise
+        # 预计算的最优走法表（python -m gametree.bestmove 生成），存在时 make_move 直接查表
+        self.best_moves = None
+        best_file = os.path.join(class_dir, 'game_tree_4x4_m4.best')
+        if os.path.exists(best_file):
+            from gametree.bestmove import BestMoveTable
+            self.best_moves = BestMoveTable(best_file)
+
+        # 其他格式的表（稠密排名表、分块压缩表等，见 gametree.loader）存在时优先使用，接口相同
+        from gametree.loader import find_table
+        table = find_table(class_dir, 'game_tree_4x4_m4') if shared is None else None
+        if shared is not None:
+            self.solver.load_shared(shared)
+        elif table is not None:
+            self.solver = table
+        else:
+            try:
+                self.solver.load_training_data(self.train_file)
+            except FileNotFoundError:
+                print("未找到训练数据，请先运行训练程序")
+                raise
+
+        # 可选的 LRU 查询缓存（gametree.cache），self.solver.stats() 查看命中情况
+        if cache_size:
+            from gametree.cache import CachedSolver
+            self.solver = CachedSolver(self.solver, cache_size)
 
     def trans(self, deq):
         """将棋子位置队列转为列表"""
         return [i * 4 + j for i, j in deq]
 
-    def make_move(self):
-        """选择最优走法"""
+    def make_move(self, deadline=None):
+        """选择最优走法（只查表，耗时很短，不受 deadline 限制）"""
         p = 0
         if len(self.game.history) & 1 == 0:
             p = 1
@@ -183,9 +258,20 @@ class Strategy:
         x_pos = self.trans(self.game.x)
         y_pos = self.trans(self.game.y)
 
-        x_canon, y_canon, trans_id, _ = self.sym.canonicalize(x_pos, y_pos)
+        x_canon, y_canon, trans_id, state_code = self.sym.canonicalize(x_pos, y_pos)
 
-        moves = []
+        # 最优走法表：一次查表 + 一次逆变换
+        if self.best_moves is not None:
+            entry = self.best_moves.lookup(state_code, p == 1)
+            if entry is not None:
+                t = self.sym.inverse_transform(entry[0], trans_id)
+                i, j = t // 4, t % 4
+                if self.game.board[i][j] == 0:
+                    self.game.play(i, j)
+                    return True
+
+        cells = []
+        codes = []
         for i in range(4):
             for j in range(4):
                 if self.game.board[i][j] != 0:
@@ -199,35 +285,30 @@ class Strategy:
                     if len(x_new) > 4:
                         x_new = x_new[1:]
                     _, _, _, next_code = self.sym.canonicalize(x_new, y_canon)
-
-                    # 使用query_state查询（mmap + 二分查找）
-                    result = self.solver.query_state(next_code)
-                    if result:
-                        dp, depth = result
-                        dp_val = dp[1]
-                        depth_val = depth[1]
-                    else:
-                        dp_val = 0
-                        depth_val = 0
-
-                    moves.append([t, dp_val, depth_val])
                 else:
                     y_new = y_canon + [t_canon]
                     if len(y_new) > 4:
                         y_new = y_new[1:]
                     _, _, _, next_code = self.sym.canonicalize(x_canon, y_new)
+                cells.append(t)
+                codes.append(next_code)
+
+        # 所有后继一次批量查询（memmap + searchsorted）
+        moves = []
+        for t, result in zip(cells, self.solver.query_many(codes)):
+            if result:
+                dp, depth = result
+                if p == 1:
+                    dp_val = dp[1]
+                    depth_val = depth[1]
+                else:
+                    dp_val = -dp[0]
+                    depth_val = depth[0]
+            else:
+                dp_val = 0
+                depth_val = 0
 
-                    # 使用query_state查询（mmap + 二分查找）
-                    result = self.solver.query_state(next_code)
-                    if result:
-                        dp, depth = result
-                        dp_val = -dp[0]
-                        depth_val = depth[0]
-                    else:
-                        dp_val = 0
-                        depth_val = 0
-
-                    moves.append([t, dp_val, depth_val])
+            moves.append([t, dp_val, depth_val])
 
         moves.sort(key=lambda x: (x[1], -x[2]))
         if moves[-1][1] == -1:
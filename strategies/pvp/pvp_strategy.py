@@ -3,6 +3,6 @@ class Strategy:
         self.name = 'Player vs Player'
         self.game = game
 
-    def make_move(self):
+    def make_move(self, deadline=None):
         """PvP 模式不需要 AI 做决策，返回 False"""
         return False
@@ -5,7 +5,7 @@ class Strategy:
         self.name = 'Random Strategy'
         self.game = game
 
-    def make_move(self):
+    def make_move(self, deadline=None):
         candidate = []
         for i in range(self.game.n):
             for j in range(self.game.n):
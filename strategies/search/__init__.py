@@ -0,0 +1 @@
+# Alpha-beta search strategy package
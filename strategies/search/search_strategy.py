@@ -0,0 +1,453 @@
+"""Alpha-beta 搜索策略
+
+启发式 AI 只看一步（evaluate_move_score 取最大）。这里在它之上做迭代加深的 negamax alpha-beta：
+    - 叶子估值：UniversalEvaluator.evaluate_threats（由增量 ThreatTable 计算，O(K)）
+    - 根节点走法排序：UniversalEvaluator 的一步评分（score_all_moves / evaluate_move_score）
+    - 内部节点走法排序：置换表走法 > 堵对手的必胜点 > killer > history > 中心价值
+    - 置换表：Zobrist key（包含双方棋子的先后顺序，见 Zobrist），保存深度、边界类型、值和最佳走法
+    - make / unmake 按限步规则处理棋子消失，威胁表同步 play / undo
+
+轮到走棋的一方若有一步成 K 的点，直接记为胜（不必再展开）；
+对手有成 K 点而自己没有时，只需考虑堵这些点（其他走法下一步必输）。
+"""
+
+import math
+import random
+import time
+from collections import deque
+
+from strategies.heuristic.heuristic_strategy import (DEFAULT_RADIUS, CandidateSet, EvaluationCache, LineGeometry,
+                                                    PositionHash, ThreatTable, UniversalEvaluator)
+
+# 胜负分，远大于任何叶子估值（evaluate_threats 在 15x15 上也不到 1e10）
+WIN_SCORE = 1 << 40
+MAX_PLY = 256
+# 置换表边界类型
+EXACT, LOWER, UPPER = 0, 1, 2
+
+DEFAULT_TIME_LIMIT = 0.5
+DEFAULT_MAX_DEPTH = 64
+DEFAULT_TT_SIZE = 1 << 20
+# 每搜索这么多个节点检查一次时间
+CHECK_INTERVAL = 256
+
+
+class SearchTimeout(Exception):
+    """搜索超时，丢弃当前这一轮迭代"""
+
+
+class Zobrist:
+    """限步规则下的 Zobrist 随机数表，每个 (n, m) 只生成一次
+
+    同一盘面、棋子先后顺序不同时，之后哪颗棋子先消失也不同，因此 key 必须区分顺序。
+    每个玩家第 t 颗棋子（从 0 计）占用槽位 t % m：队列中的 m 颗棋子槽位互不相同，
+    消失的棋子（第 t - m 颗）与新落子槽位相同；再加上双方已落子数 % m 和轮到谁，
+    就能还原出完整的先后顺序。落子、消失都只需异或一项，可增量更新。
+    """
+
+    _cache = {}
+
+    def __init__(self, n, m, seed=0x5EED):
+        rng = random.Random(seed)
+        self.m = m
+        self.piece = {player: [rng.getrandbits(64) for _ in range(n * n * m)] for player in (1, -1)}
+        self.turn = {player: [rng.getrandbits(64) for _ in range(m)] for player in (1, -1)}
+        self.side = rng.getrandbits(64)
+
+    @classmethod
+    def get(cls, n, m):
+        table = cls._cache.get((n, m))
+        if table is None:
+            table = cls._cache[(n, m)] = cls(n, m)
+        return table
+
+
+class SearchState:
+    """搜索用的局面：一维棋盘、双方棋子队列（最早的在前）、增量威胁表、候选落子和 Zobrist key
+
+    make / unmake 成对使用；构造后与 game 无关，搜索不会改动 game。
+    radius 为 None 时不剪枝，候选为全部空格。
+    """
+
+    def __init__(self, game, radius=DEFAULT_RADIUS):
+        n = game.n
+        self.n = n
+        self.m = game.m
+        self.K = game.win_count
+        self.zobrist = Zobrist.get(n, self.m)
+        self.lines = LineGeometry.get(n, self.K).windows
+        self.board = [v for row in game.board for v in row]
+        self.pieces = {1: deque(i * n + j for i, j in game.x), -1: deque(i * n + j for i, j in game.y)}
+        # 双方已落子数（含已消失的）
+        self.placed = {1: (len(game.history) + 1) // 2, -1: len(game.history) // 2}
+        self.player = 1 if len(game.history) % 2 == 0 else -1
+        self.threats = ThreatTable(n, self.K)
+        self.threats.sync(game.board)
+        # 只看盘面的哈希（叶子估值与棋子先后无关，按它缓存能在不同走子顺序间复用）
+        self.position = PositionHash(n)
+        self.position.sync(game.board)
+        self.candidates = CandidateSet(n, radius) if radius is not None else None
+        if self.candidates is not None:
+            self.candidates.sync(game.board)
+        self.stack = []
+        self.key = self._compute_key()
+
+    def _compute_key(self):
+        z = self.zobrist
+        key = z.side if self.player == -1 else 0
+        for player, queue in self.pieces.items():
+            first = self.placed[player] - len(queue)
+            for k, p in enumerate(queue):
+                key ^= z.piece[player][p * self.m + (first + k) % self.m]
+            key ^= z.turn[player][self.placed[player] % self.m]
+        return key
+
+    def evicted(self, player):
+        """player 此时落子会消失的棋子下标，不会消失时返回 None"""
+        queue = self.pieces[player]
+        return queue[0] if len(queue) >= self.m else None
+
+    def winning_moves(self, player):
+        """player 此时落子就能连成 K 子的空格（去重）
+
+        来自威胁表中已有 K - 1 个 player 棋子、无对手棋子的窗口；经过这一步会消失的棋子的窗口不算。
+        """
+        evicted = self.evicted(player)
+        board = self.board
+        lines = self.lines
+        cells = []
+        for w in self.threats.levels[player][self.K - 1]:
+            window = lines[w]
+            if evicted is not None and evicted in window:
+                continue
+            for p in window:
+                if board[p] == 0:
+                    if p not in cells:
+                        cells.append(p)
+                    break
+        return cells
+
+    def empty_cells(self):
+        return [p for p, v in enumerate(self.board) if v == 0]
+
+    def candidate_cells(self):
+        """候选落子（行优先）：棋子附近的空格，不剪枝时为全部空格"""
+        if self.candidates is None:
+            return self.empty_cells()
+        return self.candidates.cells()
+
+    def make(self, p):
+        """当前玩家在格子 p 落子（队列满时最早的棋子消失），轮到对手"""
+        player = self.player
+        queue = self.pieces[player]
+        z = self.zobrist
+        m = self.m
+        placed = self.placed[player]
+        slot = p * m + placed % m
+        evicted = queue.popleft() if len(queue) >= m else None
+
+        self.stack.append((p, evicted, self.key))
+        key = self.key ^ z.piece[player][slot] ^ z.side
+        key ^= z.turn[player][placed % m] ^ z.turn[player][(placed + 1) % m]
+        self.board[p] = player
+        queue.append(p)
+        if evicted is not None:
+            self.board[evicted] = 0
+            key ^= z.piece[player][evicted * m + placed % m]
+        self.threats.play(p, player, evicted)
+        self.position.play(p, player, evicted)
+        if self.candidates is not None:
+            self.candidates.play(p, player, evicted)
+        self.placed[player] = placed + 1
+        self.player = -player
+        self.key = key
+
+    def unmake(self):
+        p, evicted, key = self.stack.pop()
+        player = -self.player
+        queue = self.pieces[player]
+        self.threats.undo()
+        self.position.undo()
+        if self.candidates is not None:
+            self.candidates.undo()
+        queue.pop()
+        self.board[p] = 0
+        if evicted is not None:
+            queue.appendleft(evicted)
+            self.board[evicted] = player
+        self.placed[player] -= 1
+        self.player = player
+        self.key = key
+
+
+class AlphaBetaSearch:
+    """迭代加深 negamax alpha-beta + 置换表 + killer / history 走法排序
+
+    Args:
+        evaluator: UniversalEvaluator（叶子估值、根节点排序）
+        tt_size: 置换表最多条目数，超过时清空
+        radius: 候选落子半径（CandidateSet），None 表示不剪枝
+    """
+
+    def __init__(self, evaluator, tt_size=DEFAULT_TT_SIZE, radius=DEFAULT_RADIUS):
+        self.evaluator = evaluator
+        self.radius = radius
+        self.tt_size = tt_size
+        self.tt = {}
+        # 叶子估值缓存，key 为盘面哈希 + 评估方
+        self.eval_cache = EvaluationCache()
+        n = evaluator.game.n
+        self.centrality = [10.0 / (1.0 + math.sqrt((p // n - n / 2) ** 2 + (p % n - n / 2) ** 2))
+                           for p in range(n * n)]
+        self.history = {1: [0] * (n * n), -1: [0] * (n * n)}
+        self.killers = [[None, None] for _ in range(MAX_PLY)]
+        self.nodes = 0
+        self.deadline = None
+        # 当前一轮迭代中已完整搜索过的最佳根走法
+        self.partial = None
+        # 最近一次搜索的统计
+        self.depth = 0
+        self.value = 0
+
+    def _new_search(self):
+        self.nodes = 0
+        for ply in self.killers:
+            ply[0] = ply[1] = None
+        # history 随对局累积，每次搜索前减半，旧局面的经验逐渐淡出
+        for table in self.history.values():
+            for p in range(len(table)):
+                table[p] >>= 1
+        if len(self.tt) > self.tt_size:
+            self.tt.clear()
+
+    def _root_moves(self, state, game):
+        """根节点走法：候选落子按 UniversalEvaluator 的一步评分从高到低"""
+        evaluator = self.evaluator
+        n = state.n
+        player = state.player
+        candidates = state.candidate_cells()
+        scored = evaluator.score_all_moves(game.board, player, candidates)
+        if scored is not None:
+            cells, scores = scored
+            pairs = list(zip(cells.tolist(), scores.tolist()))
+        else:
+            pairs = [(p, evaluator.evaluate_move_score(game.board, player, p // n, p % n))
+                     for p in candidates]
+        # 稳定排序：同分时保持行优先顺序，与启发式 AI 的选择一致
+        pairs.sort(key=lambda pair: -pair[1])
+        return [p for p, _ in pairs]
+
+    def search(self, game, time_limit=DEFAULT_TIME_LIMIT, max_depth=DEFAULT_MAX_DEPTH, deadline=None):
+        """返回最佳落子的格子下标 i * n + j，没有空格时返回 None
+
+        Args:
+            time_limit: 搜索时间（秒），None 表示不限
+            deadline: time.perf_counter() 截止时刻，给出时代替 time_limit
+
+        任何时候超时都会返回一个走法：已完成的最深一轮的最佳走法，或者当前这一轮中
+        已经完整搜索过、且比上一轮最佳走法（本轮第一个搜索）更好的走法；一轮都没完成时用根节点排序的第一个。
+        """
+        self._new_search()
+        if deadline is None and time_limit is not None:
+            deadline = time.perf_counter() + time_limit
+        self.deadline = deadline
+        state = SearchState(game, self.radius)
+        player = state.player
+
+        wins = state.winning_moves(player)
+        if wins:
+            self.depth, self.value = 1, WIN_SCORE - 1
+            return wins[0]
+        moves = self._root_moves(state, game)
+        if not moves:
+            return None
+        # 对手有成 K 点时只考虑堵点（堵不住也照样选一个）
+        blocks = state.winning_moves(-player)
+        if blocks:
+            moves = [p for p in moves if p in blocks] or moves
+        if len(moves) == 1:
+            self.depth, self.value = 0, 0
+            return moves[0]
+
+        best = moves[0]
+        self.depth, self.value = 0, 0
+        for depth in range(1, max_depth + 1):
+            self.partial = None
+            try:
+                value, move = self._search_root(state, moves, depth)
+            except SearchTimeout:
+                while state.stack:
+                    state.unmake()
+                if self.partial is not None:
+                    best = self.partial
+                break
+            best = move
+            self.depth, self.value = depth, value
+            moves.remove(move)
+            moves.insert(0, move)
+            # 已经找到必胜 / 必败
+            if abs(value) >= WIN_SCORE - MAX_PLY:
+                break
+        return best
+
+    def _search_root(self, state, moves, depth):
+        alpha, beta = -WIN_SCORE - 1, WIN_SCORE + 1
+        best_move = moves[0]
+        for k, p in enumerate(moves):
+            if k and self.deadline is not None and time.perf_counter() > self.deadline:
+                raise SearchTimeout()
+            state.make(p)
+            value = -self._negamax(state, depth - 1, -beta, -alpha, 1)
+            state.unmake()
+            if value > alpha:
+                alpha = value
+                best_move = p
+            # 第一个走法（上一轮的最佳）已搜完，本轮到目前为止的最佳走法可以在超时时使用
+            self.partial = best_move
+        self._store(state.key, depth, EXACT, alpha, best_move, 0)
+        return alpha, best_move
+
+    def _negamax(self, state, depth, alpha, beta, ply):
+        self.nodes += 1
+        if self.deadline is not None and self.nodes % CHECK_INTERVAL == 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+        player = state.player
+
+        # 轮到走棋的一方能一步成 K
+        if state.winning_moves(player):
+            return WIN_SCORE - ply - 1
+        if depth <= 0 or ply >= MAX_PLY - 1:
+            key = state.position.for_player(state.position.key, player)
+            value = self.eval_cache.get(key)
+            if value is None:
+                value = self.evaluator.evaluate_threats(state.threats, player)
+                self.eval_cache.put(key, value)
+            return value
+
+        alpha_orig = alpha
+        tt_move = None
+        entry = self.tt.get(state.key)
+        if entry is not None:
+            tt_depth, flag, value, tt_move = entry
+            if tt_depth >= depth:
+                value = self._from_tt(value, ply)
+                if flag == EXACT:
+                    return value
+                if flag == LOWER:
+                    alpha = max(alpha, value)
+                else:
+                    beta = min(beta, value)
+                if alpha >= beta:
+                    return value
+
+        moves = self._ordered_moves(state, ply, tt_move)
+        if not moves:
+            return 0
+
+        best, best_move = -WIN_SCORE - 1, moves[0]
+        for p in moves:
+            state.make(p)
+            value = -self._negamax(state, depth - 1, -beta, -alpha, ply + 1)
+            state.unmake()
+            if value > best:
+                best, best_move = value, p
+                if value > alpha:
+                    alpha = value
+                    if alpha >= beta:
+                        killers = self.killers[ply]
+                        if killers[0] != p:
+                            killers[1] = killers[0]
+                            killers[0] = p
+                        self.history[player][p] += depth * depth
+                        break
+
+        if best <= alpha_orig:
+            flag = UPPER
+        elif best >= beta:
+            flag = LOWER
+        else:
+            flag = EXACT
+        self._store(state.key, depth, flag, best, best_move, ply)
+        return best
+
+    def _ordered_moves(self, state, ply, tt_move):
+        """候选落子按 置换表走法 > killer > history > 中心价值 排序；对手有成 K 点时只返回堵点"""
+        blocks = state.winning_moves(-state.player)
+        if blocks:
+            return blocks
+        moves = state.candidate_cells()
+        history = self.history[state.player]
+        centrality = self.centrality
+        killers = self.killers[ply]
+
+        def priority(p):
+            if p == tt_move:
+                return 1 << 62
+            if p == killers[0] or p == killers[1]:
+                return (1 << 61) + history[p]
+            return history[p] * 16 + centrality[p]
+
+        moves.sort(key=priority, reverse=True)
+        return moves
+
+    def _store(self, key, depth, flag, value, move, ply):
+        entry = self.tt.get(key)
+        if entry is None or entry[0] <= depth:
+            self.tt[key] = (depth, flag, self._to_tt(value, ply), move)
+
+    @staticmethod
+    def _to_tt(value, ply):
+        """胜负分按到当前节点的步数校正，存成 "从该局面起" 的距离"""
+        if value >= WIN_SCORE - MAX_PLY:
+            return value + ply
+        if value <= -WIN_SCORE + MAX_PLY:
+            return value - ply
+        return value
+
+    @staticmethod
+    def _from_tt(value, ply):
+        if value >= WIN_SCORE - MAX_PLY:
+            return value - ply
+        if value <= -WIN_SCORE + MAX_PLY:
+            return value + ply
+        return value
+
+
+class Strategy:
+    """Alpha-beta 搜索 AI
+
+    Args:
+        time_limit: 每步搜索时间（秒），make_move 给出 deadline 时以 deadline 为准
+        max_depth: 迭代加深的最大深度
+        radius: 候选落子半径（与启发式 AI 共用 CandidateSet），None 表示搜索全部空格
+        params: 评估参数，None 时使用该配置的调优结果（没有则用默认值）
+    """
+
+    def __init__(self, game, time_limit=DEFAULT_TIME_LIMIT, max_depth=DEFAULT_MAX_DEPTH, radius=DEFAULT_RADIUS,
+                 params=None):
+        self.name = "Alpha-Beta AI"
+        self.game = game
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.radius = radius
+        self.params = params
+        self.evaluator = None
+        self.search = None
+
+    def make_move(self, deadline=None):
+        """执行AI落子
+
+        Args:
+            deadline: time.perf_counter() 截止时刻，到点返回目前搜到的最佳走法
+        """
+        # display 会把缓存的策略实例换到新的 game 上
+        if self.evaluator is None or self.evaluator.game is not self.game:
+            self.evaluator = UniversalEvaluator(self.game, self.params)
+            self.search = AlphaBetaSearch(self.evaluator, radius=self.radius)
+
+        move = self.search.search(self.game, self.time_limit, self.max_depth, deadline)
+        if move is None:
+            return False
+        n = self.game.n
+        self.game.play(move // n, move % n)
+        return True
@@ -0,0 +1,74 @@
+"""
+必胜检测测试：威胁空间搜索和 alpha-beta 搜索都能找到已知的必胜，
+包括只有在对手最早的棋子消失后才成立的必胜
+"""
+
+from Game import GameBase
+from strategies.heuristic.heuristic_strategy import UniversalEvaluator
+from strategies.search.search_strategy import MAX_PLY, WIN_SCORE, AlphaBetaSearch, SearchState
+from strategies.search.threat_space import ThreatSpaceSearch
+
+
+def setup(n, m, k, moves):
+    """按顺序落子（X、O 交替），返回 game"""
+    game = GameBase(n, m, k)
+    for i, j in moves:
+        game.play(i, j)
+        assert not game.get_result(), f"布局中途已分胜负: {(i, j)}"
+    return game
+
+
+def check_line(state, line, attacker):
+    """沿序列走一遍：进攻方每步都形成威胁，防守方每步都堵威胁点，最后一步连成 K"""
+    for step, p in enumerate(line):
+        if step % 2 == 0 and step + 1 < len(line):
+            state.make(p)
+            assert state.winning_moves(attacker), f"第 {step + 1} 步 {p} 没有形成威胁"
+        elif step % 2 == 1:
+            assert p in state.winning_moves(attacker), f"第 {step + 1} 步 {p} 不是堵点"
+            state.make(p)
+    assert line[-1] in state.winning_moves(attacker), "最后一步没有连成 K"
+    while state.stack:
+        state.unmake()
+
+
+def check_alpha_beta(game, depth):
+    search = AlphaBetaSearch(UniversalEvaluator(game), radius=None)
+    move = search.search(game, time_limit=None, max_depth=depth)
+    assert search.value >= WIN_SCORE - MAX_PLY, f"alpha-beta 没有找到必胜（值 {search.value}）"
+    return move
+
+
+print("=" * 60)
+print("必胜检测测试")
+print("=" * 60)
+
+# 7×7 K=4，棋子不会消失：X 在 (3,4) 落子同时形成横向活三和纵向三连，必胜
+game = setup(7, 7, 4, [(3, 2), (0, 0), (3, 3), (0, 6), (1, 4), (6, 0), (2, 4), (6, 6)])
+state = SearchState(game, radius=None)
+key = state.key
+line = ThreatSpaceSearch().find_win(state, 1)
+assert line is not None, "威胁空间搜索没有找到必胜"
+assert state.key == key and not state.stack, "find_win 之后局面没有恢复"
+assert line[0] == 3 * 7 + 4, f"必胜第一步应为 (3, 4)，实际 {divmod(line[0], 7)}"
+check_line(state, line, 1)
+print(f"✓ 威胁空间搜索: {[divmod(p, 7) for p in line]}")
+move = check_alpha_beta(game, 4)
+print(f"✓ alpha-beta: {divmod(move, 7)} 必胜")
+
+# 5×5 m=4 K=3：X 的 (4,0)、(4,2) 之间是 O 最早的棋子 (4,1)。
+# X 在 (2,0) 形成唯一威胁 (3,0)，O 堵点时 (4,1) 消失，X 下在 (4,1) 连成三子
+game = setup(5, 4, 3, [(0, 0), (4, 1), (0, 4), (3, 1), (4, 0), (0, 2), (4, 2), (1, 4)])
+state = SearchState(game, radius=None)
+oldest = state.pieces[-1][0]
+assert not state.winning_moves(1) and not state.winning_moves(-1)
+line = ThreatSpaceSearch(max_depth=2).find_win(state, 1)
+assert line is not None, "威胁空间搜索没有找到依赖棋子消失的必胜"
+assert line[-1] == oldest and state.board[oldest] == -1, "必胜的最后一步应落在 O 最早的棋子处"
+state.make(line[0])
+assert len(state.winning_moves(1)) == 1, "第一步应只形成一个威胁（必胜依赖棋子消失，而不是双威胁）"
+state.unmake()
+check_line(state, line, 1)
+print(f"✓ 威胁空间搜索: {[divmod(p, 5) for p in line]}（最后一步落在消失的 O 棋子处）")
+move = check_alpha_beta(game, 3)
+print(f"✓ alpha-beta: {divmod(move, 5)} 必胜")
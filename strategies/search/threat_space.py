@@ -0,0 +1,140 @@
+"""威胁空间搜索（只走冲四类走法的必胜检测）
+
+进攻方每一步都必须造成"下一步就能连成 K"的威胁，防守方只能去堵威胁点（否则下一步输），
+因此两边的分支都很小，十几层的必胜序列也只有几百个节点。限步规则下：
+    - 走子用 SearchState.make / unmake，双方棋子按 FIFO（GameBase.x / y 的顺序）消失，
+      序列中每一步之后盘面上还剩哪些棋子都是准确的
+    - 威胁点用 winning_moves 计算，已经排除进攻方下一步落子时会消失的棋子所在的窗口，
+      所以"威胁成熟时棋子已经没了"的假威胁不会算数
+    - 防守方堵点时自己最早的棋子消失，可能让出格子，之后重新计算威胁即可
+
+进攻方候选：威胁表中已有 K - 2 个己方棋子、无对手棋子的窗口里的空格（落子后再核实确实形成威胁）。
+对手已有成 K 点时，进攻方只能在堵点中找同时形成威胁的走法。
+"""
+
+import time
+
+from strategies.heuristic.heuristic_strategy import DEFAULT_THREAT_DEPTH
+from strategies.search.search_strategy import SearchTimeout
+
+# 单次搜索的节点上限，超过时放弃（当作没有找到）
+DEFAULT_THREAT_NODES = 5000
+# 每搜索这么多个节点检查一次时间
+CHECK_INTERVAL = 64
+
+
+class ThreatSpaceSearch:
+    """在 SearchState 上找 attacker 的必胜威胁序列
+
+    Args:
+        max_depth: 进攻方最多走几步（含最后连成 K 的一步）
+        max_nodes: 单次 find_win 的节点上限
+    """
+
+    def __init__(self, max_depth=DEFAULT_THREAT_DEPTH, max_nodes=DEFAULT_THREAT_NODES):
+        self.max_depth = max_depth
+        self.max_nodes = max_nodes
+        self.nodes = 0
+        self.deadline = None
+        # 最近一次 find_win 是否搜完（没有因节点上限或 deadline 放弃）
+        self.complete = True
+        # 已证明在剩余步数内赢不了的局面：key -> 剩余步数
+        self.failed = {}
+
+    def find_win(self, state, attacker, deadline=None):
+        """attacker 先走时的必胜序列 [进攻, 堵, 进攻, ..., 连成 K 的一步]，找不到时返回 None
+
+        轮到的不是 attacker 时按"对手停一步"处理（用于检测对手的威胁）。
+        超过节点上限或 deadline 时返回 None，state 恢复原样。
+        """
+        self.nodes = 0
+        self.deadline = deadline
+        self.failed.clear()
+        self.complete = True
+        passed = state.player != attacker
+        if passed:
+            state.player = attacker
+            state.key ^= state.zobrist.side
+        depth = len(state.stack)
+        try:
+            return self._attack(state, attacker, self.max_depth)
+        except SearchTimeout:
+            self.complete = False
+            while len(state.stack) > depth:
+                state.unmake()
+            return None
+        finally:
+            if passed:
+                state.player = -attacker
+                state.key ^= state.zobrist.side
+
+    def _tick(self):
+        self.nodes += 1
+        if self.nodes > self.max_nodes:
+            raise SearchTimeout()
+        if self.deadline is not None and self.nodes % CHECK_INTERVAL == 0 \
+                and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+
+    def _threat_moves(self, state, attacker):
+        """attacker 落子后可能形成威胁的空格：K - 2 子窗口中的空格（去重）"""
+        board = state.board
+        lines = state.lines
+        cells = []
+        for w in state.threats.levels[attacker][state.K - 2] if state.K > 2 else ():
+            for p in lines[w]:
+                if board[p] == 0 and p not in cells:
+                    cells.append(p)
+        return cells
+
+    def _attack(self, state, attacker, depth):
+        """轮到 attacker：返回必胜序列或 None"""
+        wins = state.winning_moves(attacker)
+        if wins:
+            return [wins[0]]
+        if depth <= 1:
+            return None
+        known = self.failed.get(state.key)
+        if known is not None and known >= depth:
+            return None
+        self._tick()
+
+        moves = self._threat_moves(state, attacker)
+        blocks = state.winning_moves(-attacker)
+        if blocks:
+            # 必须先堵；堵点多于一个时堵不住
+            moves = [p for p in moves if p in blocks] if len(blocks) == 1 else []
+
+        # 先试形成威胁点多的走法（双威胁防守方只能堵一个）
+        tries = []
+        for p in moves:
+            state.make(p)
+            threats = state.winning_moves(attacker)
+            # 防守方此时能直接连成 K 的不算
+            if threats and not state.winning_moves(-attacker):
+                tries.append((-len(threats), p))
+            state.unmake()
+        tries.sort()
+
+        for _, p in tries:
+            state.make(p)
+            line = self._defend(state, attacker, depth - 1)
+            state.unmake()
+            if line is not None:
+                return [p] + line
+        self.failed[state.key] = depth
+        return None
+
+    def _defend(self, state, attacker, depth):
+        """轮到防守方，attacker 已有威胁点：每个堵点之后 attacker 都能赢时返回其中一条序列"""
+        self._tick()
+        line = None
+        for p in state.winning_moves(attacker):
+            state.make(p)
+            reply = self._attack(state, attacker, depth)
+            state.unmake()
+            if reply is None:
+                return None
+            if line is None:
+                line = [p] + reply
+        return line